@@ -595,6 +595,22 @@ class CompileCtx(object):
             if issubclass(parser.get_type(), ASTNode)
         )
 
+    @property
+    def instrumented_properties(self):
+        """
+        Return the list of properties that collect evaluation statistics when
+        instrumenting properties: all properties that are implemented in the
+        generated library, i.e. that are neither abstract nor external.
+
+        :rtype: list[langkit.expressions.base.PropertyDef]
+        """
+        return [
+            prop
+            for astnode in self.astnode_types
+            for prop in astnode.get_properties(include_inherited=False)
+            if not prop.abstract and not prop.external
+        ]
+
     def compute_types(self):
         """
         Compute various information related to compiled types, that needs to be
@@ -676,7 +692,8 @@ class CompileCtx(object):
 
     def emit(self, file_root='.', generate_lexer=True, main_programs=set(),
              annotate_fields_types=False, compile_only=False,
-             no_property_checks=False):
+             no_property_checks=False, instrument_parsers=False,
+             instrument_properties=False):
         """
         Generate sources for the analysis library. Also emit a tiny program
         useful for testing purposes.
@@ -696,6 +713,14 @@ class CompileCtx(object):
             type of fields in the grammar. If this is True, this will
             actually modify the file in which ASTNode subclasses are
             defined, and annotate empty field definitions.
+
+        :param bool instrument_parsers: Whether to generate parsers that
+            collect statistics about each grammar rule. If False, no code is
+            generated for this.
+
+        :param bool instrument_properties: Whether to generate properties that
+            collect statistics about their evaluation: number of calls, time
+            spent, etc. If False, no code is generated for this.
         """
         dir_path = path.join(
             path.dirname(path.realpath(__file__)), "templates"
@@ -707,6 +732,8 @@ class CompileCtx(object):
         )
 
         self.no_property_checks = no_property_checks
+        self.instrument_parsers = instrument_parsers
+        self.instrument_properties = instrument_properties
 
         # Automatically add all source files in the "extensions/src" directory
         # to the generated library project.
@@ -875,6 +902,12 @@ class CompileCtx(object):
         if compile_only:
             return
 
+        # Compiling a rule can compile the rules it references, so decide
+        # which rules are memoized before compiling any of them.
+        memoized_rules = self.grammar.get_memoized_rules()
+        for r_name, r in self.grammar.rules.items():
+            r.is_memoized = r_name in memoized_rules
+
         with names.camel_with_underscores:
             for r_name, r in self.grammar.rules.items():
                 with r.error_context():
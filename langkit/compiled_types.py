@@ -148,6 +148,10 @@ def make_renderer(base_renderer=None):
             'text_type':             CAPIType(capi, 'text').name,
             'diagnostic_type':       CAPIType(capi, 'diagnostic').name,
             'exception_type':        CAPIType(capi, 'exception').name,
+            'parser_rule_stats_type':
+                CAPIType(capi, 'parser_rule_stats').name,
+            'property_stats_type':
+                CAPIType(capi, 'property_stats').name,
             'library_public_field':  library_public_field,
         })
     return base_renderer.update(template_args)
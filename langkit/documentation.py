@@ -153,6 +153,13 @@ base_langkit_docs = {
             caller to free resources allocated to it when done with the
             analysis context.
         % endif
+
+        When Compact_Sources is true, store the source text of analysis units
+        using one byte per character instead of four whenever all characters
+        belong to Latin-1. The text is then decoded again on access. Getting
+        the text of a single token decodes only this token, while APIs that
+        return references to the source text, such as token data, decode the
+        whole source again and keep it until the unit is reparsed.
     """,
     'langkit.context_incref': """
         Increase the reference count to an analysis context.
@@ -170,6 +177,64 @@ base_langkit_docs = {
         to it elsewhere.
     """,
 
+    'langkit.parser_rule_stats_type': """
+        Statistics about the parsing of some grammar rule: number of calls to
+        its parsing function, number of calls that found a result in the
+        memoization table, number of calls that did not, number of calls that
+        failed and total number of tokens matched by the calls that
+        succeeded.
+    """,
+    'langkit.context_parser_stats': """
+        % if lang == 'c':
+            Get parsing statistics for the Nth grammar rule (in declaration
+            order for the grammar rule type) and store them into *STATS_P.
+            Return zero on failure (when N is too big).
+        % elif lang == 'python':
+            Return a dict that maps grammar rule names to parsing statistics.
+        % else:
+            Return parsing statistics for all grammar rules.
+        % endif
+        Statistics accumulate over all parsing done in this context since its
+        creation or since the last reset.
+    """,
+    'langkit.context_reset_parser_stats': """
+        Reset to zero all parsing statistics for this context.
+    """,
+    'langkit.property_id_type': """
+        Identifier for a property that is implemented in this library.
+    """,
+    'langkit.property_name': """
+        Return the qualified name of a property, for instance
+        "Node_Type.p_property".
+    """,
+    'langkit.property_stats_type': """
+        Statistics about the evaluation of some property: number of calls,
+        number of calls that found their result in the memoization table,
+        number of calls that raised a property error, time spent in the calls
+        including nested property calls (total time), and time spent in the
+        calls excluding nested property calls (self time). Times are in
+        seconds.
+
+        Calls that are nested in another call to the same property count in
+        the total time of both calls.
+    """,
+    'langkit.context_property_stats': """
+        % if lang == 'c':
+            Get evaluation statistics for the Nth property (in declaration
+            order for the property identifier type) and store them into
+            *STATS_P. Return zero on failure (when N is too big).
+        % elif lang == 'python':
+            Return a dict that maps property names to evaluation statistics.
+        % else:
+            Return evaluation statistics for all properties.
+        % endif
+        Statistics accumulate over all property evaluations on nodes of this
+        context since its creation or since the last reset.
+    """,
+    'langkit.context_reset_property_stats': """
+        Reset to zero all property evaluation statistics for this context.
+    """,
+
     'langkit.get_unit_from_file': """
         Create a new analysis unit for Filename or return the existing one if
         any. If Reparse is true and the analysis unit already exists, reparse
@@ -219,6 +284,29 @@ base_langkit_docs = {
         When With_Trivia is true, the parsed analysis unit will contain
         trivias. Already existing analysis units are reparsed if needed.
     """,
+    'langkit.get_units_from_files': """
+        Get analysis units for all files in Filenames, as Get_From_File would
+        do for each of them, and return them in the same order. Lexing and
+        parsing is distributed over a pool of Workers tasks that work at the
+        same time.
+
+        % if lang != 'python':
+            The results are owned by the context: the caller must increase
+            their ref-count in order to keep references to them.
+        % endif
+
+        If Workers is zero, use as many tasks as there are processors.
+        Workers grab files by chunks of Chunk_Size consecutive files: bigger
+        chunks reduce synchronization overhead whereas smaller ones give a
+        better balance when files have very different sizes.
+
+        Charset, Reparse and With_Trivia have the same meaning as for
+        Get_From_File and apply to all files. Files that appear several times
+        in Filenames are parsed only once. Errors are described as diagnostics
+        of the corresponding units.
+
+        The context must not be used by other tasks during this call.
+    """,
     'langkit.get_unit_from_provider': """
         Create a new analysis unit for Name/Kind or return the existing one if
         any. If Reparse is true and the analysis unit already exists, reparse
@@ -286,12 +374,38 @@ base_langkit_docs = {
         If any failure occurs, such as decoding, lexing or parsing
         failure, diagnostic are emitted to explain what happened.
     """,
+    'langkit.unit_reparse_incremental': """
+        Reparse an analysis unit from a buffer, assuming that the only
+        difference between this buffer and the previous source of the unit is
+        that the text in Edit, a source location range in the previous source,
+        was replaced. If Charset is empty or ${null}, use the last charset
+        successfuly used for this unit, otherwise use it to decode the buffer.
+
+        Only the tokens that the edit affects are lexed again, and AST nodes
+        that only span tokens outside of the edited area are reused instead of
+        being parsed again, so that the cost of reparsing depends mostly on
+        the size of the edit. The first incremental reparse of an
+        analysis unit parses it from scratch, as this is when the unit starts
+        to keep the data that reuse requires.
+
+        Lexical environments are not updated incrementally: if they were
+        populated, they are computed again for the whole unit, as env actions
+        can evaluate properties that depend on any node, reused or not.
+
+        If any failure occurs, such as decoding, lexing or parsing
+        failure, diagnostic are emitted to explain what happened.
+    """,
     'langkit.unit_reparse_generic': """
         Reparse an analysis unit from a buffer, if provided, or from the
         original file otherwise. If Charset is empty or ${null}, use the last
         charset successfuly used for this unit, otherwise use it to decode the
         content of the source file.
 
+        If Edit is provided, it must be the source location range of the only
+        text replaced in the previous source to get Buffer: AST nodes that only
+        span tokens outside of Edit are then reused instead of being parsed
+        again.
+
         If any failure occurs, such as decoding, lexing or parsing
         failure, diagnostic are emitted to explain what happened.
     """,
@@ -10,7 +10,7 @@ import funcy
 from langkit import names
 from langkit.common import string_repr
 from langkit.compiled_types import (
-    AbstractNodeData, Argument, ASTNode, BoolType, CompiledType,
+    AbstractNodeData, Argument, ASTNode, BoolType, CompiledType, EnumType,
     LexicalEnvType, LongType, Symbol, T, Token, get_context,
     render as ct_render, resolve_type
 )
@@ -1464,9 +1464,22 @@ class PropertyDef(AbstractNodeData):
     reserved_arg_names = (self_arg_name, env_arg_name)
     reserved_arg_lower_names = [n.lower for n in reserved_arg_names]
 
+    default_memo_table_size = 1024
+    """
+    Default maximum number of results that memoized properties with explicit
+    arguments keep for each node.
+    """
+
+    memo_key_types = (ASTNode, BoolType, EnumType, LongType, Symbol)
+    """
+    Types allowed for the explicit arguments of memoized properties: values of
+    these types can be hashed and compared in generated code.
+    """
+
     def __init__(self, expr, prefix, name=None, doc=None, private=None,
                  abstract=False, type=None, abstract_runtime_check=False,
-                 has_implicit_env=None, memoized=False, external=False):
+                 has_implicit_env=None, memoized=False, external=False,
+                 memo_table_size=None):
         """
         :param expr: The expression for the property. It can be either:
             * An expression.
@@ -1515,6 +1528,11 @@ class PropertyDef(AbstractNodeData):
         :param bool memoized: Whether this property must be memoized. Disabled
             by default.
 
+        :param int|None memo_table_size: For memoized properties that take
+            explicit arguments, maximum number of results to keep for each
+            node. When a node's table is full, it is cleared before storing a
+            new result. If None, use default_memo_table_size.
+
         :param bool external: Whether this property's implementation is
             provided by the language specification. If true, `expr` must be
             None and the implementation must be provided in the
@@ -1582,6 +1600,7 @@ class PropertyDef(AbstractNodeData):
 
         self.memoized = memoized
         self.external = external
+        self._memo_table_size = memo_table_size
 
     @property
     def uid(self):
@@ -1609,7 +1628,9 @@ class PropertyDef(AbstractNodeData):
             abstract=self.abstract,
             type=self.expected_type,
             has_implicit_env=self._has_implicit_env,
+            memoized=self.memoized,
             external=self.external,
+            memo_table_size=self._memo_table_size,
         )
         new.vars = copy(self.vars)
 
@@ -1904,9 +1925,25 @@ class PropertyDef(AbstractNodeData):
                 'A memoized property is not allowed to take an implicit env'
                 ' arguments'
             )
+            for arg in self.explicit_arguments:
+                check_source_language(
+                    issubclass(arg.type, self.memo_key_types),
+                    'Argument "{}" of a memoized property cannot be of type'
+                    ' {}: only AST nodes, booleans, enumerations, integers'
+                    ' and symbols are supported'.format(
+                        arg.name.lower, arg.type.name().camel
+                    )
+                )
+
+        if self._memo_table_size is not None:
             check_source_language(
-                not self.explicit_arguments,
-                'A memoized property is not allowed to take explicit arguments'
+                self.memoization_table,
+                'Only memoized properties with explicit arguments can have a'
+                ' memoization table size'
+            )
+            check_source_language(
+                self._memo_table_size > 0,
+                'The memoization table size must be positive'
             )
 
         if self.external:
@@ -2143,6 +2180,75 @@ class PropertyDef(AbstractNodeData):
         assert self.memoized
         return names.Name('Cached') + self.name
 
+    @property
+    def memoization_deps_field_name(self):
+        """
+        Assuming this property is memoized, return the name of the field that
+        stores the analysis units that the cached results of this property
+        depend on.
+
+        :rtype: names.Name
+        """
+        assert self.memoized
+        return names.Name('Cache_Deps') + self.name
+
+    @property
+    def memoization_version_field_name(self):
+        """
+        Assuming this property is memoized, return the name of the field that
+        stores the cache epoch of the context the last time the cached results
+        of this property were checked.
+
+        :rtype: names.Name
+        """
+        assert self.memoized
+        return names.Name('Cache_Version') + self.name
+
+    @property
+    def memoization_table(self):
+        """
+        Whether this property is memoized and takes explicit arguments. If so,
+        its results are stored in a hash table keyed by arguments rather than
+        in a single field.
+
+        :rtype: bool
+        """
+        return self.memoized and bool(self.explicit_arguments)
+
+    @property
+    def memoization_table_field_name(self):
+        """
+        Assuming this property has a memoization table, return the name of the
+        field that holds the table.
+
+        :rtype: names.Name
+        """
+        assert self.memoization_table
+        return names.Name('Memo_Table') + self.name
+
+    @property
+    def memoization_table_size(self):
+        """
+        Assuming this property has a memoization table, return the maximum
+        number of entries that this table can hold.
+
+        :rtype: int
+        """
+        assert self.memoization_table
+        return (self.default_memo_table_size
+                if self._memo_table_size is None else
+                self._memo_table_size)
+
+    @property
+    def profiling_id(self):
+        """
+        Return the name of the enumerator that identifies this property in
+        property evaluation statistics. See CompileCtx.instrument_properties.
+
+        :rtype: names.Name
+        """
+        return self.struct.name() + self.name
+
     def warn_on_unused_bindings(self):
         """
         Emit warnings for bindings such as variables or arguments, that are not
@@ -2224,7 +2330,7 @@ def AbstractProperty(type, doc="", runtime_check=False, **kwargs):
 
 # noinspection PyPep8Naming
 def Property(expr, doc=None, private=None, type=None, has_implicit_env=None,
-             memoized=False):
+             memoized=False, memo_table_size=None):
     """
     Public constructor for concrete properties. You can declare your properties
     on your ast node subclasses directly, like this::
@@ -2239,11 +2345,13 @@ def Property(expr, doc=None, private=None, type=None, has_implicit_env=None,
     :type type: CompiledType
     :type doc: str
     :type private: bool|None
+    :type memo_table_size: int|None
     :rtype: PropertyDef
     """
     return PropertyDef(expr, AbstractNodeData.PREFIX_PROPERTY, doc=doc,
                        private=private, type=type,
-                       has_implicit_env=has_implicit_env, memoized=memoized)
+                       has_implicit_env=has_implicit_env, memoized=memoized,
+                       memo_table_size=memo_table_size)
 
 
 class AbstractKind(Enum):
@@ -2254,7 +2362,7 @@ class AbstractKind(Enum):
 
 def langkit_property(private=None, return_type=None,
                      kind=AbstractKind.concrete, has_implicit_env=None,
-                     memoized=False, external=False):
+                     memoized=False, external=False, memo_table_size=None):
     """
     Decorator to create properties from real Python methods. See Property for
     more details.
@@ -2262,6 +2370,7 @@ def langkit_property(private=None, return_type=None,
     :type private: bool|None
     :type return_type: CompiledType
     :type kind: int
+    :type memo_table_size: int|None
     """
     def decorator(expr_fn):
         return PropertyDef(
@@ -2275,6 +2384,7 @@ def langkit_property(private=None, return_type=None,
             has_implicit_env=has_implicit_env,
             memoized=memoized,
             external=external,
+            memo_table_size=memo_table_size,
         )
     return decorator
 
@@ -2684,6 +2794,19 @@ class LocalVars(object):
         self.local_vars[name] = ret
         return ret
 
+    def remove(self, var):
+        """
+        Remove "var" from the set of local variables and from its scope, so
+        that it is not declared in the generated code. This is useful for
+        variables that turn out to be useless.
+
+        :param LocalVars.LocalVar var: Variable to remove.
+        """
+        del self.local_vars[var.name]
+        if var._scope:
+            var._scope.variables.remove(var)
+            var._scope = None
+
     def check_scopes(self):
         """
         Check that all variables are associated to a scope. Raise an
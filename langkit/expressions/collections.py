@@ -15,6 +15,36 @@ from langkit.expressions.base import (
 )
 
 
+def fused_stages(collection):
+    """
+    Return the map expressions that compute the items of "collection", in
+    evaluation order, or an empty list if "collection" is not a map expression.
+
+    Collection expressions use this to implement loop fusion: when the
+    collection they iterate on is the result of a map expression, they iterate
+    directly over the source collection of this map expression and run it for
+    each item, instead of building the intermediate array. This applies
+    transitively to chains of map expressions, so that they are all rendered
+    as a single loop.
+
+    Collection expressions that can stop iterating early (take_while
+    predicates, quantifiers) must not use this: the map expressions they would
+    fuse would then skip the remaining items, and thus the Property_Error they
+    could raise for them.
+
+    As the array of a fused map expression is never built, this removes the
+    corresponding variable.
+
+    :param ResolvedExpression collection: Collection to iterate on.
+    :rtype: list[Map.Expr]
+    """
+    if not isinstance(collection, Map.Expr):
+        return []
+
+    PropertyDef.get().vars.remove(collection.array_var)
+    return collection.stages
+
+
 class CollectionExpression(AbstractExpression):
     """
     Base class to provide common code for abstract expressions working on
@@ -209,6 +239,18 @@ class Map(CollectionExpression):
             self.concat = concat
             self.iter_scope = iter_scope
 
+            # take_while predicates can stop the loop early, so they prevent
+            # fusion: see fused_stages.
+            fused = [] if take_while else fused_stages(collection)
+            self.stages = fused + [self]
+            """
+            Map expressions to run for each item of the source collection,
+            which is the collection of the first stage. The last stage is this
+            map expression. See fused_stages.
+
+            :type: list[Map.Expr]
+            """
+
             element_type = (self.expr.type.element_type()
                             if self.concat else
                             self.expr.type)
@@ -219,6 +261,7 @@ class Map(CollectionExpression):
                 'Map', self.type
             )
             iter_scope.parent.add(self.array_var)
+            self.loop_name = self.array_var.name + names.Name('Loop')
 
             super(Map.Expr, self).__init__()
 
@@ -249,6 +292,40 @@ class Map(CollectionExpression):
             return [var for var in [self.element_var, self.index_var]
                     if var is not None]
 
+    class LengthExpr(ResolvedExpression):
+        """
+        Resolved expression that computes the length of the result of a map
+        expression without building it.
+        """
+        static_type = LongType
+        pretty_class_name = 'MapLength'
+
+        def __init__(self, map_expr):
+            """
+            :param Map.Expr map_expr: Map expression whose result we want the
+                length of.
+            """
+            self.map_expr = map_expr
+            self.stages = fused_stages(map_expr)
+            self.result_var = PropertyDef.get().vars.create('Map_Length',
+                                                            LongType)
+            self.loop_name = self.result_var.name + names.Name('Loop')
+
+            super(Map.LengthExpr, self).__init__()
+
+        def _render_pre(self):
+            return render('properties/map_length_ada', length=self)
+
+        def _render_expr(self):
+            return self.result_var.name.camel_with_underscores
+
+        @property
+        def subexprs(self):
+            return {'map': self.map_expr}
+
+        def __repr__(self):
+            return '<Map.LengthExpr {}>'.format(self.map_expr)
+
     def __init__(self, collection, expr, filter_expr=lambda x: None,
                  concat=False, take_while_pred=lambda x: None):
         """
@@ -355,6 +432,13 @@ class Quantifier(CollectionExpression):
         static_type = BoolType
         pretty_class_name = 'Quantifier'
 
+        # Quantifiers are rendered as the only stage of their loop, but unlike
+        # map expressions, they have no filter, no take_while predicate and
+        # they do not concatenate arrays.
+        filter = None
+        take_while = None
+        concat = False
+
         def __init__(self, kind, collection, expr, list_element_var,
                      element_var, index_var, iter_scope):
             """
@@ -398,6 +482,13 @@ class Quantifier(CollectionExpression):
                 'Quantifier_Result', BoolType
             )
             iter_scope.parent.add(self.result_var)
+            self.loop_name = self.result_var.name + names.Name('Loop')
+
+            # Let the quantifier be the stage of its loop, see Map.Expr. It
+            # yields the value of the predicate for each item. As quantifiers
+            # can stop the loop early, they do not fuse their collection: see
+            # fused_stages.
+            self.stages = [self]
 
             super(Quantifier.Expr, self).__init__()
 
@@ -500,10 +591,14 @@ def length(coll_expr):
     :param AbstractExpression coll_expr: The expression representing the
         collection to get from.
     """
-    return BuiltinCallExpr(
-        "Length", LongType,
-        [construct(coll_expr, lambda t: t.is_collection())]
-    )
+    coll_expr = construct(coll_expr, lambda t: t.is_collection())
+
+    # There is no need to build the result of a map expression just to get
+    # its length: count its items instead.
+    if isinstance(coll_expr, Map.Expr):
+        return Map.LengthExpr(coll_expr)
+
+    return BuiltinCallExpr("Length", LongType, [coll_expr])
 
 
 @attr_expr('singleton')
@@ -107,7 +107,7 @@ def env_get(env_expr, symbol_expr, resolve_unique=False, sequential=False,
     :param bool resolve_unique: Wether we want an unique result or not.
         NOTE: For the moment, nothing will be done to ensure that only one
         result is available. The implementation will just take the first
-        result.
+        result, without looking up the other ones.
     :param bool sequential: Whether resolution needs to be sequential or not.
     :param bool recursive: Whether lookup must be performed recursively on
         parent environments.
@@ -129,27 +129,32 @@ def env_get(env_expr, symbol_expr, resolve_unique=False, sequential=False,
 
     sub_exprs = [construct(env_expr, LexicalEnvType), sym_expr]
 
+    # When only the first result is needed, use Resolve_Unique, which stops
+    # the lookup at the first match instead of building the whole array of
+    # results.
+    call_name = 'Resolve_Unique' if resolve_unique else 'AST_Envs.Get'
+
     if sequential:
         # Pass the From parameter if the user wants sequential semantics
-        array_expr = ('AST_Envs.Get'
-                      '  (Self      => {},'
-                      '   Key => {},'
-                      '   From => {},'
-                      '   Recursive => {})')
+        call_expr = ('{}'
+                     '  (Self      => {{}},'
+                     '   Key => {{}},'
+                     '   From => {{}},'
+                     '   Recursive => {{}})'.format(call_name))
         sub_exprs.append(construct(Self, T.root_node))
     else:
-        array_expr = 'AST_Envs.Get (Self => {}, Key => {}, Recursive => {})'
+        call_expr = ('{} (Self => {{}}, Key => {{}}, Recursive => {{}})'
+                     .format(call_name))
     sub_exprs.append(construct(recursive, BoolType))
 
     make_expr = partial(BasicExpr, result_var_name="Env_Get_Result",
                         operands=sub_exprs)
 
     if resolve_unique:
-        return make_expr("Get ({}, 0)".format(array_expr),
-                         T.root_node.env_el())
+        return make_expr(call_expr, T.root_node.env_el())
     else:
         T.root_node.env_el().array_type().add_to_context()
-        return make_expr("Create ({})".format(array_expr),
+        return make_expr("Create ({})".format(call_expr),
                          T.root_node.env_el().array_type())
 
 
@@ -318,6 +318,18 @@ class ManageScript(object):
             help="Don't generate runtime checks for properties",
             action='store_true'
         )
+        subparser.add_argument(
+            '--instrument-parsers',
+            help='Generate parsers that collect statistics about grammar'
+                 ' rules (number of calls, failures, etc.)',
+            action='store_true'
+        )
+        subparser.add_argument(
+            '--instrument-properties',
+            help='Generate properties that collect statistics about their'
+                 ' evaluation (number of calls, time spent, etc.)',
+            action='store_true'
+        )
 
     def add_build_args(self, subparser):
         """
@@ -525,7 +537,9 @@ class ManageScript(object):
                           annotate_fields_types=args.annotate_fields_types,
                           generate_lexer=not args.no_compile_quex,
                           compile_only=args.check_only,
-                          no_property_checks=args.no_property_checks)
+                          no_property_checks=args.no_property_checks,
+                          instrument_parsers=args.instrument_parsers,
+                          instrument_properties=args.instrument_properties)
 
         if args.check_only:
             return
@@ -22,6 +22,7 @@ not defined in the example, but relied on explicitly.
 
 from __future__ import absolute_import
 
+from collections import defaultdict
 from copy import copy
 import difflib
 import inspect
@@ -44,11 +45,30 @@ from langkit.utils import (Colors, assert_type, common_ancestor, copy_with,
 class GeneratedParser(object):
     """Simple holder for generated parsers."""
 
-    def __init__(self, name, spec, body):
+    def __init__(self, name, spec, body, memo_pkg, memo_type):
         self.name = name
         self.spec = spec
         self.body = body
 
+        self.memo_pkg = memo_pkg
+        """
+        Name of the Packrat package instantiation that provides the
+        memoization table type for this parser, or None if this parser is not
+        memoized.
+
+        :type: str|None
+        """
+
+        self.memo_type = memo_type
+        """
+        Name of the Ada type for the memoization table of this parser, or None
+        if this parser is not memoized. Such tables are stored in the parser
+        private part, so that each parser instance has its own memoization
+        tables.
+
+        :type: str|None
+        """
+
 
 def render(*args, **kwargs):
     return compiled_types.make_renderer().update({
@@ -199,6 +219,79 @@ class Grammar(object):
         """
         return Defer(rule_name, lambda: self.get_rule(rule_name))
 
+    def get_memoized_rules(self):
+        """
+        Return a set of names for all rules whose parsing function needs a
+        memoization table.
+
+        Memoization is useful only for rules that can be tried more than once
+        at the same token index. This can happen only for rules that are
+        referenced under a parser that backtracks (Or, Opt or List), for
+        left-recursive rules that use seed-growing (whose parsing function is
+        re-run at the same token index until it stops making progress) and for
+        rules that are referenced by one of these.
+
+        :rtype: set[str]
+        """
+        memoized_rules = set()
+
+        # For each rule name, set of names for the rules it references
+        references = {}
+
+        def visit_parser(rule_name, parser, backtracking):
+            """
+            Visit all subparsers in "parser" to register the rules it
+            references and the ones that need memoization.
+
+            :param str rule_name: Name of the rule that contains "parser".
+            :param Parser parser: Parser to visit.
+            :param bool backtracking: Whether "parser" is under a parser that
+                backtracks in this rule.
+            """
+            if isinstance(parser, Defer) or parser.is_root:
+                references[rule_name].add(parser.name)
+                if backtracking:
+                    memoized_rules.add(parser.name)
+                return
+
+            backtracking = backtracking or isinstance(parser, (Or, Opt, List))
+            for sub_parser in parser.children():
+                visit_parser(rule_name, sub_parser, backtracking)
+
+        for rule_name, rule_parser in self.rules.items():
+            references[rule_name] = set()
+            with rule_parser.error_context():
+                loop = (rule_parser.left_recursion_loop()
+                        if rule_parser.is_left_recursive() else None)
+                if loop:
+                    # Rules parsed with a loop do not call themselves: the
+                    # leading reference in left-recursive alternatives yields
+                    # the match so far instead.
+                    recursive_alts, other_alts = loop
+                    sub_parsers = list(chain(
+                        chain.from_iterable(alt.parser.parsers[1:]
+                                            for alt in recursive_alts),
+                        other_alts
+                    ))
+                else:
+                    sub_parsers = rule_parser.children()
+                    if rule_parser.is_left_recursive():
+                        memoized_rules.add(rule_name)
+
+                for sub_parser in sub_parsers:
+                    visit_parser(rule_name, sub_parser,
+                                 isinstance(rule_parser, (Or, Opt, List)))
+
+        # Rules referenced by memoized ones can be re-entered as well
+        worklist = list(memoized_rules)
+        while worklist:
+            for ref in references[worklist.pop()]:
+                if ref not in memoized_rules:
+                    memoized_rules.add(ref)
+                    worklist.append(ref)
+
+        return memoized_rules
+
     def get_unreferenced_rules(self):
         """
         Return a set of names for all rules that are not transitively
@@ -256,6 +349,37 @@ class Parser(object):
         self.is_root = False
         self._name = names.Name("")
 
+        self.memo_size = 16
+        """
+        Number of entries in the memoization table of the function that
+        implements this parser, or None if this table must have one entry per
+        token. Only relevant for parsers that implement grammar rules.
+
+        :type: int|None
+        """
+
+        self.is_memoized = True
+        """
+        Whether the function that implements this parser needs a memoization
+        table. Only relevant for parsers that implement grammar rules: see
+        Grammar.get_memoized_rules.
+
+        :type: bool
+        """
+
+        self.memo_ways = 1
+        """
+        Associativity of the memoization table of the function that implements
+        this parser: number of entries that can hold the results for tokens
+        whose indexes are equal modulo memo_size / memo_ways. Only relevant if
+        memo_size is not None.
+
+        :type: int
+        """
+
+        self._first_set = None
+        self._first_set_state = 'not_computed'
+
     @property
     def base_name(self):
         """
@@ -298,6 +422,65 @@ class Parser(object):
 
         return Or(*alternatives)
 
+    def memoize(self, size=16, ways=1, full=False):
+        """
+        Return a copy of this parser with specific settings for its
+        memoization table. This is relevant only for parsers that implement
+        grammar rules, for instance::
+
+            expr=Or(...).memoize(size=64, ways=4)
+
+        Memoization tables have a fixed number of entries by default: results
+        for tokens whose indexes are equal modulo `size / ways` compete for
+        the same `ways` entries. Rules that backtrack a lot can use bigger
+        tables, or tables with a higher associativity, so that they re-parse
+        the same tokens less often. Statistics about memoization tables are
+        available in the generated library to help tuning these settings.
+
+        :param int size: Number of entries in the memoization table. Must be a
+            multiple of `ways`.
+        :param int ways: Associativity for the memoization table.
+        :param bool full: If True, ignore `size` and `ways` and use instead a
+            memoization table that contains one entry per token, so that no
+            result is ever evicted. This is meant for pathological rules.
+        :rtype: Parser
+        """
+        check_source_language(
+            full or (size > 0 and ways > 0 and size % ways == 0),
+            'Invalid memoization settings: size ({}) must be a positive'
+            ' multiple of ways ({})'.format(size, ways)
+        )
+        return copy_with(self,
+                         memo_size=None if full else size,
+                         memo_ways=1 if full else ways)
+
+    @property
+    def memo_pkg(self):
+        """
+        Return the name of the Packrat package instantiation for the result
+        type of this parser.
+
+        :rtype: str
+        """
+        return '{}_Memos'.format(self.get_type().storage_type_name())
+
+    @property
+    def memo_type(self):
+        """
+        Return the name of the Ada type for the memoization table of the
+        function that implements this parser.
+
+        :rtype: str
+        """
+        kind, sets, ways = (
+            ('Full', 1, 1)
+            if self.memo_size is None else
+            ('Cache', self.memo_size / self.memo_ways, self.memo_ways)
+        )
+        return '{}.Memo_Type (Kind => {}, Sets => {}, Ways => {})'.format(
+            self.memo_pkg, kind, sets, ways
+        )
+
     def __xor__(self, transform_fn):
         """
         :type transform_fn: (T) => U
@@ -361,6 +544,56 @@ class Parser(object):
         """
         raise NotImplementedError()
 
+    # noinspection PyMethodMayBeStatic
+    def left_recursion_loop(self):
+        """
+        If this parser implements a left-recursive grammar rule that can be
+        parsed with a loop instead of with seed-growing, such as::
+
+            expr=Or(Row(A.expr, '+', A.term) ^ Plus,
+                    Row(A.expr, '-', A.term) ^ Minus,
+                    A.term)
+
+        return a couple: the list of left-recursive alternatives, each one as
+        a Transform parser whose Row starts with the reference to the rule,
+        and the list of the other alternatives. Return None otherwise.
+
+        :rtype: (list[Transform], list[Parser])|None
+        """
+        return None
+
+    def first_set(self):
+        """
+        Return the set of kinds for the tokens that can start a match for this
+        parser, as names for the corresponding Ada enumerators, or None if this
+        set is unknown.
+
+        When the result is not None, this parser is guaranteed to fail at the
+        current token if its kind is not in the set. Hence parsers that can
+        match an empty sequence of tokens must return None.
+
+        :rtype: set[str]|None
+        """
+        # Grammars are recursive: if we need the first set of this parser
+        # while computing it, consider it unknown.
+        if self._first_set_state == 'not_computed':
+            self._first_set_state = 'computing'
+            self._first_set = self._compute_first_set()
+            self._first_set_state = 'computed'
+        return self._first_set
+
+    # noinspection PyMethodMayBeStatic
+    def _compute_first_set(self):
+        """
+        Private function used only by first_set, to compute its result.
+
+        Subclasses should override this method when they can do better than
+        returning an unknown set.
+
+        :rtype: set[str]|None
+        """
+        return None
+
     # noinspection PyMethodMayBeStatic
     def children(self):
         """
@@ -399,12 +632,19 @@ class Parser(object):
             return
         get_context().fns.add(self.gen_fn_name)
 
-        t_env.parser_context = self.generate_code()
+        # Left-recursive rules that can be parsed with a loop do not need the
+        # generic (and slower) seed-growing algorithm.
+        loop = self.left_recursion_loop()
+        t_env.seed_growing = self.is_left_recursive() and not loop
+        t_env.parser_context = (self.generate_loop_code(*loop)
+                                if loop else self.generate_code())
 
         get_context().generated_parsers.append(GeneratedParser(
             self.gen_fn_name,
             render('parsers/fn_profile_ada', t_env),
-            render('parsers/fn_code_ada', t_env)))
+            render('parsers/fn_code_ada', t_env),
+            self.memo_pkg if self.is_memoized else None,
+            self.memo_type if self.is_memoized else None))
 
     def get_type(self):
         """
@@ -537,6 +777,9 @@ class Tok(Parser):
     def get_type(self):
         return Token
 
+    def _compute_first_set(self):
+        return {get_context().lexer.ada_token_name(self.val)}
+
     def generate_code(self, pos_name="pos"):
 
         # Generate the code to match the token of kind 'token_kind', and return
@@ -599,9 +842,22 @@ class Or(Parser):
         # ... and we want to memoize the result.
         self.cached_type = None
 
+        # Cache for the result of dispatch_table, so that it is available
+        # once the compilation context is gone.
+        self._dispatch_table = None
+
     def children(self):
         return self.parsers
 
+    def _compute_first_set(self):
+        result = set()
+        for parser in self.parsers:
+            first_set = parser.first_set()
+            if first_set is None:
+                return None
+            result.update(first_set)
+        return result
+
     def get_type(self):
         if self.cached_type:
             return self.cached_type
@@ -638,10 +894,138 @@ class Or(Parser):
         finally:
             self.is_processing_type = False
 
+    def left_recursion_loop(self):
+        # Seed-growing first matches one of the alternatives that are not
+        # left-recursive, and then tries to extend the match with the
+        # left-recursive ones. In order to get the same results, the
+        # left-recursive alternatives must come first, and except for the
+        # leading rule reference, no alternative can be left-recursive.
+        if not (self.is_root and self.is_left_recursive()):
+            return None
+
+        recursive_alts, other_alts = [], []
+        for alt in self.parsers:
+            if not alt._is_left_recursive(self.name):
+                other_alts.append(alt)
+                continue
+
+            if (
+                other_alts
+                or not isinstance(alt, Transform)
+                or not isinstance(alt.parser, Row)
+                or len(alt.parser.parsers) < 2
+            ):
+                return None
+
+            first, rest = alt.parser.parsers[0], alt.parser.parsers[1:]
+            if (
+                not isinstance(first, Defer)
+                or first.name != self.name
+                or Row(*rest)._is_left_recursive(self.name)
+            ):
+                return None
+
+            recursive_alts.append(alt)
+
+        return (recursive_alts, other_alts) if other_alts else None
+
+    def generate_loop_code(self, recursive_alts, other_alts):
+        """
+        Return generated code for this parser, given the result of
+        left_recursion_loop.
+
+        :param list[Transform] recursive_alts: Left-recursive alternatives.
+        :param list[Parser] other_alts: Other alternatives.
+        :rtype: ParserCodeContext
+        """
+        pos, res = gen_names('lr_pos', 'lr_res')
+
+        # First parse the leftmost operand, and then try to extend the match
+        # as long as possible. Left-recursive alternatives are rebuilt so that
+        # the rule reference yields the match so far instead of calling the
+        # rule's parsing function.
+        operand = (other_alts[0] if len(other_alts) == 1
+                   else Or(*other_alts))
+        extension = Or(*[
+            Transform(Row(LeftOperand(self, pos, res),
+                          *alt.parser.parsers[1:]),
+                      alt.typ)
+            for alt in recursive_alts
+        ])
+
+        t_env = TemplateEnvironment(
+            parser=self,
+            pos_name='pos',
+            pos=pos,
+            res=res,
+            operand=operand.gen_code_or_fncall('pos'),
+            extension=extension.generate_code('pos'),
+        )
+
+        return ParserCodeContext(
+            pos_var_name=pos,
+            res_var_name=res,
+            code=render('parsers/left_recursion_code_ada', t_env),
+            var_defs=list(chain(
+                [(pos, Token), (res, self.get_type())],
+                t_env.operand.var_defs,
+                t_env.extension.var_defs
+            ))
+        )
+
+    def dispatch_table(self):
+        """
+        Return a list of (alternative index, token kinds) couples, so that the
+        generated code can jump directly to the first alternative that can
+        start with the current token. Skipped alternatives are sure to fail at
+        the current token, so this does not change the result. For kinds that
+        are not in the table, all alternatives are tried in order.
+
+        :rtype: list[(int, list[str])]
+        """
+        if self._dispatch_table is None:
+            self._dispatch_table = self._compute_dispatch_table()
+        return self._dispatch_table
+
+    def _compute_dispatch_table(self):
+        """
+        Private function used only by dispatch_table, to compute its result.
+
+        :rtype: list[(int, list[str])]
+        """
+        first_alt = {}
+        for i, parser in enumerate(self.parsers):
+            first_set = parser.first_set()
+
+            # We know nothing about the tokens this alternative can start
+            # with, so we cannot skip it.
+            if first_set is None:
+                break
+
+            for kind in first_set:
+                first_alt.setdefault(kind, i)
+
+        # Skipped alternatives would fail at the current token, and so would
+        # update the diagnostic for the last failure. This diagnostic is
+        # superseded as soon as the chosen alternative consumes the token, but
+        # matching the termination token does not consume it: always try all
+        # alternatives in this case, so that diagnostics do not change.
+        first_alt.pop(get_context().lexer.ada_token_name('termination'), None)
+
+        # Alternatives are tried in order anyway, so there is no need to jump
+        # to the first one.
+        kinds = defaultdict(list)
+        for kind, i in first_alt.items():
+            if i > 0:
+                kinds[i].append(kind)
+        return sorted((i, sorted(k)) for i, k in kinds.items())
+
     def generate_code(self, pos_name="pos"):
         pos, res = gen_names('or_pos', 'or_res')
+        dispatch = self.dispatch_table()
         t_env = TemplateEnvironment(
             parser=self,
+            pos_name=pos_name,
 
             # List of ParserCodeContext instances for the sub-parsers,
             # encapsulating their results.
@@ -650,6 +1034,12 @@ class Or(Parser):
                 for m in self.parsers
             ],
 
+            dispatch=dispatch,
+
+            # Generate names for the labels that start the code for the
+            # sub-parsers we may jump to.
+            alt_labels={i: gen_name("Or_Alt") for i, _ in dispatch},
+
             # Generate a name for the exit label (when one of the sub-parsers
             # has matched).
             exit_label=gen_name("Exit_Or"),
@@ -754,6 +1144,11 @@ class Row(Parser):
     def children(self):
         return self.parsers
 
+    def _compute_first_set(self):
+        # If the first sub-parser cannot match an empty sequence of tokens,
+        # then it must match for this row to match.
+        return self.parsers[0].first_set() if self.parsers else None
+
     def get_type(self):
         # A Row parser never yields a concrete result itself
         return None
@@ -866,6 +1261,9 @@ class List(Parser):
     def children(self):
         return [self.parser]
 
+    def _compute_first_set(self):
+        return None if self.empty_valid else self.parser.first_set()
+
     def get_type(self):
         if self.list_cls:
             with self.error_context():
@@ -1092,6 +1490,9 @@ class Extract(Parser):
     def children(self):
         return [self.parser]
 
+    def _compute_first_set(self):
+        return self.parser.first_set()
+
     def get_type(self):
         return self.parser.parsers[self.index].get_type()
 
@@ -1123,6 +1524,9 @@ class Discard(Parser):
     def children(self):
         return [self.parser]
 
+    def _compute_first_set(self):
+        return self.parser.first_set()
+
     def get_type(self):
         # Discard parsers return nothing!
         return None
@@ -1169,6 +1573,9 @@ class Defer(Parser):
     def get_type(self):
         return self.parser.get_type()
 
+    def _compute_first_set(self):
+        return self.parser.first_set()
+
     def generate_code(self, pos_name="pos"):
         return self.parser.gen_code_or_fncall(pos_name=pos_name)
 
@@ -1197,6 +1604,9 @@ class Transform(Parser):
     def children(self):
         return [self.parser]
 
+    def _compute_first_set(self):
+        return self.parser.first_set()
+
     def get_type(self):
         return self.typ
 
@@ -1314,6 +1724,44 @@ class Null(Parser):
         )
 
 
+class LeftOperand(Parser):
+    """
+    Parser that stands for the leading rule reference in the left-recursive
+    alternatives of a rule that is parsed with a loop: it matches the tokens
+    that were matched so far and yields the corresponding result.
+    """
+
+    def __init__(self, rule, pos, res):
+        """
+        :param Parser rule: Parser for the left-recursive rule.
+        :param names.Name pos: Name of the variable that contains the
+            position after the tokens matched so far.
+        :param names.Name res: Name of the variable that contains the result
+            for the tokens matched so far.
+        """
+        Parser.__init__(self)
+        self.rule = rule
+        self.pos = pos
+        self.res = res
+
+    def _is_left_recursive(self, rule_name):
+        return False
+
+    def __repr__(self):
+        return "LeftOperand({0})".format(self.rule.name)
+
+    def get_type(self):
+        return self.rule.get_type()
+
+    def generate_code(self, pos_name="pos"):
+        return ParserCodeContext(
+            pos_var_name=self.pos,
+            res_var_name=self.res,
+            code='',
+            var_defs=[]
+        )
+
+
 class Enum(Parser):
     """Wrapper parser used to return an enumeration value for a match."""
 
@@ -1339,6 +1787,9 @@ class Enum(Parser):
     def children(self):
         return []
 
+    def _compute_first_set(self):
+        return self.parser.first_set() if self.parser else None
+
     def get_type(self):
         return type(self.enum_type_inst)
 
@@ -9,6 +9,8 @@ package body Langkit_Support.Bump_Ptr is
 
    procedure Dealloc is new Ada.Unchecked_Deallocation
      (Bump_Ptr_Pool_Type, Bump_Ptr_Pool);
+   procedure Dealloc is new Ada.Unchecked_Deallocation
+     (Page_Cache_Type, Page_Cache);
 
    function Align (Size, Alignment : Storage_Offset) return Storage_Offset
      with Inline;
@@ -27,13 +29,134 @@ package body Langkit_Support.Bump_Ptr is
       end if;
    end Align;
 
+   ---------------------
+   -- Page_Cache_Type --
+   ---------------------
+
+   protected body Page_Cache_Type is
+
+      ---------
+      -- Get --
+      ---------
+
+      procedure Get (Page : out Page_Ptr) is
+      begin
+         if Length (Free_Pages) > 0 then
+            Page := Pop (Free_Pages);
+            Recycled_Pages := Recycled_Pages + 1;
+         else
+            Page := System.Memory.Alloc (Page_Size);
+            Allocated_Pages := Allocated_Pages + 1;
+         end if;
+      end Get;
+
+      ---------
+      -- Put --
+      ---------
+
+      procedure Put (Pages : Pages_Vector.Vector) is
+      begin
+         for PI in First_Index (Pages) .. Last_Index (Pages) loop
+            if Length (Free_Pages) < Max_Cached_Pages then
+               Append (Free_Pages, Pages_Vector.Get (Pages, PI));
+            else
+               Free (Pages_Vector.Get (Pages, PI));
+            end if;
+         end loop;
+      end Put;
+
+      -------------
+      -- Inc_Ref --
+      -------------
+
+      procedure Inc_Ref is
+      begin
+         Ref_Count := Ref_Count + 1;
+      end Inc_Ref;
+
+      -------------
+      -- Dec_Ref --
+      -------------
+
+      procedure Dec_Ref (Last : out Boolean) is
+      begin
+         Ref_Count := Ref_Count - 1;
+         Last := Ref_Count = 0;
+      end Dec_Ref;
+
+      -----------
+      -- Clear --
+      -----------
+
+      procedure Clear is
+      begin
+         for PI in First_Index (Free_Pages) .. Last_Index (Free_Pages) loop
+            Free (Pages_Vector.Get (Free_Pages, PI));
+         end loop;
+         Destroy (Free_Pages);
+      end Clear;
+
+      ----------------
+      -- Statistics --
+      ----------------
+
+      function Statistics return Page_Cache_Statistics is
+        ((Cached_Pages    => Length (Free_Pages),
+          Recycled_Pages  => Recycled_Pages,
+          Allocated_Pages => Allocated_Pages));
+
+   end Page_Cache_Type;
+
+   -----------------------
+   -- Create_Page_Cache --
+   -----------------------
+
+   function Create_Page_Cache return Page_Cache is
+   begin
+      return new Page_Cache_Type;
+   end Create_Page_Cache;
+
+   -------------
+   -- Release --
+   -------------
+
+   procedure Release (Cache : in out Page_Cache) is
+      Last : Boolean;
+   begin
+      if Cache = No_Page_Cache then
+         return;
+      end if;
+
+      Cache.Dec_Ref (Last);
+      if Last then
+         Cache.Clear;
+         Dealloc (Cache);
+      end if;
+      Cache := No_Page_Cache;
+   end Release;
+
+   ----------------
+   -- Statistics --
+   ----------------
+
+   function Statistics (Cache : Page_Cache) return Page_Cache_Statistics is
+   begin
+      return Cache.Statistics;
+   end Statistics;
+
    ------------
    -- Create --
    ------------
 
-   function Create return Bump_Ptr_Pool is
+   function Create (Cache : Page_Cache := No_Page_Cache) return Bump_Ptr_Pool
+   is
+      Result : constant Bump_Ptr_Pool := new Bump_Ptr_Pool_Type;
    begin
-      return new Bump_Ptr_Pool_Type;
+      if Cache /= No_Page_Cache then
+         Cache.Inc_Ref;
+         Result.Cache := Cache;
+      end if;
+      return Result;
    end Create;
 
    ----------
@@ -46,18 +169,56 @@ package body Langkit_Support.Bump_Ptr is
          return;
       end if;
 
-      --  Free every page allocated
+      --  Give pages back to the cache if there is one, and free them
+      --  otherwise. Large objects have various sizes, so they are never
+      --  cached.
 
-      --  TODO: Might be interresting at some point to keep a global cache of
-      --  pages ourself, since we always use the same size.
+      if Pool.Cache /= No_Page_Cache then
+         Pool.Cache.Put (Pool.Pages);
+         Release (Pool.Cache);
+      else
+         for PI in First_Index (Pool.Pages) .. Last_Index (Pool.Pages) loop
+            Free (Get (Pool.Pages, PI));
+         end loop;
+      end if;
+      Destroy (Pool.Pages);
 
-      for PI in First_Index (Pool.Pages) .. Last_Index (Pool.Pages) loop
-         Free (Get (Pool.Pages, PI));
+      for PI in First_Index (Pool.Large_Objects)
+                .. Last_Index (Pool.Large_Objects)
+      loop
+         Free (Get (Pool.Large_Objects, PI));
       end loop;
-      Destroy (Pool.Pages);
+      Destroy (Pool.Large_Objects);
+
       Dealloc (Pool);
    end Free;
 
+   ---------
+   -- "+" --
+   ---------
+
+   function "+" (Left, Right : Pool_Statistics) return Pool_Statistics is
+     ((Pages         => Left.Pages + Right.Pages,
+       Large_Objects => Left.Large_Objects + Right.Large_Objects,
+       Bytes_Used    => Left.Bytes_Used + Right.Bytes_Used,
+       Bytes_Wasted  => Left.Bytes_Wasted + Right.Bytes_Wasted));
+
+   ----------------
+   -- Statistics --
+   ----------------
+
+   function Statistics (Pool : Bump_Ptr_Pool) return Pool_Statistics is
+   begin
+      if Pool = No_Pool then
+         return (others => <>);
+      end if;
+
+      return (Pages         => Length (Pool.Pages),
+              Large_Objects => Length (Pool.Large_Objects),
+              Bytes_Used    => Pool.Bytes_Used,
+              Bytes_Wasted  => Pool.Bytes_Wasted);
+   end Statistics;
+
    --------------
    -- Allocate --
    --------------
@@ -68,30 +229,41 @@ package body Langkit_Support.Bump_Ptr is
       Obj_Offset : Storage_Offset;
    begin
 
+      Pool.Bytes_Used := Pool.Bytes_Used + S;
+
       --  If the required size is bigger than the page size, we'll allocate a
-      --  special page the size of the required object. Basically we fall-back
-      --  on regular alloc mechanism, but this ensures that we can handle all
-      --  allocations transparently via this allocator.
+      --  special block the size of the required object. Basically we
+      --  fall-back on regular alloc mechanism, but this ensures that we can
+      --  handle all allocations transparently via this allocator.
 
       if S > Page_Size then
          declare
             Mem : constant System.Address := System.Memory.Alloc (size_t (S));
          begin
 
-            --  Append the allocated memory to the pool pages, so that it is
-            --  freed on pool free, but don't touch at the current_page, so
-            --  it can keep being used next time.
+            --  Keep track of the allocated memory so that it is freed on pool
+            --  free, but don't touch at the current_page, so it can keep being
+            --  used next time.
 
-            Append (Pool.Pages, Mem);
+            Append (Pool.Large_Objects, Mem);
             return Mem;
          end;
       end if;
 
-      --  When we don't have enough space to allocate the chunk, allocate a new
-      --  page.
+      --  When we don't have enough space to allocate the chunk, get a new
+      --  page, preferably from the page cache.
 
       if Page_Size - Pool.Current_Offset < S then
-         Pool.Current_Page := System.Memory.Alloc (Page_Size);
+         if Length (Pool.Pages) > 0 then
+            Pool.Bytes_Wasted :=
+               Pool.Bytes_Wasted + (Page_Size - Pool.Current_Offset);
+         end if;
+
+         if Pool.Cache /= No_Page_Cache then
+            Pool.Cache.Get (Pool.Current_Page);
+         else
+            Pool.Current_Page := System.Memory.Alloc (Page_Size);
+         end if;
          Append (Pool.Pages, Pool.Current_Page);
          Pool.Current_Offset := 0;
       end if;
@@ -1,3 +1,7 @@
+with System.Storage_Elements; use System.Storage_Elements;
+
+with Ada.Containers.Hashed_Sets;
+
 with Langkit_Support.Array_Utils;
 
 package body Langkit_Support.Lexical_Env is
@@ -10,12 +14,120 @@ package body Langkit_Support.Lexical_Env is
    --  Helpers for Env_Getters. TODO: To be removed when we remove ref-counting
    --  from lexical envs.
 
-   function Decorate
-     (Els              : Env_Element_Array;
-      MD               : Element_Metadata;
-      Parents_Bindings : Env_Rebindings) return Env_Element_Array;
-   --  From an array of Env_Elements, decorate every element with additional
-   --  Metadata stored in MD.
+   function Get_Uncached
+     (Self      : Lexical_Env;
+      Key       : Symbol_Type;
+      From      : Element_T;
+      Recursive : Boolean;
+      Owners    : access Element_Array_Access := null)
+      return Env_Element_Array;
+   --  Implementation of Get that does not use the lookup cache of Self. If
+   --  Owners is not null, set it to a new array for the nodes that the lookup
+   --  passed to Env_Visited, or to null if the lookup evaluated dynamic env
+   --  getters: these can depend on more than environments, so the result
+   --  must not be cached.
+
+   procedure Destroy (Result : in out Lookup_Cache_Result);
+   --  Free the arrays that Result holds
+
+   procedure Clear (Cache : Lookup_Cache_Access);
+   --  Remove all entries from Cache and free the arrays they hold
+
+   function Key_Bits (Key : Symbol_Type) return Key_Filter
+     with Inline;
+   --  Return the bits that Key sets in a Key_Filter
+
+   function May_Contain (Filter, Bits : Key_Filter) return Boolean
+   is ((Filter and Bits) = Bits)
+     with Inline;
+   --  Return whether a key for which Key_Bits returns Bits may be in the set
+   --  that Filter represents.
+
+   function Keys_Summary (Self : Lexical_Env) return Key_Filter;
+   --  Return the Keys_Summary filter for Self, updating it first if it is
+   --  stale. Return an empty filter if Self is null.
+
+   Lookup_Cache_Enabled : Boolean := False with Atomic;
+   Current_Generation   : Lookup_Generation := 0 with Atomic;
+   --  Global state for lookup caches. Lookup caches whose generation is not
+   --  Current_Generation are stale. Lookups read these without locking, and
+   --  Lookup_State serializes updates to Current_Generation.
+
+   protected Lookup_State is
+      procedure Invalidate;
+      --  Increment Current_Generation
+
+      procedure Count (Hit, Invalidated : Boolean);
+      --  Update statistics for a call to Get that used a lookup cache.
+      --  Hit tells whether the cache had the result, and Invalidated whether
+      --  the cache was discarded first.
+
+      function Stats return Lookup_Cache_Statistics;
+
+      procedure Reset_Stats;
+
+   private
+      Cache_Stats : Lookup_Cache_Statistics;
+   end Lookup_State;
+
+   function Hash (Self : Lexical_Env) return Hash_Type is
+     (if Self = null
+      then 0
+      else Hash_Type'Mod (To_Integer (Self.all'Address)));
+
+   function Hash (Self : Env_Rebindings) return Hash_Type;
+   --  Hash the bindings that Self contains
+
+   function Equivalent_Rebindings (L, R : Env_Rebindings) return Boolean is
+     (L.Rebindings = R.Rebindings);
+
+   package Rebindings_Sets is new Ada.Containers.Hashed_Sets
+     (Element_Type        => Env_Rebindings,
+      Hash                => Hash,
+      Equivalent_Elements => Equivalent_Rebindings,
+      "="                 => Equivalent_Rebindings);
+
+   type Rebindings_Pair is record
+      L, R : Env_Rebindings;
+   end record;
+
+   function Hash (Pair : Rebindings_Pair) return Hash_Type is
+     (Hash_Type'Mod (To_Integer (Pair.L.all'Address)) * 31
+      + Hash_Type'Mod (To_Integer (Pair.R.all'Address)));
+
+   package Combinations_Maps is new Ada.Containers.Hashed_Maps
+     (Key_Type        => Rebindings_Pair,
+      Element_Type    => Env_Rebindings,
+      Hash            => Hash,
+      Equivalent_Keys => "=");
+
+   protected Rebindings_Table is
+      procedure Intern
+        (Bindings : Env_Rebindings_Array; Result : out Env_Rebindings);
+      --  Set Result to the rebindings in Interned that contain Bindings,
+      --  creating it if needed. This returns a borrowed reference.
+
+      procedure Create
+        (Bindings : Env_Rebindings_Array; Result : out Env_Rebindings);
+      --  Likewise, but return a new reference
+
+      procedure Combine (L, R : Env_Rebindings; Result : out Env_Rebindings);
+      --  Set Result to the combination of L and R, which must both contain
+      --  bindings. This returns a borrowed reference.
+
+      procedure Clear;
+      --  Drop the references that Interned owns and empty both tables
+
+   private
+      Interned : Rebindings_Sets.Set;
+      --  Table for hash-consed rebindings. It owns one reference to each
+      --  element.
+
+      Combinations : Combinations_Maps.Map;
+      --  Results of Combine for non-trivial combinations. As rebindings are
+      --  never freed while they are in Interned, access values are stable
+      --  keys.
+   end Rebindings_Table;
 
    ------------
    -- Create --
@@ -50,31 +162,6 @@ package body Langkit_Support.Lexical_Env is
       return Internal_Unwrap (Els);
    end Unwrap;
 
-   --------------
-   -- Decorate --
-   --------------
-
-   function Decorate
-     (Els              : Env_Element_Array;
-      MD               : Element_Metadata;
-      Parents_Bindings : Env_Rebindings) return Env_Element_Array
-   is
-      function Decorate_Element (El : Env_Element) return Env_Element
-      is
-        (Env_Element'
-           (El.El,
-            Combine (El.MD, MD),
-            Parents_Bindings =>
-               Combine (El.Parents_Bindings, Parents_Bindings),
-            Is_Null          => False));
-
-      function Internal_Decorate
-      is new Env_Element_Arrays.Id_Map_Gen (Decorate_Element)
-        with Inline;
-   begin
-      return Internal_Decorate (Els);
-   end Decorate;
-
    ------------
    -- Create --
    ------------
@@ -97,6 +184,11 @@ package body Langkit_Support.Lexical_Env is
          Env             => new Internal_Envs.Map,
          Default_MD                 => Default_MD,
          Parents_Rebindings         => null,
+         Lookup_Cache               => null,
+         Own_Keys                   => 0,
+         Keys_Summary               => 0,
+         Summary_Generation         => Current_Generation - 1,
+         Version                    => 0,
          Ref_Count       => (if Is_Refcounted then 1 else No_Refcount));
    end Create;
 
@@ -123,6 +215,10 @@ package body Langkit_Support.Lexical_Env is
          return;
       end if;
 
+      Invalidate_Lookup_Caches;
+      Self.Version := Self.Version + 1;
+      Env_Modified (Self.Node);
+      Self.Own_Keys := Self.Own_Keys or Key_Bits (Key);
       Self.Env.Insert (Key, Env_Element_Vectors.Empty_Vector, C, Dummy);
       Append (Reference (Self.Env.all, C).Element.all, Env_El);
    end Add;
@@ -138,6 +234,10 @@ package body Langkit_Support.Lexical_Env is
    is
       V : constant Internal_Envs.Reference_Type := Self.Env.Reference (Key);
    begin
+      Invalidate_Lookup_Caches;
+      Self.Version := Self.Version + 1;
+      Env_Modified (Self.Node);
+
       --  Get rid of element
       for I in 1 .. V.Length loop
          if V.Get (I).El = Value then
@@ -147,8 +247,44 @@ package body Langkit_Support.Lexical_Env is
       end loop;
    end Remove;
 
-   package Referenced_Envs_Arrays is new Langkit_Support.Array_Utils
-     (Referenced_Env, Positive, Referenced_Envs_Vectors.Elements_Array);
+   ------------------
+   -- Get_Uncached --
+   ------------------
+
+   function Get_Uncached
+     (Self      : Lexical_Env;
+      Key       : Symbol_Type;
+      From      : Element_T;
+      Recursive : Boolean;
+      Owners    : access Element_Array_Access := null)
+      return Env_Element_Array
+   is
+      I      : Lookup_Iterator;
+      El     : Env_Element;
+      Result : Env_Element_Vectors.Vector;
+   begin
+      I.Key := Key;
+      I.From := From;
+      I.Collect_Owners := Owners /= null;
+      Push_Frame (I, Self, From, Recursive);
+
+      while Next (I, El) loop
+         Append (Result, El);
+      end loop;
+
+      if Owners /= null then
+         Owners.all :=
+           (if I.Used_Dynamic_Getters
+            then null
+            else new Element_Array'
+                   (Element_Array (Element_Vectors.To_Array (I.Owners))));
+         Element_Vectors.Destroy (I.Owners);
+      end if;
+
+      return Ret : constant Env_Element_Array := To_Array (Result) do
+         Destroy (Result);
+      end return;
+   end Get_Uncached;
 
    ---------
    -- Get --
@@ -160,111 +296,493 @@ package body Langkit_Support.Lexical_Env is
       From          : Element_T := No_Element;
       Recursive     : Boolean := True) return Env_Element_Array
    is
-      use Internal_Envs;
-      use Env_Element_Arrays;
+      use Lookup_Cache_Maps;
 
-      use Referenced_Envs_Arrays;
-
-      function Get_Ref_Env_Elements
-        (Self : Referenced_Env) return Env_Element_Array;
+      Generation  : constant Lookup_Generation := Current_Generation;
+      Cache       : Lookup_Cache_Access;
+      C           : Cursor;
+      Invalidated : Boolean := False;
+   begin
+      --  Only cache lookups without origin point, as filtering depends on it,
+      --  and only in environments owned by analysis units: ref-counted ones
+      --  are usually short-lived.
+
+      if not Lookup_Cache_Enabled
+        or else Self = null
+        or else Self = Empty_Env
+        or else From /= No_Element
+        or else Self.Ref_Count /= No_Refcount
+      then
+         return Get_Uncached (Self, Key, From, Recursive);
+      end if;
 
-      function Get_Own_Elements
-        (Self : Lexical_Env) return Env_Element_Array;
-      --  Return the elements for Key contained by the internal map contained
-      --  in this env.
+      if Self.Lookup_Cache = null then
+         Self.Lookup_Cache :=
+           new Lookup_Cache_Type'(Generation => Generation, Entries => <>);
+      elsif Self.Lookup_Cache.Generation /= Generation then
+         Clear (Self.Lookup_Cache);
+         Self.Lookup_Cache.Generation := Generation;
+         Invalidated := True;
+      end if;
+      Cache := Self.Lookup_Cache;
+
+      C := Cache.Entries.Find (Key);
+      if Has_Element (C) and then Element (C) (Recursive).Elements /= null
+      then
+         Lookup_State.Count (Hit => True, Invalidated => Invalidated);
+         declare
+            Cached : Lookup_Cache_Result renames Element (C) (Recursive);
+         begin
+            for Node of Cached.Owners.all loop
+               Env_Visited (Node);
+            end loop;
+            return Cached.Elements.all;
+         end;
+      end if;
+      Lookup_State.Count (Hit => False, Invalidated => Invalidated);
 
-      function Get_Ref_Env_Elements
-        (Self : Referenced_Env) return Env_Element_Array is
+      declare
+         Owners : aliased Element_Array_Access;
+         Result : constant Env_Element_Array :=
+           Get_Uncached (Self, Key, From, Recursive, Owners'Access);
+         Ent    : Lookup_Cache_Entry := (others => (null, null));
       begin
+         --  Computing the result can modify environments, for instance when
+         --  dynamic env getters load units: do not cache it in this case, as
+         --  it may already be stale. Do not cache results that involve
+         --  dynamic env getters either (Owners is null then, see
+         --  Get_Uncached): they depend on more than environments.
+
+         if Current_Generation = Generation and then Owners /= null then
+            C := Cache.Entries.Find (Key);
+            if Has_Element (C) then
+               Ent := Element (C);
+               Destroy (Ent (Recursive));
+
+            --  Keep memory usage bounded: when the cache is full, start over
+            --  with an empty one.
+
+            elsif Cache.Entries.Length >= Max_Lookup_Cache_Keys then
+               Clear (Cache);
+            end if;
+            Ent (Recursive) := (new Env_Element_Array'(Result), Owners);
+            Cache.Entries.Include (Key, Ent);
+         else
+            Destroy (Owners);
+         end if;
+
+         return Result;
+      end;
+   end Get;
+
+   ---------
+   -- Get --
+   ---------
+
+   function Get
+     (Self : Lexical_Env;
+      Key  : Symbol_Type;
+      From : Element_T := No_Element;
+      Recursive     : Boolean := True) return Element_Array is
+   begin
+      return Unwrap (Get (Self, Key, From, Recursive));
+   end Get;
+
+   procedure Push_Frame
+     (I         : in out Lookup_Iterator;
+      Env       : Lexical_Env;
+      From      : Element_T;
+      Recursive : Boolean);
+   --  Push on I's stack a frame to look up Env, unless it is null
+
+   procedure Visit
+     (I          : in out Lookup_Iterator;
+      Env        : Lexical_Env;
+      First_Time : out Boolean);
+   --  Pass the node that owns Env to Env_Visited, unless the content of Env
+   --  cannot change (Empty_Env, or environments with neither node nor own
+   --  elements, as made by Group). Set First_Time to whether this is the
+   --  first call for Env during the lookup that I performs, and do nothing
+   --  otherwise.
+
+   procedure Visit_Transitive (I : in out Lookup_Iterator; Env : Lexical_Env);
+   --  Call Visit for Env and for the environments it transitively
+   --  references, recursively. This is for lookups that skip Env thanks to
+   --  its keys summary, which depends on all of them.
+
+   procedure Set_Frame
+     (Frame                          : out Lookup_Frame;
+      Key                            : Symbol_Type;
+      Own_Visited, Recursive_Visited : in out Env_Set;
+      Env                            : Lexical_Env;
+      From                           : Element_T;
+      Recursive                      : Boolean);
+   --  Initialize Frame to look up Key in Env, which must not be null. If the
+   --  lookup that Own_Visited and Recursive_Visited belong to already
+   --  processed Env, Frame only processes what remains to be done, if
+   --  anything.
 
-         --  If the referenced environment has an origin point, and the client
-         --  passed an origin from the request, see if the environment is
-         --  reachable.
+   ------------
+   -- Insert --
+   ------------
+
+   procedure Insert
+     (Self     : in out Env_Set;
+      Env      : Lexical_Env;
+      Inserted : out Boolean)
+   is
+      Position : Env_Sets.Cursor;
+   begin
+      if Self.Large /= null then
+         Self.Large.Insert (Env, Position, Inserted);
+         return;
+      end if;
 
-         if Self.From_Node /= No_Element
-           and then From /= No_Element
-           and then not Can_Reach (Self.From_Node, From)
-         then
-            return Env_Element_Arrays.Empty_Array;
+      for E of Self.Small loop
+         if E = Env then
+            Inserted := False;
+            return;
          end if;
+      end loop;
+      Inserted := True;
+
+      if Env_Vectors.Length (Self.Small) < Small_Env_Set_Capacity then
+         Env_Vectors.Append (Self.Small, Env);
+      else
+         Self.Large := new Env_Sets.Set;
+         for E of Self.Small loop
+            Self.Large.Insert (E);
+         end loop;
+         Self.Large.Insert (Env);
+         Env_Vectors.Clear (Self.Small);
+      end if;
+   end Insert;
 
-         return Get (Self.Env, Key, From, Recursive => False);
-      end Get_Ref_Env_Elements;
+   -------------
+   -- Destroy --
+   -------------
 
-      ----------------------
-      -- Get_Own_Elements --
-      ----------------------
+   procedure Destroy (Self : in out Env_Set) is
+      procedure Free is new Ada.Unchecked_Deallocation
+        (Env_Sets.Set, Env_Set_Access);
+   begin
+      Env_Vectors.Destroy (Self.Small);
+      Free (Self.Large);
+   end Destroy;
 
-      function Get_Own_Elements
-        (Self : Lexical_Env) return Env_Element_Array
-      is
-         C : Cursor := Internal_Envs.No_Element;
-      begin
-         if Self.Env /= null then
-            C := Self.Env.Find (Key);
+   ---------------
+   -- Set_Frame --
+   ---------------
+
+   procedure Set_Frame
+     (Frame                          : out Lookup_Frame;
+      Key                            : Symbol_Type;
+      Own_Visited, Recursive_Visited : in out Env_Set;
+      Env                            : Lexical_Env;
+      From                           : Element_T;
+      Recursive                      : Boolean)
+   is
+      use Internal_Envs;
+
+      C        : Cursor := Internal_Envs.No_Element;
+      Inserted : Boolean;
+   begin
+      Frame := (Env       => Env,
+                From      => From,
+                Recursive => Recursive,
+                Step      => Own_Elements,
+                Own_Done  => False,
+                Elements  => Env_Element_Vectors.Empty_Vector,
+                Index     => 0);
+
+      --  A recursive lookup in Env covers everything a non-recursive one
+      --  covers, plus referenced environments and parents. Processing any of
+      --  them twice would only yield duplicate elements, so skip what the
+      --  current lookup has already processed: this matters for
+      --  diamond-shaped or cyclic graphs of environments.
+
+      if Recursive then
+         Insert (Recursive_Visited, Env, Inserted);
+         if not Inserted then
+            Frame.Step := Done;
+            return;
+         end if;
+      end if;
+
+      Insert (Own_Visited, Env, Inserted);
+      if not Inserted then
+         if Recursive then
+            Frame.Step := Referenced;
+            Frame.Own_Done := True;
+            Frame.Index := 1;
+         else
+            Frame.Step := Done;
          end if;
+         return;
+      end if;
 
-         return
-           (if Has_Element (C)
-            then Decorate
+      if Env.Env /= null
+        and then May_Contain (Env.Own_Keys, Key_Bits (Key))
+      then
+         C := Env.Env.Find (Key);
+      end if;
 
-            --  We want to reverse the returned array, so that last inserted
-            --  results are returned first.
+      --  Own elements are processed backwards, so that last inserted results
+      --  come first.
 
-              (Reverse_Array
-                 (Env_Element_Vectors.To_Array (Element (C))),
-               Self.Default_MD,
-               Self.Parents_Rebindings)
+      if Has_Element (C) then
+         Frame.Elements := Element (C);
+         Frame.Index := Last_Index (Frame.Elements);
+      end if;
+   end Set_Frame;
 
-            else Env_Element_Arrays.Empty_Array);
-      end Get_Own_Elements;
+   -----------
+   -- Visit --
+   -----------
 
-      function Get_Refd_Elements
-      is new Referenced_Envs_Arrays.Flat_Map_Gen
-        (Env_Element, Env_Element_Array, Get_Ref_Env_Elements);
-      --  Return the concatenation of Get_Own_Elements for this env and every
-      --  parent.
+   procedure Visit
+     (I          : in out Lookup_Iterator;
+      Env        : Lexical_Env;
+      First_Time : out Boolean) is
+   begin
+      Insert (I.Reported, Env, First_Time);
+      if First_Time
+        and then Env /= Empty_Env
+        and then (Env.Node /= No_Element or else Env.Env /= null)
+      then
+         Env_Visited (Env.Node);
+         if I.Collect_Owners then
+            Element_Vectors.Append (I.Owners, Env.Node);
+         end if;
+      end if;
+   end Visit;
 
-      function Can_Reach_F (El : Env_Element) return Boolean is
-        (Can_Reach (El.El, From));
+   ----------------------
+   -- Visit_Transitive --
+   ----------------------
 
+   procedure Visit_Transitive (I : in out Lookup_Iterator; Env : Lexical_Env)
+   is
+      First_Time : Boolean;
    begin
-      if Self = null then
-         return Env_Element_Arrays.Empty_Array;
+      Visit (I, Env, First_Time);
+      if First_Time then
+         for Ref_Env of Env.Transitive_Referenced_Envs loop
+            Visit_Transitive (I, Ref_Env.Env);
+         end loop;
       end if;
+   end Visit_Transitive;
 
-      declare
-         Parent_Env : constant Lexical_Env := Get_Env (Self.Parent);
-         Ret : constant Env_Element_Array :=
-           Get_Own_Elements (Self)
-           & (if Recursive
-              then Get_Refd_Elements
-                (Referenced_Envs_Vectors.To_Array (Self.Referenced_Envs))
-              else Env_Element_Arrays.Empty_Array)
-           & Get_Refd_Elements
-           (Referenced_Envs_Vectors.To_Array (Self.Transitive_Referenced_Envs))
-           & (if Recursive
-              then Get (Parent_Env, Key)
-              else Env_Element_Arrays.Empty_Array);
-      begin
-         --  Only filter if a non null value was given for the From parameter
-         return (if From = No_Element then Ret
-                 else Env_Element_Arrays.Filter (Ret, Can_Reach_F'Access));
-      end;
-   end Get;
+   ----------------
+   -- Push_Frame --
+   ----------------
 
-   ---------
-   -- Get --
-   ---------
+   procedure Push_Frame
+     (I         : in out Lookup_Iterator;
+      Env       : Lexical_Env;
+      From      : Element_T;
+      Recursive : Boolean)
+   is
+      Frame      : Lookup_Frame;
+      First_Time : Boolean;
+   begin
+      if Env = null then
+         return;
 
-   function Get
-     (Self : Lexical_Env;
-      Key  : Symbol_Type;
-      From : Element_T := No_Element;
-      Recursive     : Boolean := True) return Element_Array is
+      --  Frames for non-recursive lookups cover only Env and the
+      --  environments it transitively references: skip them altogether when
+      --  these cannot contain the key.
+
+      elsif Recursive
+            or else May_Contain (Keys_Summary (Env), Key_Bits (I.Key))
+      then
+         Visit (I, Env, First_Time);
+         Set_Frame (Frame, I.Key, I.Own_Visited, I.Recursive_Visited, Env,
+                    From, Recursive);
+         Lookup_Frame_Vectors.Append (I.Frames, Frame);
+
+      else
+         Visit_Transitive (I, Env);
+      end if;
+   end Push_Frame;
+
+   ------------
+   -- Lookup --
+   ------------
+
+   function Lookup
+     (Self      : Lexical_Env;
+      Key       : Symbol_Type;
+      From      : Element_T := No_Element;
+      Recursive : Boolean := True) return Lookup_Iterator is
    begin
-      return Unwrap (Get (Self, Key, From, Recursive));
-   end Get;
+      return I : Lookup_Iterator do
+         I.Key := Key;
+         I.From := From;
+         Push_Frame (I, Self, From, Recursive);
+      end return;
+   end Lookup;
+
+   ----------
+   -- Next --
+   ----------
+
+   overriding function Next
+     (I       : in out Lookup_Iterator;
+      Element : out Env_Element) return Boolean
+   is
+      use Lookup_Frame_Vectors;
+   begin
+      while Length (I.Frames) > 0 loop
+         declare
+            Frame : Lookup_Frame renames
+               Get_Access (I.Frames, Last_Index (I.Frames)).all;
+         begin
+            case Frame.Step is
+               when Own_Elements =>
+                  if Frame.Index > 0 then
+                     declare
+                        El : constant Env_Element :=
+                           Get (Frame.Elements, Frame.Index);
+                     begin
+                        Frame.Index := Frame.Index - 1;
+
+                        --  Only filter if a non null value was given for the
+                        --  From parameter.
+
+                        if I.From = No_Element
+                          or else Can_Reach (El.El, I.From)
+                        then
+                           Element :=
+                             (El.El,
+                              Combine (El.MD, Frame.Env.Default_MD),
+                              Parents_Bindings =>
+                                 Combine (El.Parents_Bindings,
+                                          Frame.Env.Parents_Rebindings),
+                              Is_Null          => False);
+                           return True;
+                        end if;
+                     end;
+                  else
+                     Frame.Step := (if Frame.Recursive
+                                    then Referenced
+                                    else Transitive_Referenced);
+                     Frame.Index := 1;
+                  end if;
+
+               when Referenced | Transitive_Referenced =>
+                  declare
+                     Refs : constant Referenced_Envs_Vectors.Vector :=
+                       (if Frame.Step = Referenced
+                        then Frame.Env.Referenced_Envs
+                        else Frame.Env.Transitive_Referenced_Envs);
+                     --  Shallow copy of the vector to process
+                  begin
+                     if Frame.Index <= Referenced_Envs_Vectors.Last_Index
+                                         (Refs)
+                     then
+                        declare
+                           Ref : constant Referenced_Env :=
+                              Referenced_Envs_Vectors.Get (Refs, Frame.Index);
+                           From : constant Element_T := Frame.From;
+                        begin
+                           Frame.Index := Frame.Index + 1;
+
+                           --  If the referenced environment has an origin
+                           --  point, and the client passed an origin from the
+                           --  request, see if the environment is reachable.
+                           --
+                           --  Note that pushing a frame invalidates Frame.
+
+                           if Ref.From_Node = No_Element
+                             or else From = No_Element
+                             or else Can_Reach (Ref.From_Node, From)
+                           then
+                              Push_Frame (I, Ref.Env, From, False);
+                           end if;
+                        end;
+
+                     elsif Frame.Step = Referenced
+                       and then not Frame.Own_Done
+                     then
+                        Frame.Step := Transitive_Referenced;
+                        Frame.Index := 1;
+
+                     else
+                        --  We are done with this environment: continue with
+                        --  its parent, if recursive. Like Get, do not pass the
+                        --  origin point to it.
+
+                        declare
+                           Parent_Env : constant Lexical_Env :=
+                             (if Frame.Recursive
+                              then Get_Env (Frame.Env.Parent)
+                              else null);
+                           First_Time : Boolean;
+                        begin
+                           if Frame.Recursive and then Frame.Env.Parent.Dynamic
+                           then
+                              I.Used_Dynamic_Getters := True;
+                           end if;
+
+                           if Parent_Env = null then
+                              Pop (I.Frames);
+                           else
+                              Visit (I, Parent_Env, First_Time);
+                              Set_Frame
+                                (Frame, I.Key, I.Own_Visited,
+                                 I.Recursive_Visited, Parent_Env, No_Element,
+                                 True);
+                           end if;
+                        end;
+                     end if;
+                  end;
+
+               when Done =>
+                  Pop (I.Frames);
+            end case;
+         end;
+      end loop;
+
+      Destroy (I);
+      return False;
+   end Next;
+
+   -------------
+   -- Destroy --
+   -------------
+
+   procedure Destroy (I : in out Lookup_Iterator) is
+   begin
+      Lookup_Frame_Vectors.Destroy (I.Frames);
+      Destroy (I.Own_Visited);
+      Destroy (I.Recursive_Visited);
+      Destroy (I.Reported);
+   end Destroy;
+
+   ---------------
+   -- Get_First --
+   ---------------
+
+   function Get_First
+     (Self      : Lexical_Env;
+      Key       : Symbol_Type;
+      From      : Element_T := No_Element;
+      Recursive : Boolean := True) return Env_Element
+   is
+      I      : Lookup_Iterator := Lookup (Self, Key, From, Recursive);
+      Result : Env_Element;
+   begin
+      if Next (I, Result) then
+         Destroy (I);
+         return Result;
+      else
+         return (El               => No_Element,
+                 MD               => Empty_Metadata,
+                 Parents_Bindings => null,
+                 Is_Null          => True);
+      end if;
+   end Get_First;
 
    -----------
    -- Group --
@@ -280,10 +798,22 @@ package body Langkit_Support.Lexical_Env is
            Env                        => null,
            Default_MD                 => Empty_Metadata,
            Parents_Rebindings         => null,
+           Lookup_Cache               => null,
+           Own_Keys                   => 0,
+           Keys_Summary               => 0,
+           Summary_Generation         => Current_Generation - 1,
+           Version                    => 0,
            Ref_Count                  => 1);
    begin
+      --  Do not go through Reference: nothing can reach N yet, so adding
+      --  references to it cannot change the result of any lookup and there
+      --  is no need to invalidate lookup caches.
+
       for Env of Envs loop
-         Reference (N, Env, No_Element, True);
+         Referenced_Envs_Vectors.Append
+           (N.Transitive_Referenced_Envs,
+            Referenced_Env'(No_Element, Env));
+         Inc_Ref (Env);
       end loop;
       return N;
    end Group;
@@ -295,6 +825,8 @@ package body Langkit_Support.Lexical_Env is
    procedure Destroy (Self : in out Lexical_Env) is
       procedure Free is
         new Ada.Unchecked_Deallocation (Lexical_Env_Type, Lexical_Env);
+      procedure Free is new Ada.Unchecked_Deallocation
+        (Lookup_Cache_Type, Lookup_Cache_Access);
       Refd_Env : Lexical_Env;
    begin
 
@@ -322,6 +854,18 @@ package body Langkit_Support.Lexical_Env is
       end loop;
       Referenced_Envs_Vectors.Destroy (Self.Transitive_Referenced_Envs);
 
+      if Self.Lookup_Cache /= null then
+         Clear (Self.Lookup_Cache);
+         Free (Self.Lookup_Cache);
+      end if;
+
+      --  Ref-counted environments are destroyed only once nothing references
+      --  them anymore, so destroying them cannot change any lookup result.
+
+      if Self.Ref_Count = No_Refcount then
+         Invalidate_Lookup_Caches;
+      end if;
+
       Free (Self);
    end Destroy;
 
@@ -367,6 +911,10 @@ package body Langkit_Support.Lexical_Env is
       Transitive      : Boolean   := False)
    is
    begin
+      Invalidate_Lookup_Caches;
+      Self.Version := Self.Version + 1;
+      Env_Modified (Self.Node);
+
       if Transitive then
          Referenced_Envs_Vectors.Append
            (Self.Transitive_Referenced_Envs,
@@ -379,6 +927,15 @@ package body Langkit_Support.Lexical_Env is
       Inc_Ref (To_Reference);
    end Reference;
 
+   -------------
+   -- Version --
+   -------------
+
+   function Version (Self : Lexical_Env) return Env_Version is
+   begin
+      return Self.Version;
+   end Version;
+
    -------------
    -- Get_Env --
    -------------
@@ -451,6 +1008,15 @@ package body Langkit_Support.Lexical_Env is
          Env                        => Self.Env,
          Default_MD                 => Self.Default_MD,
          Parents_Rebindings         => Self.Parents_Rebindings,
+         Lookup_Cache               => null,
+
+         --  Self can still get new keys in the map we share with it, and we
+         --  would not know: do not filter keys in this copy.
+
+         Own_Keys                   => Key_Filter'Last,
+         Keys_Summary               => 0,
+         Summary_Generation         => Current_Generation - 1,
+         Version                    => 0,
          Ref_Count                  => 1);
    end Orphan;
 
@@ -470,11 +1036,128 @@ package body Langkit_Support.Lexical_Env is
       end if;
    end Destroy;
 
+   ----------
+   -- Hash --
+   ----------
+
+   function Hash (Self : Env_Rebindings) return Hash_Type is
+      Result : Hash_Type := Hash_Type (Self.Size);
+
+      function Hash (Getter : Env_Getter) return Hash_Type is
+        (if Getter.Dynamic then 1 else Hash (Getter.Env));
+      --  Dynamic env getters have no meaningful address to hash: they still
+      --  compare correctly, but all collide.
+
+   begin
+      for B of Self.Rebindings loop
+         Result := Result * 31 + Hash (B.Old_Env);
+         Result := Result * 31 + Hash (B.New_Env);
+      end loop;
+      return Result;
+   end Hash;
+
+   ----------------------
+   -- Rebindings_Table --
+   ----------------------
+
+   protected body Rebindings_Table is
+
+      ------------
+      -- Intern --
+      ------------
+
+      procedure Intern
+        (Bindings : Env_Rebindings_Array; Result : out Env_Rebindings)
+      is
+         use Rebindings_Sets;
+
+         Key : aliased Env_Rebindings_Type :=
+           (Size       => Bindings'Length,
+            Rebindings => Bindings,
+            Ref_Count  => 1);
+         C   : constant Cursor := Interned.Find (Key'Unchecked_Access);
+      begin
+         if Has_Element (C) then
+            Result := Element (C);
+         else
+            Result := new Env_Rebindings_Type'(Key);
+            Interned.Insert (Result);
+         end if;
+      end Intern;
+
+      ------------
+      -- Create --
+      ------------
+
+      procedure Create
+        (Bindings : Env_Rebindings_Array; Result : out Env_Rebindings) is
+      begin
+         Intern (Bindings, Result);
+         Result.Ref_Count := Result.Ref_Count + 1;
+      end Create;
+
+      -------------
+      -- Combine --
+      -------------
+
+      procedure Combine (L, R : Env_Rebindings; Result : out Env_Rebindings)
+      is
+         use Combinations_Maps;
+
+         Pair : constant Rebindings_Pair := (L, R);
+         C    : constant Cursor := Combinations.Find (Pair);
+      begin
+         if Has_Element (C) then
+            Result := Element (C);
+            return;
+         end if;
+
+         declare
+            Bindings : Env_Rebindings_Array (1 .. L.Size + R.Size);
+         begin
+            Bindings (1 .. L.Size) := L.Rebindings;
+            Bindings (L.Size + 1 .. Bindings'Last) := R.Rebindings;
+            Intern (Bindings, Result);
+         end;
+         Combinations.Insert (Pair, Result);
+      end Combine;
+
+      -----------
+      -- Clear --
+      -----------
+
+      procedure Clear is
+      begin
+         Combinations.Clear;
+         for R of Interned loop
+            declare
+               Self : Env_Rebindings := R;
+            begin
+               Destroy (Self);
+            end;
+         end loop;
+         Interned.Clear;
+      end Clear;
+
+   end Rebindings_Table;
+
+   ------------
+   -- Create --
+   ------------
+
+   function Create (Bindings : Env_Rebindings_Array) return Env_Rebindings is
+      Result : Env_Rebindings;
+   begin
+      Rebindings_Table.Create (Bindings, Result);
+      return Result;
+   end Create;
+
    -------------
    -- Combine --
    -------------
 
    function Combine (L, R : Env_Rebindings) return Env_Rebindings is
+      Result : Env_Rebindings;
    begin
       if L = null and then R = null then
          return null;
@@ -484,18 +1167,18 @@ package body Langkit_Support.Lexical_Env is
          return L;
       end if;
 
-      return Ret : Env_Rebindings do
-         Ret := new Env_Rebindings_Type (L.Size + R.Size);
+      Rebindings_Table.Combine (L, R, Result);
+      return Result;
+   end Combine;
 
-         for J in 1 .. L.Size loop
-            Ret.Rebindings (J) := L.Rebindings (J);
-         end loop;
+   ----------------------
+   -- Clear_Rebindings --
+   ----------------------
 
-         for J in 1 .. R.Size loop
-            Ret.Rebindings (J + L.Size + 1) := R.Rebindings (J);
-         end loop;
-      end return;
-   end Combine;
+   procedure Clear_Rebindings is
+   begin
+      Rebindings_Table.Clear;
+   end Clear_Rebindings;
 
    -----------------
    -- Get_New_Env --
@@ -514,4 +1197,180 @@ package body Langkit_Support.Lexical_Env is
       return No_Env_Getter;
    end Get_New_Env;
 
+   --------------
+   -- Key_Bits --
+   --------------
+
+   function Key_Bits (Key : Symbol_Type) return Key_Filter is
+
+      --  Symbol hashes are addresses, whose low bits are not well
+      --  distributed: scramble them with a multiplicative hash and use the
+      --  high bits of the result.
+
+      H : constant Hash_Type := Hash (Key) * 16#9E37_79B1#;
+   begin
+      return 2 ** Natural (H / 2 ** 26)
+             or 2 ** Natural ((H / 2 ** 20) mod 64);
+   end Key_Bits;
+
+   ------------------
+   -- Keys_Summary --
+   ------------------
+
+   function Keys_Summary (Self : Lexical_Env) return Key_Filter is
+   begin
+      if Self = null then
+         return 0;
+
+      --  Environments that reference no other environment transitively are
+      --  the most common ones: do not bother caching anything for them.
+
+      elsif Referenced_Envs_Vectors.Length (Self.Transitive_Referenced_Envs)
+            = 0
+      then
+         return Self.Own_Keys;
+
+      elsif Self.Summary_Generation /= Current_Generation then
+
+         --  References can form cycles: in this case, make the environments
+         --  in the cycle accept all keys rather than compute an incomplete
+         --  filter.
+
+         Self.Keys_Summary := Key_Filter'Last;
+         Self.Summary_Generation := Current_Generation;
+
+         declare
+            Result : Key_Filter := Self.Own_Keys;
+         begin
+            for Ref_Env of Self.Transitive_Referenced_Envs loop
+               Result := Result or Keys_Summary (Ref_Env.Env);
+            end loop;
+            Self.Keys_Summary := Result;
+         end;
+      end if;
+
+      return Self.Keys_Summary;
+   end Keys_Summary;
+
+   -------------
+   -- Destroy --
+   -------------
+
+   procedure Destroy (Result : in out Lookup_Cache_Result) is
+   begin
+      Destroy (Result.Elements);
+      Destroy (Result.Owners);
+   end Destroy;
+
+   -----------
+   -- Clear --
+   -----------
+
+   procedure Clear (Cache : Lookup_Cache_Access) is
+   begin
+      for Ent of Cache.Entries loop
+         for Result of Ent loop
+            Destroy (Result);
+         end loop;
+      end loop;
+      Cache.Entries.Clear;
+   end Clear;
+
+   ----------------------
+   -- Set_Lookup_Cache --
+   ----------------------
+
+   procedure Set_Lookup_Cache (Enabled : Boolean) is
+   begin
+      Lookup_Cache_Enabled := Enabled;
+      Invalidate_Lookup_Caches;
+   end Set_Lookup_Cache;
+
+   ------------------------------
+   -- Invalidate_Lookup_Caches --
+   ------------------------------
+
+   procedure Invalidate_Lookup_Caches is
+   begin
+      Lookup_State.Invalidate;
+   end Invalidate_Lookup_Caches;
+
+   -------------------------------
+   -- Current_Lookup_Generation --
+   -------------------------------
+
+   function Current_Lookup_Generation return Lookup_Generation is
+   begin
+      return Current_Generation;
+   end Current_Lookup_Generation;
+
+   ------------------------
+   -- Lookup_Cache_Stats --
+   ------------------------
+
+   function Lookup_Cache_Stats return Lookup_Cache_Statistics is
+   begin
+      return Lookup_State.Stats;
+   end Lookup_Cache_Stats;
+
+   ------------------------------
+   -- Reset_Lookup_Cache_Stats --
+   ------------------------------
+
+   procedure Reset_Lookup_Cache_Stats is
+   begin
+      Lookup_State.Reset_Stats;
+   end Reset_Lookup_Cache_Stats;
+
+   ------------------
+   -- Lookup_State --
+   ------------------
+
+   protected body Lookup_State is
+
+      ----------------
+      -- Invalidate --
+      ----------------
+
+      procedure Invalidate is
+      begin
+         Current_Generation := Current_Generation + 1;
+      end Invalidate;
+
+      -----------
+      -- Count --
+      -----------
+
+      procedure Count (Hit, Invalidated : Boolean) is
+      begin
+         if Invalidated then
+            Cache_Stats.Invalidations := Cache_Stats.Invalidations + 1;
+         end if;
+         if Hit then
+            Cache_Stats.Hits := Cache_Stats.Hits + 1;
+         else
+            Cache_Stats.Misses := Cache_Stats.Misses + 1;
+         end if;
+      end Count;
+
+      -----------
+      -- Stats --
+      -----------
+
+      function Stats return Lookup_Cache_Statistics is
+      begin
+         return Cache_Stats;
+      end Stats;
+
+      -----------------
+      -- Reset_Stats --
+      -----------------
+
+      procedure Reset_Stats is
+      begin
+         Cache_Stats := (others => 0);
+      end Reset_Stats;
+
+   end Lookup_State;
+
 end Langkit_Support.Lexical_Env;
@@ -1,7 +1,45 @@
+with Ada.Unchecked_Deallocation;
+
 package body Langkit_Support.Packrat is
 
-   function Entry_Index (Offset : Token_Index) return Natural is
-     (Integer (Offset) mod Memo_Size);
+   procedure Free is new Ada.Unchecked_Deallocation
+     (Memo_Entry_Array, Memo_Entry_Array_Access);
+
+   function Set_First (Memo : Memo_Type; Offset : Token_Index) return Natural
+   is ((Integer (Offset) mod Memo.Sets) * Memo.Ways)
+     with Inline;
+   --  Assuming Memo is a Cache memoization table, return the index of the
+   --  first entry in the set that Offset maps to.
+
+   procedure Reserve (Memo : in out Memo_Type; Offset : Token_Index);
+   --  Assuming Memo is a Full memoization table, make sure its table is big
+   --  enough to contain an entry for Offset.
+
+   -------------
+   -- Reserve --
+   -------------
+
+   procedure Reserve (Memo : in out Memo_Type; Offset : Token_Index) is
+      Index    : constant Natural := Natural (Offset);
+      Old_Last : constant Integer :=
+        (if Memo.Table = null then -1 else Memo.Table'Last);
+   begin
+      if Index <= Old_Last then
+         return;
+      end if;
+
+      declare
+         New_Table : constant Memo_Entry_Array_Access :=
+            new Memo_Entry_Array
+              (0 .. Natural'Max (Index, 2 * Old_Last + 64));
+      begin
+         if Memo.Table /= null then
+            New_Table (Memo.Table'Range) := Memo.Table.all;
+            Free (Memo.Table);
+         end if;
+         Memo.Table := New_Table;
+      end;
+   end Reserve;
 
    -----------
    -- Clear --
@@ -9,23 +47,72 @@ package body Langkit_Support.Packrat is
 
    procedure Clear (Memo : in out Memo_Type) is
    begin
-      for E of Memo loop
-         E.State := No_Result;
-      end loop;
+      case Memo.Kind is
+         when Cache =>
+            for E of Memo.Entries loop
+               E.State := No_Result;
+            end loop;
+
+         when Full =>
+            if Memo.Table /= null then
+               for E of Memo.Table.all loop
+                  E.State := No_Result;
+               end loop;
+            end if;
+      end case;
    end Clear;
 
+   -------------
+   -- Destroy --
+   -------------
+
+   procedure Destroy (Memo : in out Memo_Type) is
+   begin
+      if Memo.Kind = Full then
+         Free (Memo.Table);
+      end if;
+   end Destroy;
+
    ---------
    -- Get --
    ---------
 
-   function Get (Memo : Memo_Type; Offset : Token_Index) return Memo_Entry is
-      E : Memo_Entry renames Memo (Entry_Index (Offset));
+   function Get
+     (Memo : in out Memo_Type; Offset : Token_Index) return Memo_Entry is
    begin
-      if E.Offset = Offset then
-         return E;
-      else
-         return (State => No_Result, others => <>);
-      end if;
+      case Memo.Kind is
+         when Cache =>
+            declare
+               First : constant Natural := Set_First (Memo, Offset);
+            begin
+               for I in First .. First + Memo.Ways - 1 loop
+                  declare
+                     E : Memo_Entry renames Memo.Entries (I);
+                  begin
+                     --  Unused entries come last in each set, so we can stop
+                     --  looking as soon as we find one.
+
+                     exit when E.State = No_Result;
+                     if E.Offset = Offset then
+                        Memo.Hits := Memo.Hits + 1;
+                        return E;
+                     end if;
+                  end;
+               end loop;
+            end;
+
+         when Full =>
+            if Memo.Table /= null
+               and then Natural (Offset) <= Memo.Table'Last
+               and then Memo.Table (Natural (Offset)).State /= No_Result
+            then
+               Memo.Hits := Memo.Hits + 1;
+               return Memo.Table (Natural (Offset));
+            end if;
+      end case;
+
+      Memo.Misses := Memo.Misses + 1;
+      return (State => No_Result, others => <>);
    end Get;
 
    ---------
@@ -37,12 +124,63 @@ package body Langkit_Support.Packrat is
                   Instance          : T;
                   Offset, Final_Pos : Token_Index)
    is
-      E : Memo_Entry renames Memo (Entry_Index (Offset));
+      New_Entry : constant Memo_Entry :=
+        (State     => (if Is_Success then Success else Failure),
+         Instance  => Instance,
+         Offset    => Offset,
+         Final_Pos => Final_Pos);
    begin
-      E := (State     => (if Is_Success then Success else Failure),
-            Instance  => Instance,
-            Offset    => Offset,
-            Final_Pos => Final_Pos);
+      case Memo.Kind is
+         when Cache =>
+            declare
+               First : constant Natural := Set_First (Memo, Offset);
+               Last  : constant Natural := First + Memo.Ways - 1;
+            begin
+               --  If this set already has an entry for Offset, update it.
+               --  Otherwise use the first unused entry, if any.
+
+               for I in First .. Last loop
+                  declare
+                     E : Memo_Entry renames Memo.Entries (I);
+                  begin
+                     if E.State = No_Result or else E.Offset = Offset then
+                        E := New_Entry;
+                        return;
+                     end if;
+                  end;
+               end loop;
+
+               --  The set is full: evict its oldest entry (the first one) and
+               --  append the new one.
+
+               Memo.Evictions := Memo.Evictions + 1;
+               Memo.Entries (First .. Last - 1) :=
+                  Memo.Entries (First + 1 .. Last);
+               Memo.Entries (Last) := New_Entry;
+            end;
+
+         when Full =>
+            Reserve (Memo, Offset);
+            Memo.Table (Natural (Offset)) := New_Entry;
+      end case;
    end Set;
 
+   ----------
+   -- Hits --
+   ----------
+
+   function Hits (Memo : Memo_Type) return Natural is (Memo.Hits);
+
+   ------------
+   -- Misses --
+   ------------
+
+   function Misses (Memo : Memo_Type) return Natural is (Memo.Misses);
+
+   ---------------
+   -- Evictions --
+   ---------------
+
+   function Evictions (Memo : Memo_Type) return Natural is (Memo.Evictions);
+
 end Langkit_Support.Packrat;
@@ -1,20 +1,72 @@
-with Ada.Unchecked_Conversion;
+with Ada.Unchecked_Deallocate_Subpool;
 with Ada.Unchecked_Deallocation;
 with System;                  use System;
 with System.Storage_Elements; use System.Storage_Elements;
 
+with Langkit_Support.Bump_Ptr; use Langkit_Support.Bump_Ptr;
+
 package body Langkit_Support.Symbols is
 
    procedure Deallocate is new Ada.Unchecked_Deallocation
-     (Sets.Set, Symbol_Table);
+     (Symbol_Table_Record, Symbol_Table);
+
+   Arena_Pool : Ada_Bump_Ptr_Pool;
+   --  Storage pool for all symbol texts. Each table shard has its own subpool
+
+   type Arena_Text_Access is access Text_Type;
+   for Arena_Text_Access'Storage_Pool use Arena_Pool;
+
+   function Shard_For (H : Hash_Type) return Shard_Index is
+     (Shard_Index (H / (Hash_Type'Last / Shard_Count + 1)))
+      with Inline;
+   --  Return the index of the shard that contains symbols whose text hash is
+   --  H. Use the highest bits, as the lowest ones select buckets in shards.
+
+   function Find_In_Shard
+     (Shard  : in out Shard_Type;
+      T      : Text_Type;
+      H      : Hash_Type;
+      Create : Boolean) return Symbol_Type;
+   --  Implementation of Find for the shard that must contain T, whose hash is
+   --  H. This assumes no concurrent access to Shard.
+
+   ----------------
+   -- Table_Lock --
+   ----------------
+
+   protected body Table_Lock is
+
+      -----------
+      -- Seize --
+      -----------
+
+      entry Seize when not Locked is
+      begin
+         Locked := True;
+      end Seize;
+
+      -------------
+      -- Release --
+      -------------
+
+      procedure Release is
+      begin
+         Locked := False;
+      end Release;
+
+   end Table_Lock;
 
    ------------
    -- Create --
    ------------
 
    function Create return Symbol_Table is
+      Result : constant Symbol_Table := new Symbol_Table_Record;
    begin
-      return new Sets.Set;
+      for Shard of Result.Shards loop
+         Shard.Arena := Create_Subpool (Arena_Pool);
+      end loop;
+      return Result;
    end Create;
 
    ----------
@@ -26,50 +78,84 @@ package body Langkit_Support.Symbols is
       T      : Text_Type;
       Create : Boolean := True)
       return Symbol_Type
+   is
+      H     : constant Hash_Type := Hash (T);
+      Shard : Shard_Type renames ST.Shards (Shard_For (H));
+   begin
+      if not ST.Thread_Safe then
+         return Find_In_Shard (Shard, T, H, Create);
+      end if;
+
+      Shard.Lock.Seize;
+      declare
+         Result : Symbol_Type;
+      begin
+         Result := Find_In_Shard (Shard, T, H, Create);
+         Shard.Lock.Release;
+         return Result;
+      exception
+         when others =>
+            Shard.Lock.Release;
+            raise;
+      end;
+   end Find;
+
+   -------------------
+   -- Find_In_Shard --
+   -------------------
+
+   function Find_In_Shard
+     (Shard  : in out Shard_Type;
+      T      : Text_Type;
+      H      : Hash_Type;
+      Create : Boolean) return Symbol_Type
    is
       use Sets;
 
-      T_Acc  : Symbol_Type := T'Unrestricted_Access;
-      Result : constant Cursor := ST.Find (T_Acc);
+      Result : constant Cursor :=
+         Shard.Set.Find ((Symbol => T'Unrestricted_Access, Hash => H));
    begin
       --  If we already have such a symbol, return the access we already
       --  internalized. Otherwise, give up if asked to.
 
       if Has_Element (Result) then
-         return Element (Result);
+         return Element (Result).Symbol;
       elsif not Create then
          return null;
       end if;
 
       --  At this point, we know we have to internalize a new symbol
 
-      T_Acc := new Text_Type'(T);
-      ST.Insert (T_Acc);
-      return T_Acc;
-   end Find;
+      declare
+         Symbol : constant Symbol_Type :=
+            Symbol_Type (Arena_Text_Access'(new (Shard.Arena) Text_Type'(T)));
+      begin
+         Shard.Set.Insert ((Symbol => Symbol, Hash => H));
+         return Symbol;
+      end;
+   end Find_In_Shard;
+
+   ---------------------
+   -- Set_Thread_Safe --
+   ---------------------
+
+   procedure Set_Thread_Safe (ST : Symbol_Table; Thread_Safe : Boolean) is
+   begin
+      ST.Thread_Safe := Thread_Safe;
+   end Set_Thread_Safe;
 
    -------------
    -- Destroy --
    -------------
 
    procedure Destroy (ST : in out Symbol_Table) is
-      use Sets;
-      C : Cursor := ST.First;
    begin
-      while Has_Element (C) loop
-         declare
-            --  We keep Symbol_Type to be a constant access everywhere for
-            --  simplification, but we know symbol tables are the only owners
-            --  of these, so stripping the "constant" attribute away here is
-            --  known to be safe.
-
-            function Convert is new Ada.Unchecked_Conversion
-              (Symbol_Type, Text_Access);
-            To_Free : Text_Access := Convert (Element (C));
-         begin
-            Next (C);
-            Free (To_Free);
-         end;
+      --  Symbol texts live in the shard arenas: there is no need to free them
+      --  one by one.
+
+      for Shard of ST.Shards loop
+         Shard.Set.Clear;
+         Ada.Unchecked_Deallocate_Subpool (Shard.Arena);
       end loop;
       Deallocate (ST);
    end Destroy;
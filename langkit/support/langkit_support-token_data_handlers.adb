@@ -12,12 +12,14 @@ package body Langkit_Support.Token_Data_Handlers is
    is
    begin
       TDH := (Source_Buffer     => null,
+              Compact_Buffer    => null,
               Source_First      => <>,
               Source_Last       => <>,
               Tokens            => <>,
               Symbols           => Symbols,
               Tokens_To_Trivias => <>,
-              Trivias           => <>);
+              Trivias           => <>,
+              Line_Starts       => <>);
    end Initialize;
 
    -----------
@@ -32,6 +34,7 @@ package body Langkit_Support.Token_Data_Handlers is
    is
    begin
       Free (TDH.Source_Buffer);
+      Free (TDH.Compact_Buffer);
       TDH.Source_Buffer := Source_Buffer;
       TDH.Source_First := Source_First;
       TDH.Source_Last := Source_Last;
@@ -39,8 +42,148 @@ package body Langkit_Support.Token_Data_Handlers is
       Clear (TDH.Tokens);
       Clear (TDH.Trivias);
       Clear (TDH.Tokens_To_Trivias);
+      Index_Lines (TDH);
    end Reset;
 
+   -----------------
+   -- Index_Lines --
+   -----------------
+
+   procedure Index_Lines (TDH : in out Token_Data_Handler) is
+      LF : constant Wide_Wide_Character := Wide_Wide_Character'Val (10);
+   begin
+      Clear (TDH.Line_Starts);
+      Append (TDH.Line_Starts, TDH.Source_First);
+      for I in TDH.Source_First .. TDH.Source_Last loop
+         if TDH.Source_Buffer (I) = LF then
+            Append (TDH.Line_Starts, I + 1);
+         end if;
+      end loop;
+   end Index_Lines;
+
+   --------------
+   -- Get_Line --
+   --------------
+
+   function Get_Line
+     (Line_Starts : Integer_Vectors.Vector;
+      Index       : Positive) return Line_Number
+   is
+      Low  : Positive := 1;
+      High : Natural := Last_Index (Line_Starts);
+   begin
+      --  Look for the last line that starts at or before Index
+
+      while Low < High loop
+         declare
+            Middle : constant Positive := (Low + High + 1) / 2;
+         begin
+            if Get (Line_Starts, Middle) <= Index then
+               Low := Middle;
+            else
+               High := Middle - 1;
+            end if;
+         end;
+      end loop;
+      return Line_Number (Low);
+   end Get_Line;
+
+   --------------------
+   -- Replace_Tokens --
+   --------------------
+
+   procedure Replace_Tokens
+     (TDH         : in out Token_Data_Handler;
+      First, Last : Token_Index;
+      Region      : Token_Data_Handler)
+   is
+      First_Entry : constant Positive := Natural (First) + 1;
+      Last_Entry  : constant Natural := Natural (Last) + 1;
+      --  Range of entries in TDH.Tokens_To_Trivias for the replaced tokens
+
+      Trivia_First : Positive := Last_Index (TDH.Trivias) + 1;
+      Trivia_Count : Natural := 0;
+      --  Range of trivia in TDH.Trivias that follow the replaced tokens. When
+      --  there is no such trivia, Trivia_First is the index where to insert
+      --  the new ones.
+
+      Trivia_Delta : Integer;
+   begin
+      if Length (TDH.Tokens_To_Trivias) > 0 then
+
+         --  Look for the trivia that follow the replaced tokens. Trivia that
+         --  follow a given token are contiguous, and so are all trivia for
+         --  consecutive tokens.
+
+         for E in First_Entry .. Last_Entry loop
+            declare
+               Index : Integer := Get (TDH.Tokens_To_Trivias, E);
+            begin
+               if Index /= Integer (No_Token_Index) then
+                  if Trivia_Count = 0 then
+                     Trivia_First := Index;
+                  end if;
+                  Trivia_Count := Trivia_Count + 1;
+                  while Get (TDH.Trivias, Index).Has_Next loop
+                     Index := Index + 1;
+                     Trivia_Count := Trivia_Count + 1;
+                  end loop;
+               end if;
+            end;
+         end loop;
+
+         if Trivia_Count = 0 then
+            for E in Last_Entry + 1 .. Last_Index (TDH.Tokens_To_Trivias) loop
+               if Get (TDH.Tokens_To_Trivias, E) /= Integer (No_Token_Index)
+               then
+                  Trivia_First := Get (TDH.Tokens_To_Trivias, E);
+                  exit;
+               end if;
+            end loop;
+         end if;
+
+         Replace_Slice (TDH.Trivias, Trivia_First,
+                        Trivia_First + Trivia_Count - 1,
+                        To_Array (Region.Trivias));
+         Trivia_Delta := Length (Region.Trivias) - Trivia_Count;
+
+         --  Entries for the replaced tokens come from Region (skipping its
+         --  leading trivia entry), and entries for the following tokens must
+         --  be shifted to account for the trivia we just replaced.
+
+         declare
+            Entries : Integer_Vectors.Elements_Array
+              (1 .. Length (Region.Tokens_To_Trivias) - 1);
+         begin
+            for I in Entries'Range loop
+               Entries (I) := Get (Region.Tokens_To_Trivias, I + 1);
+               if Entries (I) /= Integer (No_Token_Index) then
+                  Entries (I) := Entries (I) + Trivia_First - 1;
+               end if;
+            end loop;
+            Replace_Slice
+              (TDH.Tokens_To_Trivias, First_Entry, Last_Entry, Entries);
+         end;
+
+         if Trivia_Delta /= 0 then
+            for E in First_Entry + Length (Region.Tokens_To_Trivias) - 1
+                     .. Last_Index (TDH.Tokens_To_Trivias)
+            loop
+               declare
+                  Index : constant Integer := Get (TDH.Tokens_To_Trivias, E);
+               begin
+                  if Index /= Integer (No_Token_Index) then
+                     Set (TDH.Tokens_To_Trivias, E, Index + Trivia_Delta);
+                  end if;
+               end;
+            end loop;
+         end if;
+      end if;
+
+      Replace_Slice (TDH.Tokens, Natural (First), Natural (Last),
+                     To_Array (Region.Tokens));
+   end Replace_Tokens;
+
    ----------
    -- Free --
    ----------
@@ -48,12 +191,76 @@ package body Langkit_Support.Token_Data_Handlers is
    procedure Free (TDH : in out Token_Data_Handler) is
    begin
       Free (TDH.Source_Buffer);
+      Free (TDH.Compact_Buffer);
       Destroy (TDH.Tokens);
       Destroy (TDH.Trivias);
       Destroy (TDH.Tokens_To_Trivias);
+      Destroy (TDH.Line_Starts);
       TDH.Symbols := No_Symbol_Table;
    end Free;
 
+   -------------
+   -- Compact --
+   -------------
+
+   procedure Compact (TDH : in out Token_Data_Handler) is
+   begin
+      if TDH.Source_Buffer = null then
+         return;
+      end if;
+
+      for C of TDH.Source_Buffer.all loop
+         if Wide_Wide_Character'Pos (C) > Character'Pos (Character'Last) then
+            return;
+         end if;
+      end loop;
+
+      TDH.Compact_Buffer := new String (TDH.Source_Buffer'Range);
+      for I in TDH.Source_Buffer'Range loop
+         TDH.Compact_Buffer (I) :=
+            Character'Val (Wide_Wide_Character'Pos (TDH.Source_Buffer (I)));
+      end loop;
+      Free (TDH.Source_Buffer);
+   end Compact;
+
+   ------------
+   -- Expand --
+   ------------
+
+   procedure Expand (TDH : in out Token_Data_Handler) is
+   begin
+      if TDH.Compact_Buffer = null then
+         return;
+      end if;
+
+      TDH.Source_Buffer := new Text_Type (TDH.Compact_Buffer'Range);
+      for I in TDH.Compact_Buffer'Range loop
+         TDH.Source_Buffer (I) :=
+            Wide_Wide_Character'Val (Character'Pos (TDH.Compact_Buffer (I)));
+      end loop;
+      Free (TDH.Compact_Buffer);
+   end Expand;
+
+   ----------
+   -- Text --
+   ----------
+
+   function Text
+     (TDH         : Token_Data_Handler;
+      First, Last : Natural) return Text_Type is
+   begin
+      if TDH.Compact_Buffer = null then
+         return TDH.Source_Buffer (First .. Last);
+      end if;
+
+      return Result : Text_Type (First .. Last) do
+         for I in Result'Range loop
+            Result (I) := Wide_Wide_Character'Val
+              (Character'Pos (TDH.Compact_Buffer (I)));
+         end loop;
+      end return;
+   end Text;
+
    --------------------------
    -- Internal_Get_Trivias --
    --------------------------
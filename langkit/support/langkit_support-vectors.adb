@@ -75,6 +75,45 @@ package body Langkit_Support.Vectors is
       Pop (Self);
    end Remove_At;
 
+   -------------------
+   -- Replace_Slice --
+   -------------------
+
+   procedure Replace_Slice
+     (Self  : in out Vector;
+      First : Index_Type;
+      Last  : Natural;
+      By    : Elements_Array)
+   is
+      Tail_Length : constant Natural := Self.Size - Last;
+      New_Size    : constant Natural :=
+         Self.Size - (Last - First + 1) + By'Length;
+      Tail_First  : constant Index_Type := First + By'Length;
+      --  Index for the first element after Last once By is in place
+   begin
+      if New_Size > Self.Capacity then
+         Reserve (Self, New_Size);
+      end if;
+
+      --  Move the tail of the vector first, taking care not to override
+      --  elements we have not moved yet.
+
+      if Tail_First > Last + 1 then
+         for I in reverse 1 .. Tail_Length loop
+            Set (Self, Tail_First + I - 1, Get (Self, Last + I));
+         end loop;
+      elsif Tail_First < Last + 1 then
+         for I in 1 .. Tail_Length loop
+            Set (Self, Tail_First + I - 1, Get (Self, Last + I));
+         end loop;
+      end if;
+
+      for I in By'Range loop
+         Set (Self, First + I - By'First, By (I));
+      end loop;
+      Self.Size := New_Size;
+   end Replace_Slice;
+
    ---------
    -- Get --
    ---------
@@ -180,13 +180,105 @@
    ## Put all state flags first, and only then cached values not to wast too
    ## much space with alignment. TODO: put all the flags in a packed array.
    % for p in memoized_properties:
-      ${p.memoization_state_field_name} : Memoization_State := Not_Computed;
+      % if p.memoization_table:
+         ${p.memoization_table_field_name} : Memo_Table_Access_${p.uid} :=
+            null;
+      % else:
+         ${p.memoization_state_field_name} : Memoization_State :=
+            Not_Computed;
+      % endif
+   % endfor
+   % for p in memoized_properties:
+      % if not p.memoization_table:
+         ${p.memoization_value_field_name} : ${p.type.name()};
+      % endif
    % endfor
    % for p in memoized_properties:
-      ${p.memoization_value_field_name} : ${p.type.name()};
+      ${p.memoization_deps_field_name} : Unit_Dependency_Vectors.Vector;
+      ${p.memoization_version_field_name} : Cache_Version_Type := 0;
    % endfor
 </%def>
 
+## Declare the types used to memoize the results of the P property, which
+## takes explicit arguments: results are stored in a hash table keyed by
+## argument values.
+<%def name="memo_table_decl(p)">
+   type Memo_Key_${p.uid} is record
+      % for arg in p.arguments:
+         ${arg.name} : ${arg.type.name()};
+      % endfor
+   end record;
+
+   function Hash
+     (Key : Memo_Key_${p.uid}) return Ada.Containers.Hash_Type;
+
+   type Memo_Value_${p.uid} is record
+      State : Memoization_State;
+      Value : ${p.type.name()};
+   end record;
+
+   package Memo_Tables_${p.uid} is new Ada.Containers.Hashed_Maps
+     (Key_Type        => Memo_Key_${p.uid},
+      Element_Type    => Memo_Value_${p.uid},
+      Hash            => Hash,
+      Equivalent_Keys => "=");
+
+   type Memo_Table_Access_${p.uid} is access Memo_Tables_${p.uid}.Map;
+
+   procedure Clear (Table : in out Memo_Table_Access_${p.uid});
+   --  Release the results that Table holds, then free it and set it to null
+</%def>
+
+<%def name="memo_table_body(p)">
+   ----------
+   -- Hash --
+   ----------
+
+   function Hash
+     (Key : Memo_Key_${p.uid}) return Ada.Containers.Hash_Type
+   is
+      use type Ada.Containers.Hash_Type;
+      Result : Ada.Containers.Hash_Type := 0;
+   begin
+      % for arg in p.arguments:
+         <% field = 'Key.{}'.format(arg.name) %>
+         Result := Result * 31 + ${(
+            'Hash ({} ({}))'.format(root_node_type_name, field)
+            if is_ast_node(arg.type) else
+            'Hash ({})'.format(field)
+            if is_symbol_type(arg.type) else
+            "Ada.Containers.Hash_Type'Mod ({})".format(field)
+            if is_long(arg.type) else
+            "Ada.Containers.Hash_Type ({}'Pos ({}))".format(
+               arg.type.name(), field
+            )
+         )};
+      % endfor
+      return Result;
+   end Hash;
+
+   -----------
+   -- Clear --
+   -----------
+
+   procedure Clear (Table : in out Memo_Table_Access_${p.uid}) is
+      procedure Free is new Ada.Unchecked_Deallocation
+        (Memo_Tables_${p.uid}.Map, Memo_Table_Access_${p.uid});
+   begin
+      if Table = null then
+         return;
+      end if;
+      % if p.type.is_refcounted():
+         for V of Table.all loop
+            if V.State = Computed then
+               Dec_Ref (V.Value);
+            end if;
+         end loop;
+      % endif
+      Free (Table);
+   end Clear;
+</%def>
+
 <%def name="private_decl(cls)">
 
    <%
@@ -195,6 +287,12 @@
       memoized_properties = cls.get_memoized_properties(include_inherited=True)
    %>
 
+   % for p in cls.get_memoized_properties():
+      % if p.memoization_table:
+         ${memo_table_decl(p)}
+      % endif
+   % endfor
+
    type ${type_name} is ${"abstract" if cls.abstract else ""}
       new ${cls.base().value_type_name()} with record
       ${node_fields(cls)}
@@ -210,6 +308,12 @@
       overriding procedure Destroy_Node
         (Node : access ${cls.value_type_name()});
 
+      % if cls.get_parse_fields(lambda f: is_token_type(f.type)):
+         overriding procedure Shift_Token_Fields
+           (Node   : access ${cls.value_type_name()};
+            Offset : Integer);
+      % endif
+
    % endif
 
    ## Private field getters
@@ -273,6 +377,12 @@
    )
    %>
 
+   % for p in cls.get_memoized_properties():
+      % if p.memoization_table:
+         ${memo_table_body(p)}
+      % endif
+   % endfor
+
    % if not cls.abstract:
 
       ----------
@@ -431,12 +541,17 @@
          is
          begin
             % for p in memoized_properties:
-               % if p.type.is_refcounted():
-                  if Node.${p.memoization_state_field_name} = Computed then
-                     Dec_Ref (Node.${p.memoization_value_field_name});
-                  end if;
+               % if p.memoization_table:
+                  Clear (Node.${p.memoization_table_field_name});
+               % else:
+                  % if p.type.is_refcounted():
+                     if Node.${p.memoization_state_field_name} = Computed then
+                        Dec_Ref (Node.${p.memoization_value_field_name});
+                     end if;
+                  % endif
+                  Node.${p.memoization_state_field_name} := Not_Computed;
                % endif
-               Node.${p.memoization_state_field_name} := Not_Computed;
+               Node.${p.memoization_deps_field_name}.Destroy;
             % endfor
          end Reset_Property_Caches;
       % endif
@@ -464,6 +579,26 @@
          % endfor
       end Destroy_Node;
 
+      <% token_fields = cls.get_parse_fields(
+            lambda f: is_token_type(f.type)) %>
+      % if token_fields:
+      ------------------------
+      -- Shift_Token_Fields --
+      ------------------------
+
+      overriding procedure Shift_Token_Fields
+        (Node   : access ${cls.value_type_name()};
+         Offset : Integer) is
+      begin
+         % for field in token_fields:
+            if Node.${field.name} /= No_Token_Index then
+               Node.${field.name} :=
+                  Token_Index (Integer (Node.${field.name}) + Offset);
+            end if;
+         % endfor
+      end Shift_Token_Fields;
+      % endif
+
       % endif
 
    % endif
@@ -118,6 +118,28 @@ typedef struct {
    const char *information;
 } ${exception_type};
 
+% if ctx.instrument_parsers:
+${c_doc('langkit.parser_rule_stats_type')}
+typedef struct {
+    uint64_t calls;
+    uint64_t memo_hits;
+    uint64_t memo_misses;
+    uint64_t failures;
+    uint64_t tokens;
+} ${parser_rule_stats_type};
+% endif
+
+% if ctx.instrument_properties:
+${c_doc('langkit.property_stats_type')}
+typedef struct {
+    uint64_t calls;
+    uint64_t memo_hits;
+    uint64_t property_errors;
+    double total_time;
+    double self_time;
+} ${property_stats_type};
+% endif
+
 % if ctx.default_unit_file_provider:
 /*
  * Types for unit file providers
@@ -182,6 +204,7 @@ ${capi.get_name("create_analysis_context")}(
    % if ctx.default_unit_file_provider:
    , ${unit_file_provider_type} unit_file_provider
    % endif
+   , int compact_sources
 );
 
 ${c_doc('langkit.context_incref')}
@@ -197,6 +220,34 @@ extern void
 ${capi.get_name("destroy_analysis_context")}(
         ${analysis_context_type} context);
 
+% if ctx.instrument_parsers:
+${c_doc('langkit.context_parser_stats')}
+extern int
+${capi.get_name("context_parser_rule_stats")}(
+        ${analysis_context_type} context,
+        unsigned n,
+        ${parser_rule_stats_type} *stats_p);
+
+${c_doc('langkit.context_reset_parser_stats')}
+extern void
+${capi.get_name("context_reset_parser_stats")}(
+        ${analysis_context_type} context);
+% endif
+
+% if ctx.instrument_properties:
+${c_doc('langkit.context_property_stats')}
+extern int
+${capi.get_name("context_property_stats")}(
+        ${analysis_context_type} context,
+        unsigned n,
+        ${property_stats_type} *stats_p);
+
+${c_doc('langkit.context_reset_property_stats')}
+extern void
+${capi.get_name("context_reset_property_stats")}(
+        ${analysis_context_type} context);
+% endif
+
 ${c_doc('langkit.get_unit_from_file')}
 extern ${analysis_unit_type}
 ${capi.get_name("get_analysis_unit_from_file")}(
@@ -216,6 +267,19 @@ ${capi.get_name("get_analysis_unit_from_buffer")}(
         size_t buffer_size,
         int with_trivia);
 
+${c_doc('langkit.get_units_from_files')}
+extern void
+${capi.get_name("get_analysis_units_from_files")}(
+        ${analysis_context_type} context,
+        const char **filenames,
+        size_t count,
+        const char *charset,
+        int reparse,
+        int with_trivia,
+        unsigned workers,
+        unsigned chunk_size,
+        ${analysis_unit_type} *units);
+
 % if ctx.default_unit_file_provider:
 ${c_doc('langkit.get_unit_from_provider')}
 extern ${analysis_unit_type}
@@ -297,6 +361,14 @@ ${capi.get_name("unit_reparse_from_buffer")} (${analysis_unit_type} unit,
                                               const char *buffer,
                                               size_t buffer_size);
 
+${c_doc('langkit.unit_reparse_incremental')}
+extern void
+${capi.get_name("unit_reparse_incremental")}(${analysis_unit_type} unit,
+                                             const char *charset,
+                                             const char *buffer,
+                                             size_t buffer_size,
+                                             ${sloc_range_type} *edit);
+
 ${c_doc('langkit.unit_populate_lexical_env')}
 extern int
 ${capi.get_name("unit_populate_lexical_env")}(${analysis_unit_type} unit);
@@ -87,6 +87,7 @@ package body ${ada_lib_name}.Analysis.C is
       % if ctx.default_unit_file_provider:
       ; Unit_File_Provider : ${unit_file_provider_type}
       % endif
+      ; Compact_Sources   : int
      )
       return ${analysis_context_type}
    is
@@ -109,6 +110,7 @@ package body ${ada_lib_name}.Analysis.C is
             % if ctx.default_unit_file_provider:
             , U
             % endif
+            , Compact_Sources => Compact_Sources /= 0
          ));
       end;
    exception
@@ -151,6 +153,93 @@ package body ${ada_lib_name}.Analysis.C is
          Set_Last_Exception (Exc);
    end;
 
+   % if ctx.instrument_parsers:
+   function ${capi.get_name("context_parser_rule_stats")}
+     (Context : ${analysis_context_type};
+      N       : unsigned;
+      Stats_P : ${parser_rule_stats_type}_Ptr) return int
+   is
+   begin
+      Clear_Last_Exception;
+
+      if N > Grammar_Rule'Pos (Grammar_Rule'Last) then
+         return 0;
+      end if;
+
+      declare
+         Stats : constant Parser_Statistics_Array :=
+            Parser_Stats (Unwrap (Context));
+         S_In  : Parser_Rule_Statistics renames
+            Stats (Grammar_Rule'Val (N));
+         S_Out : ${parser_rule_stats_type} renames Stats_P.all;
+      begin
+         S_Out.Calls := Unsigned_64 (S_In.Calls);
+         S_Out.Memo_Hits := Unsigned_64 (S_In.Memo_Hits);
+         S_Out.Memo_Misses := Unsigned_64 (S_In.Memo_Misses);
+         S_Out.Failures := Unsigned_64 (S_In.Failures);
+         S_Out.Tokens := Unsigned_64 (S_In.Tokens);
+         return 1;
+      end;
+   exception
+      when Exc : others =>
+         Set_Last_Exception (Exc);
+         return 0;
+   end;
+
+   procedure ${capi.get_name("context_reset_parser_stats")}
+     (Context : ${analysis_context_type}) is
+   begin
+      Clear_Last_Exception;
+      Reset_Parser_Stats (Unwrap (Context));
+   exception
+      when Exc : others =>
+         Set_Last_Exception (Exc);
+   end;
+   % endif
+
+   % if ctx.instrument_properties:
+   function ${capi.get_name("context_property_stats")}
+     (Context : ${analysis_context_type};
+      N       : unsigned;
+      Stats_P : ${property_stats_type}_Ptr) return int
+   is
+   begin
+      Clear_Last_Exception;
+
+      if N > Property_Id'Pos (Property_Id'Last) then
+         return 0;
+      end if;
+
+      declare
+         Stats : constant Property_Statistics_Array :=
+            Property_Stats (Unwrap (Context));
+         S_In  : Property_Statistics renames Stats (Property_Id'Val (N));
+         S_Out : ${property_stats_type} renames Stats_P.all;
+      begin
+         S_Out.Calls := Unsigned_64 (S_In.Calls);
+         S_Out.Memo_Hits := Unsigned_64 (S_In.Memo_Hits);
+         S_Out.Property_Errors := Unsigned_64 (S_In.Property_Errors);
+         S_Out.Total_Time := double (S_In.Total_Time);
+         S_Out.Self_Time := double (S_In.Self_Time);
+         return 1;
+      end;
+   exception
+      when Exc : others =>
+         Set_Last_Exception (Exc);
+         return 0;
+   end;
+
+   procedure ${capi.get_name("context_reset_property_stats")}
+     (Context : ${analysis_context_type}) is
+   begin
+      Clear_Last_Exception;
+      Reset_Property_Stats (Unwrap (Context));
+   exception
+      when Exc : others =>
+         Set_Last_Exception (Exc);
+   end;
+   % endif
+
    function ${capi.get_name("get_analysis_unit_from_file")}
      (Context           : ${analysis_context_type};
       Filename, Charset : chars_ptr;
@@ -210,6 +299,56 @@ package body ${ada_lib_name}.Analysis.C is
          return ${analysis_unit_type} (System.Null_Address);
    end;
 
+   procedure ${capi.get_name("get_analysis_units_from_files")}
+     (Context             : ${analysis_context_type};
+      Filenames           : System.Address;
+      Count               : size_t;
+      Charset             : chars_ptr;
+      Reparse             : int;
+      With_Trivia         : int;
+      Workers, Chunk_Size : unsigned;
+      Units               : System.Address)
+   is
+      type C_Unit_Array is array (size_t range <>) of ${analysis_unit_type};
+   begin
+      Clear_Last_Exception;
+
+      declare
+         Ctx : constant Analysis_Context := Unwrap (Context);
+
+         C_Filenames : chars_ptr_array (1 .. Count);
+         for C_Filenames'Address use Filenames;
+
+         C_Units : C_Unit_Array (1 .. Count);
+         for C_Units'Address use Units;
+
+         Ada_Filenames : Filename_Array (1 .. Natural (Count));
+      begin
+         for I in Ada_Filenames'Range loop
+            Ada_Filenames (I) := Ada.Strings.Unbounded.To_Unbounded_String
+              (Value (C_Filenames (size_t (I))));
+         end loop;
+
+         declare
+            Result : constant Analysis_Unit_Array := Get_From_Files
+              (Ctx,
+               Ada_Filenames,
+               Value_Or_Empty (Charset),
+               Reparse /= 0,
+               With_Trivia /= 0,
+               Workers    => Natural (Workers),
+               Chunk_Size => Positive (unsigned'Max (Chunk_Size, 1)));
+         begin
+            for I in Result'Range loop
+               C_Units (size_t (I)) := Wrap (Result (I));
+            end loop;
+         end;
+      end;
+   exception
+      when Exc : others =>
+         Set_Last_Exception (Exc);
+   end;
+
    % if ctx.default_unit_file_provider:
       function ${capi.get_name("get_analysis_unit_from_provider")}
         (Context     : ${analysis_context_type};
@@ -479,6 +618,28 @@ package body ${ada_lib_name}.Analysis.C is
          Set_Last_Exception (Exc);
    end;
 
+   procedure ${capi.get_name("unit_reparse_incremental")}
+     (Unit        : ${analysis_unit_type};
+      Charset     : chars_ptr;
+      Buffer      : chars_ptr;
+      Buffer_Size : size_t;
+      Edit        : ${sloc_range_type}_Ptr)
+   is
+   begin
+      Clear_Last_Exception;
+
+      declare
+         U : constant Analysis_Unit := Unwrap (Unit);
+         Buffer_Str : String (1 .. Positive (Buffer_Size));
+         for Buffer_Str'Address use Convert (Buffer);
+      begin
+         Reparse (U, Value_Or_Empty (Charset), Buffer_Str, Unwrap (Edit.all));
+      end;
+   exception
+      when Exc : others =>
+         Set_Last_Exception (Exc);
+   end;
+
    function ${capi.get_name("unit_populate_lexical_env")}
      (Unit : ${analysis_unit_type})
       return int
@@ -97,6 +97,27 @@ package ${ada_lib_name}.Analysis.C is
    end record;
    ${ada_c_doc('langkit.exception_type', 3)}
 
+   % if ctx.instrument_parsers:
+   type ${parser_rule_stats_type} is record
+      Calls, Memo_Hits, Memo_Misses, Failures, Tokens : Unsigned_64;
+   end record
+     with Convention => C;
+   ${ada_c_doc('langkit.parser_rule_stats_type', 3)}
+
+   type ${parser_rule_stats_type}_Ptr is access ${parser_rule_stats_type};
+   % endif
+
+   % if ctx.instrument_properties:
+   type ${property_stats_type} is record
+      Calls, Memo_Hits, Property_Errors : Unsigned_64;
+      Total_Time, Self_Time             : double;
+   end record
+     with Convention => C;
+   ${ada_c_doc('langkit.property_stats_type', 3)}
+
+   type ${property_stats_type}_Ptr is access ${property_stats_type};
+   % endif
+
    type ${bool_type} is new Unsigned_8;
 
    % for type_name in (analysis_unit_type, bool_type, node_type, \
@@ -157,6 +178,7 @@ package ${ada_lib_name}.Analysis.C is
       % if ctx.default_unit_file_provider:
       ; Unit_File_Provider : ${unit_file_provider_type}
       % endif
+      ; Compact_Sources   : int
      )
       return ${analysis_context_type}
       with Export        => True,
@@ -186,6 +208,46 @@ package ${ada_lib_name}.Analysis.C is
            External_name => "${capi.get_name('destroy_analysis_context')}";
    ${ada_c_doc('langkit.destroy_context', 3)}
 
+   % if ctx.instrument_parsers:
+   function ${capi.get_name('context_parser_rule_stats')}
+     (Context : ${analysis_context_type};
+      N       : unsigned;
+      Stats_P : ${parser_rule_stats_type}_Ptr) return int
+      with Export        => True,
+           Convention    => C,
+           External_name =>
+              "${capi.get_name('context_parser_rule_stats')}";
+   ${ada_c_doc('langkit.context_parser_stats', 3)}
+
+   procedure ${capi.get_name('context_reset_parser_stats')}
+     (Context : ${analysis_context_type})
+      with Export        => True,
+           Convention    => C,
+           External_name =>
+              "${capi.get_name('context_reset_parser_stats')}";
+   ${ada_c_doc('langkit.context_reset_parser_stats', 3)}
+   % endif
+
+   % if ctx.instrument_properties:
+   function ${capi.get_name('context_property_stats')}
+     (Context : ${analysis_context_type};
+      N       : unsigned;
+      Stats_P : ${property_stats_type}_Ptr) return int
+      with Export        => True,
+           Convention    => C,
+           External_name =>
+              "${capi.get_name('context_property_stats')}";
+   ${ada_c_doc('langkit.context_property_stats', 3)}
+
+   procedure ${capi.get_name('context_reset_property_stats')}
+     (Context : ${analysis_context_type})
+      with Export        => True,
+           Convention    => C,
+           External_name =>
+              "${capi.get_name('context_reset_property_stats')}";
+   ${ada_c_doc('langkit.context_reset_property_stats', 3)}
+   % endif
+
    function ${capi.get_name('get_analysis_unit_from_file')}
      (Context           : ${analysis_context_type};
       Filename, Charset : chars_ptr;
@@ -211,6 +273,21 @@ package ${ada_lib_name}.Analysis.C is
               "${capi.get_name('get_analysis_unit_from_buffer')}";
    ${ada_c_doc('langkit.get_unit_from_buffer', 3)}
 
+   procedure ${capi.get_name('get_analysis_units_from_files')}
+     (Context             : ${analysis_context_type};
+      Filenames           : System.Address;
+      Count               : size_t;
+      Charset             : chars_ptr;
+      Reparse             : int;
+      With_Trivia         : int;
+      Workers, Chunk_Size : unsigned;
+      Units               : System.Address)
+      with Export        => True,
+           Convention    => C,
+           External_name =>
+              "${capi.get_name('get_analysis_units_from_files')}";
+   ${ada_c_doc('langkit.get_units_from_files', 3)}
+
    % if ctx.default_unit_file_provider:
       function ${capi.get_name('get_analysis_unit_from_provider')}
         (Context     : ${analysis_context_type};
@@ -342,6 +419,17 @@ package ${ada_lib_name}.Analysis.C is
            External_name => "${capi.get_name('unit_reparse_from_buffer')}";
    ${ada_c_doc('langkit.unit_reparse_buffer', 3)}
 
+   procedure ${capi.get_name('unit_reparse_incremental')}
+     (Unit        : ${analysis_unit_type};
+      Charset     : chars_ptr;
+      Buffer      : chars_ptr;
+      Buffer_Size : size_t;
+      Edit        : ${sloc_range_type}_Ptr)
+      with Export        => True,
+           Convention    => C,
+           External_name => "${capi.get_name('unit_reparse_incremental')}";
+   ${ada_c_doc('langkit.unit_reparse_incremental', 3)}
+
    function ${capi.get_name('unit_populate_lexical_env')}
      (Unit : ${analysis_unit_type})
       return int
@@ -41,6 +41,12 @@ procedure Parse is
    File_Name  : aliased GNAT.Strings.String_Access;
    File_List  : aliased GNAT.Strings.String_Access;
    Print_Envs : aliased Boolean;
+   % if ctx.instrument_parsers:
+   Print_Parser_Stats : aliased Boolean;
+   % endif
+   % if ctx.instrument_properties:
+   Print_Property_Stats : aliased Boolean;
+   % endif
 
    Input_Str : Unbounded_String;
    Lookups   : String_Vectors.Vector;
@@ -61,6 +67,70 @@ procedure Parse is
       end loop;
    end Register_Lookups;
 
+   % if ctx.instrument_parsers:
+   -----------------------
+   -- Dump_Parser_Stats --
+   -----------------------
+
+   procedure Dump_Parser_Stats (Ctx : Analysis_Context) is
+   begin
+      if not Print_Parser_Stats then
+         return;
+      end if;
+
+      New_Line;
+      Put_Line ("==== Parser statistics ====");
+      for Rule in Grammar_Rule loop
+         declare
+            S : constant Parser_Rule_Statistics := Parser_Stats (Ctx) (Rule);
+         begin
+            Put_Line
+              (Grammar_Rule'Image (Rule) & ":"
+               & " calls=" & Long_Long_Integer'Image (S.Calls)
+               & " memo_hits=" & Long_Long_Integer'Image (S.Memo_Hits)
+               & " memo_misses=" & Long_Long_Integer'Image (S.Memo_Misses)
+               & " failures=" & Long_Long_Integer'Image (S.Failures)
+               & " tokens=" & Long_Long_Integer'Image (S.Tokens));
+         end;
+      end loop;
+   end Dump_Parser_Stats;
+   % endif
+
+   % if ctx.instrument_properties:
+   -------------------------
+   -- Dump_Property_Stats --
+   -------------------------
+
+   procedure Dump_Property_Stats (Ctx : Analysis_Context) is
+      Stats : constant Property_Statistics_Array := Property_Stats (Ctx);
+   begin
+      if not Print_Property_Stats then
+         return;
+      end if;
+
+      New_Line;
+      Put_Line ("==== Property statistics ====");
+      for Id in Property_Id loop
+         declare
+            S : Property_Statistics renames Stats (Id);
+         begin
+            --  Most properties are never evaluated: omit them
+
+            if S.Calls > 0 then
+               Put_Line
+                 (Property_Name (Id) & ":"
+                  & " calls=" & Long_Long_Integer'Image (S.Calls)
+                  & " memo_hits=" & Long_Long_Integer'Image (S.Memo_Hits)
+                  & " property_errors="
+                  & Long_Long_Integer'Image (S.Property_Errors)
+                  & " total_time=" & Duration'Image (S.Total_Time)
+                  & " self_time=" & Duration'Image (S.Self_Time));
+            end if;
+         end;
+      end loop;
+   end Dump_Property_Stats;
+   % endif
+
    ---------------------
    -- Process_Lookups --
    ---------------------
@@ -146,6 +216,12 @@ procedure Parse is
       --  Error recovery may make the parser return something even on error:
       --  process it anyway.
       Process_Node (Root (Unit));
+      % if ctx.instrument_parsers:
+      Dump_Parser_Stats (Ctx);
+      % endif
+      % if ctx.instrument_properties:
+      Dump_Property_Stats (Ctx);
+      % endif
       Destroy (Ctx);
    end Parse_Input;
 
@@ -226,6 +302,17 @@ begin
      (Config, File_List'Access, "-F:", "--file-list:",
       Help   => ("Parse files listed in the provided filename with the regular"
                  & " analysis circuitry (useful for timing measurements)"));
+   % if ctx.instrument_parsers:
+   Define_Switch
+     (Config, Print_Parser_Stats'Access, "-S", "--parser-stats",
+      Help   => "Print statistics about the parsing of each grammar rule");
+   % endif
+   % if ctx.instrument_properties:
+   Define_Switch
+     (Config, Print_Property_Stats'Access,
+      Long_Switch => "--property-stats",
+      Help        => "Print statistics about the evaluation of properties");
+   % endif
    begin
       Getopt (Config);
    exception
@@ -248,6 +335,12 @@ begin
             end;
          end loop;
          Close (F);
+         % if ctx.instrument_parsers:
+         Dump_Parser_Stats (Ctx);
+         % endif
+         % if ctx.instrument_properties:
+         Dump_Property_Stats (Ctx);
+         % endif
          Destroy (Ctx);
       end;
 
@@ -257,6 +350,12 @@ begin
       begin
          Register_Lookups;
          Process_File (File_Name.all, Ctx);
+         % if ctx.instrument_parsers:
+         Dump_Parser_Stats (Ctx);
+         % endif
+         % if ctx.instrument_properties:
+         Dump_Property_Stats (Ctx);
+         % endif
          Destroy (Ctx);
       end;
 
@@ -84,17 +84,49 @@ package body ${ada_lib_name}.Lexer is
            Convention    => C,
            External_Name => "${capi.get_name("next_token")}";
 
+   % if not lexer.track_indent:
+   procedure Set_Last_Token (Lexer : Lexer_Type; Id : Unsigned_16)
+      with Import        => True,
+           Convention    => C,
+           External_Name => "${capi.get_name("lexer_set_last_token")}";
+   --  Make Lexer behave as if it had just read a token whose kind is Id
+   % endif
+
    generic
       With_Trivia : Boolean;
    procedure Process_All_Tokens
-     (Lexer : Lexer_Type; TDH : in out Token_Data_Handler);
+     (Lexer      : Lexer_Type;
+      TDH        : in out Token_Data_Handler;
+      First      : Positive;
+      First_Sloc : Source_Location;
+      Resync     : access function (T : Token_Data_Type) return Boolean);
+   --  Read tokens from Lexer and append them to TDH. First is the index in
+   --  TDH.Source_Buffer of the first character Lexer reads, and First_Sloc is
+   --  its source location.
+   --
+   --  If Resync is not null, call it on each token before appending it and
+   --  stop as soon as it returns True: this is used to stop lexing when only
+   --  part of a source buffer needs to be lexed again.
+
+   procedure Lex_Decoded_Buffer
+     (Decoded_Buffer : Text_Access;
+      Source_First   : Positive;
+      Source_Last    : Natural;
+      TDH            : in out Token_Data_Handler;
+      With_Trivia    : Boolean);
+   --  Reset TDH to use Decoded_Buffer as its source buffer and extract tokens
+   --  out of it.
 
    ------------------------
    -- Process_All_Tokens --
    ------------------------
 
    procedure Process_All_Tokens
-     (Lexer : Lexer_Type; TDH : in out Token_Data_Handler)
+     (Lexer      : Lexer_Type;
+      TDH        : in out Token_Data_Handler;
+      First      : Positive;
+      First_Sloc : Source_Location;
+      Resync     : access function (T : Token_Data_Type) return Boolean)
    is
 
       Token                 : aliased Quex_Token_Type;
@@ -123,10 +155,15 @@ package body ${ada_lib_name}.Lexer is
       --  Get the current indent column in the stack
 
       Last_Line : Line_Number := 0;
+
+      --  Lexing never resumes in the middle of a buffer when tracking
+      --  indentation, so there is no need to resynchronize.
+
+      pragma Unreferenced (Resync);
       % endif
 
       function Source_First return Positive is
-        (Natural (Token.Offset) + TDH.Source_First - 1);
+        (Natural (Token.Offset) + First - 1);
       --  Index in TDH.Source_Buffer for the first character corresponding to
       --  the current token.
 
@@ -134,12 +171,30 @@ package body ${ada_lib_name}.Lexer is
         (Source_First + Natural (Token.Text_Length) - 1);
       --  Likewise, for the last character
 
+      function Column (L : Unsigned_32; C : Unsigned_16) return Column_Number
+      is
+        (if L = 1
+         then Column_Number (C) + First_Sloc.Column - 1
+         else Column_Number (C));
+      --  Turn a line/column number that Lexer yields into the corresponding
+      --  column number in TDH.Source_Buffer.
+
+      function Start_Column return Column_Number is
+        (Column (Token.Start_Line, Token.Start_Column));
+      function End_Column return Column_Number is
+        (Column (Token.End_Line, Token.End_Column));
+      --  Columns for the start and the end of the current token
+
+      % if lexer.track_indent:
       function Sloc_Range return Source_Location_Range is
         ((Line_Number (Token.Start_Line),
           Line_Number (Token.End_Line),
-          Column_Number (Token.Start_Column),
-          Column_Number (Token.End_Column)));
-      --  Create a sloc range value corresponding to Token
+          Start_Column,
+          End_Column));
+      --  Create a sloc range value corresponding to Token. As lexing always
+      --  starts at the beginning of the buffer when tracking indentation,
+      --  there is no need to adjust line numbers.
+      % endif
 
       procedure Prepare_For_Trivia
         with Inline;
@@ -219,7 +274,8 @@ package body ${ada_lib_name}.Lexer is
                                    Source_First => Source_First,
                                    Source_Last  => Source_Last,
                                    Symbol       => null,
-                                   Sloc_Range   => Sloc_Range)));
+                                   Start_Column => Start_Column,
+                                   End_Column   => End_Column)));
 
                   Last_Token_Was_Trivia := True;
                end if;
@@ -239,16 +295,22 @@ package body ${ada_lib_name}.Lexer is
          --  rest of our machinery (in particular source slices) works well
          --  with it.
 
-         TDH.Tokens.Append
-           ((Kind         => Token_Id,
-             Source_First => (if Token_Id = ${termination}
-                              then TDH.Source_Last + 1
-                              else Source_First),
-             Source_Last  => (if Token_Id = ${termination}
-                              then TDH.Source_Last
-                              else Source_Last),
-             Symbol       => Symbol,
-             Sloc_Range   => Sloc_Range));
+         declare
+            T : constant Token_Data_Type :=
+              (Kind         => Token_Id,
+               Source_First => (if Token_Id = ${termination}
+                                then TDH.Source_Last + 1
+                                else Source_First),
+               Source_Last  => (if Token_Id = ${termination}
+                                then TDH.Source_Last
+                                else Source_Last),
+               Symbol       => Symbol,
+               Start_Column => Start_Column,
+               End_Column   => End_Column);
+         begin
+            exit when Resync /= null and then Resync (T);
+            TDH.Tokens.Append (T);
+         end;
 
          ##  This whole section is only emitted if the user chose to track
          ##  indentation in the lexer. It has complex machinery to emit
@@ -264,7 +326,8 @@ package body ${ada_lib_name}.Lexer is
                    Source_First => TDH.Source_Last + 1,
                    Source_Last  => TDH.Source_Last,
                    Symbol       => null,
-                   Sloc_Range   => Sloc_Range));
+                   Start_Column => Start_Column,
+                   End_Column   => End_Column));
                Columns_Stack_Len := Columns_Stack_Len - 1;
             end loop;
          end if;
@@ -310,9 +373,8 @@ package body ${ada_lib_name}.Lexer is
                   Source_First => Source_First + 1,
                   Source_Last  => Source_First,
                   Symbol       => null,
-                  Sloc_Range   =>
-                    (Sloc_Range.Start_Line, Sloc_Range.Start_Line,
-                     Sloc_Range.Start_Column, Sloc_Range.Start_Column));
+                  Start_Column => Start_Column,
+                  End_Column   => Start_Column);
             begin
                if Sloc_Range.Start_Column < Get_Col then
                   --  Emit every necessary dedent token if the line is
@@ -356,7 +418,8 @@ package body ${ada_lib_name}.Lexer is
                                  then TDH.Source_Last
                                  else Source_Last),
                 Symbol       => Symbol,
-                Sloc_Range   => Sloc_Range));
+                Start_Column => Start_Column,
+                End_Column   => End_Column));
          end if;
          % endif
 
@@ -424,22 +487,329 @@ package body ${ada_lib_name}.Lexer is
    begin
       Decode_Buffer
         (Buffer, Charset, Read_BOM, Decoded_Buffer, Source_First, Source_Last);
-      Lexer := Lexer_From_Buffer
-        (Decoded_Buffer.all'Address,
-         size_t (Source_Last - Source_First + 1));
+      Lex_Decoded_Buffer
+        (Decoded_Buffer, Source_First, Source_Last, TDH, With_Trivia);
+   end Lex_From_Buffer;
 
+   ------------------------
+   -- Lex_Decoded_Buffer --
+   ------------------------
+
+   procedure Lex_Decoded_Buffer
+     (Decoded_Buffer : Text_Access;
+      Source_First   : Positive;
+      Source_Last    : Natural;
+      TDH            : in out Token_Data_Handler;
+      With_Trivia    : Boolean)
+   is
+      Lexer : constant Lexer_Type := Lexer_From_Buffer
+        (Decoded_Buffer.all'Address, size_t (Source_Last - Source_First + 1));
+   begin
       --  In the case we are reparsing an analysis unit, we want to get rid of
       --  the tokens from the old one.
 
       Reset (TDH, Decoded_Buffer, Source_First, Source_Last);
 
       if With_Trivia then
-         Process_All_Tokens_With_Trivia (Lexer, TDH);
+         Process_All_Tokens_With_Trivia
+           (Lexer, TDH, Source_First, (1, 1), null);
       else
-         Process_All_Tokens_No_Trivia (Lexer, TDH);
+         Process_All_Tokens_No_Trivia
+           (Lexer, TDH, Source_First, (1, 1), null);
       end if;
       Free_Lexer (Lexer);
-   end Lex_From_Buffer;
+   end Lex_Decoded_Buffer;
+
+   -----------------------
+   -- Relex_From_Buffer --
+   -----------------------
+
+   procedure Relex_From_Buffer
+     (Buffer, Charset : String;
+      Read_BOM        : Boolean;
+      TDH             : in out Token_Data_Handler;
+      With_Trivia     : Boolean;
+      Edit            : Source_Location_Range)
+   is
+      Decoded_Buffer : Text_Access;
+      Source_First   : Positive;
+      Source_Last    : Natural;
+      % if lexer.track_indent:
+      pragma Unreferenced (Edit);
+      % endif
+   begin
+      Decode_Buffer
+        (Buffer, Charset, Read_BOM, Decoded_Buffer, Source_First, Source_Last);
+
+      % if lexer.track_indent:
+      --  The indentation stack makes the lexer state depend on all previous
+      --  tokens, so there is no way to resume lexing in the middle of the
+      --  source buffer.
+
+      Lex_Decoded_Buffer
+        (Decoded_Buffer, Source_First, Source_Last, TDH, With_Trivia);
+      % else:
+      declare
+         Last_Old : constant Natural := Last_Index (TDH.Tokens);
+
+         Prefix_Shift : constant Integer := Source_First - TDH.Source_First;
+         Tail_Shift   : constant Integer :=
+            Source_Last - TDH.Source_Last + Prefix_Shift;
+         --  Offsets to add to the index of characters in the old source
+         --  buffer that come before/after Edit to get the index of the same
+         --  characters in the new source buffer.
+
+         Restart : Natural := 0;
+         --  Index of the first old token to lex again
+
+         Sync : Positive := 1;
+         --  Index of the old token that may match the token that Resync
+         --  processes.
+
+         Synced      : Boolean := False;
+         Sync_Column : Column_Number;
+         --  Whether Resync found a match, and the new start column for the
+         --  matching token.
+
+         function Resync (T : Token_Data_Type) return Boolean;
+         --  Return whether T, a new token, matches an old one that comes after
+         --  Edit, so that all tokens from it are the same as before.
+
+         procedure Shift (T : in out Token_Data_Type);
+         --  Move T, an old token that comes after Edit, to its location in
+         --  the new source buffer.
+
+         ------------
+         -- Resync --
+         ------------
+
+         function Resync (T : Token_Data_Type) return Boolean is
+         begin
+            while Sync <= Last_Old
+              and then Get (TDH.Tokens, Sync).Source_First + Tail_Shift
+                       < T.Source_First
+            loop
+               Sync := Sync + 1;
+            end loop;
+
+            if Sync <= Last_Old then
+               declare
+                  Old : constant Token_Data_Type := Get (TDH.Tokens, Sync);
+               begin
+                  Synced := Old.Kind = T.Kind
+                    and then Old.Source_First + Tail_Shift = T.Source_First
+                    and then Old.Source_Last + Tail_Shift = T.Source_Last;
+                  Sync_Column := T.Start_Column;
+               end;
+            end if;
+            return Synced;
+         end Resync;
+
+         Column_Delta  : Column_Number;
+         Sync_Line_End : Positive;
+         --  Tokens that come after Edit and that are on the same line as the
+         --  first of them move by Column_Delta columns. Sync_Line_End is the
+         --  index in the new source buffer of the line feed that ends this
+         --  line (Source_Last + 1 if there is none). Line numbers need no
+         --  update as they are computed from the source buffer.
+
+         -----------
+         -- Shift --
+         -----------
+
+         procedure Shift (T : in out Token_Data_Type) is
+         begin
+            T.Source_First := T.Source_First + Tail_Shift;
+            T.Source_Last := T.Source_Last + Tail_Shift;
+            if T.Source_First <= Sync_Line_End then
+               T.Start_Column := T.Start_Column + Column_Delta;
+            end if;
+            if T.Source_Last + 1 <= Sync_Line_End then
+               T.End_Column := T.End_Column + Column_Delta;
+            end if;
+         end Shift;
+
+      begin
+         --  Look for the last token that ends before Edit, and restart lexing
+         --  from the token before it: lexing a token can depend on the
+         --  characters that follow it, so this leaves some margin.
+
+         declare
+            Low  : Natural := 1;
+            High : Natural := Last_Old;
+         begin
+            while Low <= High loop
+               declare
+                  Middle : constant Positive := (Low + High) / 2;
+               begin
+                  if Compare
+                    (Start_Sloc (Edit),
+                     End_Sloc (Sloc_Range (TDH, Get (TDH.Tokens, Middle))))
+                     = Before
+                  then
+                     Restart := Middle - 1;
+                     Low := Middle + 1;
+                  else
+                     High := Middle - 1;
+                  end if;
+               end;
+            end loop;
+         end;
+
+         --  Lex the whole buffer when Edit is too close to its beginning, and
+         --  when trivia settings changed, as TDH would then need trivia that
+         --  it does not have (or the other way round).
+
+         if Restart = 0
+           or else (Length (TDH.Tokens_To_Trivias) > 0) /= With_Trivia
+         then
+            Lex_Decoded_Buffer
+              (Decoded_Buffer, Source_First, Source_Last, TDH, With_Trivia);
+            return;
+         end if;
+
+         declare
+            Restart_Token : constant Token_Data_Type :=
+               Get (TDH.Tokens, Restart);
+            First         : constant Positive :=
+               Restart_Token.Source_First + Prefix_Shift;
+            HT            : constant Wide_Wide_Character :=
+               Wide_Wide_Character'Val (9);
+            LF            : constant Wide_Wide_Character :=
+               Wide_Wide_Character'Val (10);
+         begin
+            --  Lexer computes columns assuming that it starts at the
+            --  beginning of a line, which is wrong for tabulations that follow
+            --  the restart token on the same line: lex the whole buffer in
+            --  this case too.
+
+            for C of Decoded_Buffer (First .. Source_Last) loop
+               exit when C = LF;
+               if C = HT then
+                  Lex_Decoded_Buffer
+                    (Decoded_Buffer, Source_First, Source_Last, TDH,
+                     With_Trivia);
+                  return;
+               end if;
+            end loop;
+
+            --  Old tokens that start inside Edit cannot match new ones
+
+            Sync := Restart;
+            while Sync <= Last_Old
+              and then Compare
+                (End_Sloc (Edit),
+                 Start_Sloc (Sloc_Range (TDH, Get (TDH.Tokens, Sync))))
+                 = Before
+            loop
+               Sync := Sync + 1;
+            end loop;
+
+            --  Lex the new source from the restart token, in a separate token
+            --  data handler. Lexer requires two null characters before the
+            --  text it processes, so temporarily override the characters
+            --  before the restart token.
+
+            declare
+               Nul    : constant Wide_Wide_Character :=
+                  Wide_Wide_Character'Val (0);
+               Saved  : constant Text_Type :=
+                  Decoded_Buffer (First - 2 .. First - 1);
+               Start  : constant Source_Location :=
+                  Start_Sloc (Sloc_Range (TDH, Restart_Token));
+               Region : Token_Data_Handler;
+               Lexer  : Lexer_Type;
+            begin
+               Initialize (Region, TDH.Symbols);
+               Region.Source_Buffer := Decoded_Buffer;
+               Region.Source_First := Source_First;
+               Region.Source_Last := Source_Last;
+
+               Decoded_Buffer (First - 2 .. First - 1) := (Nul, Nul);
+               Lexer := Lexer_From_Buffer
+                 (Decoded_Buffer (First - 2)'Address,
+                  size_t (Source_Last - First + 1));
+               if Restart > 1 then
+                  Set_Last_Token
+                    (Lexer,
+                     Unsigned_16 (Token_Kind'Enum_Rep
+                       (Get (TDH.Tokens, Restart - 1).Kind)));
+               end if;
+
+               if With_Trivia then
+                  Process_All_Tokens_With_Trivia
+                    (Lexer, Region, First, Start, Resync'Access);
+               else
+                  Process_All_Tokens_No_Trivia
+                    (Lexer, Region, First, Start, Resync'Access);
+               end if;
+               Free_Lexer (Lexer);
+               Decoded_Buffer (First - 2 .. First - 1) := Saved;
+
+               --  The termination token always matches, so not finding a
+               --  match means something went wrong: be safe and lex the whole
+               --  buffer.
+
+               if Synced then
+                  declare
+                     Old_Sync : constant Token_Data_Type :=
+                        Get (TDH.Tokens, Sync);
+                  begin
+                     Column_Delta := Sync_Column - Old_Sync.Start_Column;
+                     Sync_Line_End := Old_Sync.Source_First + Tail_Shift;
+                     while Sync_Line_End <= Source_Last
+                       and then Decoded_Buffer (Sync_Line_End) /= LF
+                     loop
+                        Sync_Line_End := Sync_Line_End + 1;
+                     end loop;
+                  end;
+                  Replace_Tokens (TDH, Token_Index (Restart),
+                                  Token_Index (Sync - 1), Region);
+                  Sync := Restart + Length (Region.Tokens);
+               end if;
+
+               Region.Source_Buffer := null;
+               Free (Region);
+            end;
+         end;
+
+         if not Synced then
+            Lex_Decoded_Buffer
+              (Decoded_Buffer, Source_First, Source_Last, TDH, With_Trivia);
+            return;
+         end if;
+
+         Free (TDH.Source_Buffer);
+         Free (TDH.Compact_Buffer);
+         TDH.Source_Buffer := Decoded_Buffer;
+         TDH.Source_First := Source_First;
+         TDH.Source_Last := Source_Last;
+         Index_Lines (TDH);
+
+         --  Finally move tokens (and trivia) that come after Edit
+
+         if Tail_Shift /= 0 or else Column_Delta /= 0 then
+            for I in Sync .. Last_Index (TDH.Tokens) loop
+               Shift (Get_Access (TDH.Tokens, I).all);
+
+               if With_Trivia then
+                  declare
+                     Index : Integer := Get (TDH.Tokens_To_Trivias, I + 1);
+                  begin
+                     if Index /= Integer (No_Token_Index) then
+                        loop
+                           Shift (Get_Access (TDH.Trivias, Index).all.T);
+                           exit when not Get (TDH.Trivias, Index).Has_Next;
+                           Index := Index + 1;
+                        end loop;
+                     end if;
+                  end;
+               end if;
+            end loop;
+         end if;
+      end;
+      % endif
+   end Relex_From_Buffer;
 
    -------------------
    -- Decode_Buffer --
@@ -600,8 +970,8 @@ package body ${ada_lib_name}.Lexer is
    begin
       if T.Symbol = null then
          declare
-            Text : Text_Type renames
-               TDH.Source_Buffer (T.Source_First ..  T.Source_Last);
+            Text : constant Text_Type :=
+               Token_Data_Handlers.Text (TDH, T.Source_First, T.Source_Last);
          begin
             T.Symbol := Find
               (TDH.Symbols,
@@ -27,6 +27,12 @@ package ${ada_lib_name}.Lexer is
       Kind         : Token_Kind;
       --  Kind for this token
 
+      Start_Column : Column_Number;
+      End_Column   : Column_Number;
+      --  Columns for the start and the (exclusive) end of this token. Line
+      --  numbers are not stored in tokens: see the Sloc_Range function
+      --  below.
+
       Source_First : Positive;
       Source_Last  : Natural;
       --  Bounds in the source buffer corresponding to this token
@@ -36,12 +42,9 @@ package ${ada_lib_name}.Lexer is
       --  this is either null or the symbolization of the token text.
       --
       --  For instance: null for keywords but actual text for identifiers.
-
-      Sloc_Range   : Source_Location_Range;
-      --  Source location range for this token. Note that the end bound is
-      --  exclusive.
-
    end record;
+   --  Tokens are the most numerous objects in an analysis unit, so keep
+   --  this record small: small components come first to avoid padding.
 
    package Token_Data_Handlers is new Langkit_Support.Token_Data_Handlers
      (Token_Data_Type);
@@ -68,13 +71,27 @@ package ${ada_lib_name}.Lexer is
    --  Likewise, but extract tokens from an in-memory buffer. This never raises
    --  an exception.
 
+   procedure Relex_From_Buffer (Buffer, Charset : String;
+                                Read_BOM        : Boolean;
+                                TDH             : in out Token_Data_Handler;
+                                With_Trivia     : Boolean;
+                                Edit            : Source_Location_Range);
+   --  Likewise, but assume that TDH contains the tokens for a previous
+   --  version of the source in Buffer, and that the only difference between
+   --  the two is that the text in Edit, a source location range in the
+   --  previous version, was replaced. Only lex again the tokens from a bit
+   --  before Edit until the tokens that follow it, and patch TDH in place.
+   --
+   --  When this is not possible (for instance when TDH contains trivia while
+   --  With_Trivia is False), lex the whole buffer instead.
+
    function Token_Kind_Name (Token_Id : Token_Kind) return String;
    ${ada_doc('langkit.token_kind_name', 3)}
 
    function Text
      (TDH : Token_Data_Handler;
       T   : Token_Data_Type) return Text_Type
-   is (TDH.Source_Buffer.all (T.Source_First .. T.Source_Last));
+   is (Text (TDH, T.Source_First, T.Source_Last));
    --  Return the text associated to T, a token that belongs to TDH
 
    function Image
@@ -84,6 +101,16 @@ package ${ada_lib_name}.Lexer is
    --  Debug helper: return a human-readable representation of T, a token that
    --  belongs to TDH.
 
+   function Sloc_Range
+     (TDH : Token_Data_Handler;
+      T   : Token_Data_Type) return Source_Location_Range
+   is ((Start_Line   => Get_Line (TDH, T.Source_First),
+        End_Line     => Get_Line (TDH, T.Source_Last + 1),
+        Start_Column => T.Start_Column,
+        End_Column   => T.End_Column));
+   --  Return the source location range for T, a token that belongs to TDH.
+   --  Note that the end bound is exclusive.
+
    function Force_Symbol
      (TDH : Token_Data_Handler;
       T   : in out Token_Data_Type) return Symbol_Type;
@@ -62,3 +62,10 @@ ${capi.get_name("next_token")}(Lexer* lexer, struct token* tok) {
 
     return tok->id != 0;
 }
+
+void
+${capi.get_name("lexer_set_last_token")}(Lexer* lexer, uint16_t id) {
+    /* Lexers that start in the middle of a source buffer must behave as if
+       they had just read a token of kind ID: see next_token.  */
+    lexer->buffer_tk._id = id;
+}
@@ -32,4 +32,7 @@ ${capi.get_name("free_lexer")}(Lexer* lexer);
 int
 ${capi.get_name("next_token")}(Lexer* lexer, struct token* tok);
 
+void
+${capi.get_name("lexer_set_last_token")}(Lexer* lexer, uint16_t id);
+
 #endif
@@ -1,8 +1,11 @@
 ## vim: filetype=makoada
 
-<% ret_type = parser.get_type().storage_type_name() %>
-
-${parser.gen_fn_name}_Memo : ${ret_type}_Memos.Memo_Type;
+<%
+   ret_type = parser.get_type().storage_type_name()
+   memo = 'Parser.Private_Part.{}_Memo'.format(parser.gen_fn_name)
+   pos = parser_context.pos_var_name
+   rule = '{}_Rule'.format(Name.from_lower(parser.name))
+%>
 
 function ${parser.gen_fn_name} (Parser : in out Parser_Type;
                                 Pos    : Token_Index)
@@ -13,26 +16,68 @@ is
          ${":= " + typ.storage_nullexpr() if typ.storage_nullexpr() else ""};
    % endfor
 
-   % if parser.is_left_recursive():
+   % if seed_growing:
       Mem_Pos : Token_Index := Pos;
       Mem_Res : ${ret_type} := ${parser.get_type().storage_nullexpr()};
    % endif
 
-   M : ${ret_type}_Memos.Memo_Entry := Get (${parser.gen_fn_name}_Memo, Pos);
+   % if parser.is_memoized:
+      M : ${ret_type}_Memos.Memo_Entry := Get (${memo}, Pos);
+   % endif
+
+   % if ctx.instrument_parsers:
+      Stats : Parser_Rule_Statistics renames
+         Parser.Private_Part.Stats (${rule});
+   % endif
 
 begin
 
+   % if ctx.instrument_parsers:
+   Stats.Calls := Stats.Calls + 1;
+   % endif
+
+   % if parser.is_memoized:
    if M.State = Success then
+      % if ctx.instrument_parsers:
+      Stats.Memo_Hits := Stats.Memo_Hits + 1;
+      Stats.Tokens := Stats.Tokens + Long_Long_Integer (M.Final_Pos - Pos);
+      % endif
       Parser.Current_Pos := M.Final_Pos;
       ${parser_context.res_var_name} := M.Instance;
       return ${parser_context.res_var_name};
    elsif M.State = Failure then
+      % if ctx.instrument_parsers:
+      Stats.Memo_Hits := Stats.Memo_Hits + 1;
+      Stats.Failures := Stats.Failures + 1;
+      % endif
       Parser.Current_Pos := No_Token_Index;
       return ${parser_context.res_var_name};
    end if;
 
-   % if parser.is_left_recursive():
-       Set (${parser.gen_fn_name}_Memo,
+   % if ctx.instrument_parsers:
+   Stats.Memo_Misses := Stats.Memo_Misses + 1;
+   % endif
+   % endif
+
+   ## Reuse the result from a previous parsing, if any
+   if not Parser.Private_Part.Reusable.Is_Empty then
+      declare
+         R : Parse_Result;
+      begin
+         Get_Reusable (Parser, ${rule}, Pos, R);
+         if R.Final /= No_Token_Index then
+            % if ctx.instrument_parsers:
+            Stats.Tokens := Stats.Tokens + Long_Long_Integer (R.Final - Pos);
+            % endif
+            Parser.Current_Pos := R.Final;
+            ${parser_context.res_var_name} := ${ret_type} (R.Node);
+            return ${parser_context.res_var_name};
+         end if;
+      end;
+   end if;
+
+   % if seed_growing:
+       Set (${memo},
             False,
             ${parser_context.res_var_name},
             Pos,
@@ -51,11 +96,11 @@ begin
    -- END MAIN COMBINATORS CODE --
    -------------------------------
 
-   % if parser.is_left_recursive():
+   % if seed_growing:
       if ${parser_context.pos_var_name} > Mem_Pos then
          Mem_Pos := ${parser_context.pos_var_name};
          Mem_Res := ${parser_context.res_var_name};
-         Set (${parser.gen_fn_name}_Memo,
+         Set (${memo},
               ${parser_context.pos_var_name} /= No_Token_Index,
               ${parser_context.res_var_name},
               Pos,
@@ -69,16 +114,31 @@ begin
       end if;
    % endif
 
-   Set (${parser.gen_fn_name}_Memo,
+   % if parser.is_memoized:
+   Set (${memo},
         ${parser_context.pos_var_name} /= No_Token_Index,
         ${parser_context.res_var_name},
         Pos,
         ${parser_context.pos_var_name});
+   % endif
 
-   % if parser.is_left_recursive():
+   % if seed_growing:
        <<No_Memo>>
    % endif
 
+   if Parser.Record_Results and then ${pos} /= No_Token_Index then
+      Record_Result (Parser, ${rule}, Pos, ${pos},
+                     ${root_node_type_name} (${parser_context.res_var_name}));
+   end if;
+
+   % if ctx.instrument_parsers:
+   if ${pos} = No_Token_Index then
+      Stats.Failures := Stats.Failures + 1;
+   else
+      Stats.Tokens := Stats.Tokens + Long_Long_Integer (${pos} - Pos);
+   end if;
+   % endif
+
    Parser.Current_Pos := ${parser_context.pos_var_name};
 
    return ${parser_context.res_var_name};
@@ -0,0 +1,23 @@
+## vim: filetype=makoada
+
+--  Start left_recursion_code
+
+${operand.code}
+${pos} := ${operand.pos_var_name};
+${res} := ${parser.get_type().storage_type_name()} (${operand.res_var_name});
+
+if ${pos} /= No_Token_Index then
+   loop
+      ${extension.code}
+
+      ## Stop as soon as the match cannot be extended anymore
+      exit when ${extension.pos_var_name} = No_Token_Index
+                or else ${extension.pos_var_name} <= ${pos};
+
+      ${pos} := ${extension.pos_var_name};
+      ${res} := ${parser.get_type().storage_type_name()}
+        (${extension.res_var_name});
+   end loop;
+end if;
+
+--  End left_recursion_code
@@ -39,7 +39,8 @@ if ${parser_context.pos_var_name} = No_Token_Index then
                            if is_tok(parser.parser) else
                            repr(parser.parser)) %>
         Parser.Diagnostics.Append
-          ((Get_Token (Parser.TDH.all, ${pos_name}).Sloc_Range,
+          ((Lexer.Sloc_Range
+              (Parser.TDH.all, Get_Token (Parser.TDH.all, ${pos_name})),
             To_Unbounded_Wide_Wide_String (To_Text
             ("Missing '${missing_item}'"))));
     % endif
@@ -4,7 +4,23 @@
 
 ${pos} := No_Token_Index;
 ${res} := ${parser.get_type().storage_nullexpr()};
-% for ctx in results:
+
+% if dispatch:
+## Jump to the first alternative that can start with the current token
+case Token_Vectors.Get (Parser.TDH.Tokens, Natural (${pos_name})).Kind is
+   % for i, kinds in dispatch:
+   when ${' | '.join(kinds)} =>
+      goto ${alt_labels[i]};
+   % endfor
+   when others =>
+      null;
+end case;
+% endif
+
+% for i, ctx in enumerate(results):
+    % if i in alt_labels:
+    <<${alt_labels[i]}>>
+    % endif
     ${ctx.code}
     if ${ctx.pos_var_name} /= No_Token_Index then
         ${pos} := ${ctx.pos_var_name};
@@ -1,6 +1,12 @@
 ## vim: filetype=makoada
 
+with Ada.Containers;                  use Ada.Containers;
+with Ada.Containers.Hashed_Maps;
+with Ada.Containers.Hashed_Sets;
 with Ada.Strings.Wide_Wide_Unbounded; use Ada.Strings.Wide_Wide_Unbounded;
+with Ada.Unchecked_Deallocation;
+
+with System.Storage_Elements; use System.Storage_Elements;
 
 with Langkit_Support.Diagnostics; use Langkit_Support.Diagnostics;
 with Langkit_Support.Packrat;
@@ -8,21 +14,32 @@ with Langkit_Support.Text;    use Langkit_Support.Text;
 
 package body ${ada_lib_name}.Analysis.Parsers is
 
-   --  Prepare packrat instantiations: one per enum type and onefor each kind
-   --  of node (including lists). Likewise for bump ptr. allocators, except
-   --  we need them only for non-abstract AST nodes.
+   --  Prepare packrat instantiations: one per enum type and one for each kind
+   --  of node (including lists), skipping types that no memoized parser
+   --  returns. Likewise for bump ptr. allocators, except we need them only
+   --  for non-abstract AST nodes.
+
+   <%
+      memo_pkgs = set(p.memo_pkg for p in ctx.generated_parsers
+                      if p.memo_pkg)
+      memoized_parsers = [p for p in ctx.generated_parsers if p.memo_type]
+   %>
 
    pragma Warnings (Off, "is not referenced");
    % for enum_type in ctx.enum_types:
+      % if '{}_Memos'.format(enum_type.name()) in memo_pkgs:
       package ${enum_type.name()}_Memos is new Langkit_Support.Packrat
         (${enum_type.name()}, Token_Index);
       use ${enum_type.name()}_Memos;
+      % endif
    % endfor
 
    % for cls in ctx.astnode_types:
+      % if '{}_Memos'.format(cls.name()) in memo_pkgs:
       package ${cls.name()}_Memos is new Langkit_Support.Packrat
         (${cls.name()}, Token_Index);
       use ${cls.name()}_Memos;
+      % endif
 
       % if not cls.abstract:
          package ${cls.name()}_Alloc is
@@ -31,6 +48,80 @@ package body ${ada_lib_name}.Analysis.Parsers is
    % endfor
    pragma Warnings (On, "is not referenced");
 
+   type Reuse_Key is record
+      Rule : Grammar_Rule;
+      Pos  : Token_Index;
+   end record;
+
+   function Hash (Key : Reuse_Key) return Hash_Type is
+     (Hash_Type'Mod (Key.Pos) * 31 + Grammar_Rule'Pos (Key.Rule));
+
+   type Reusable_Result is record
+      Result : Parse_Result;
+      --  Result to reuse, with token indexes in the new token stream
+
+      Offset : Integer;
+      --  Offset to add to token indexes in Result.Node to move them in the
+      --  new token stream.
+   end record;
+
+   package Reusable_Maps is new Ada.Containers.Hashed_Maps
+     (Key_Type        => Reuse_Key,
+      Element_Type    => Reusable_Result,
+      Hash            => Hash,
+      Equivalent_Keys => "=");
+
+   function Hash (Node : ${root_node_type_name}) return Hash_Type is
+     (Hash_Type'Mod (To_Integer (Node.all'Address)));
+
+   package Node_Offset_Maps is new Ada.Containers.Hashed_Maps
+     (Key_Type        => ${root_node_type_name},
+      Element_Type    => Integer,
+      Hash            => Hash,
+      Equivalent_Keys => "=");
+
+   package Node_Sets is new Ada.Containers.Hashed_Sets
+     (Element_Type        => ${root_node_type_name},
+      Hash                => Hash,
+      Equivalent_Elements => "=");
+
+   type Parser_Private_Part_Type is record
+      % for parser in memoized_parsers:
+      ${parser.name}_Memo : ${parser.memo_type};
+      % endfor
+      % if ctx.instrument_parsers:
+      Stats : Parser_Statistics_Array;
+      --  Statistics about each grammar rule
+      % endif
+
+      Lookahead : Token_Index := No_Token_Index;
+      --  Index of the furthest token that parsing may have examined so far,
+      --  maintained only when Parser.Record_Results is True.
+
+      Results : Parse_Result_Vectors.Vector;
+      --  Rule results recorded when Parser.Record_Results is True
+
+      Reusable : Reusable_Maps.Map;
+      --  Rule results from a previous parsing that are still valid, indexed
+      --  by rule and start token in the new token stream.
+
+      Reused : Node_Offset_Maps.Map;
+      --  Nodes from Reusable that parsing returned, associated to the offset
+      --  to add to their token indexes.
+
+      Live : Node_Sets.Set;
+      --  When Record_Results is True, set of nodes in the tree that parsing
+      --  returned, except the children of reused nodes. Nodes that parsing
+      --  created and then discarded (for instance when backtracking) are not
+      --  in this set.
+   end record;
+   --  Memoization tables for all parsing functions, and data for incremental
+   --  reparsing. Each parser owns one instance of this record, so that parsers
+   --  do not share any mutable state.
+
+   procedure Free is new Ada.Unchecked_Deallocation
+     (Parser_Private_Part_Type, Parser_Private_Part);
+
    % for parser in ctx.generated_parsers:
    ${parser.spec}
    % endfor
@@ -43,6 +134,33 @@ package body ${ada_lib_name}.Analysis.Parsers is
    --  the parsing failed (Parser.Current_Pos = No_Token_Index), append
    --  corresponding diagnostics to Parser.Diagnostics, do nothing instead.
 
+   procedure Record_Result
+     (Parser       : in out Parser_Type;
+      Rule         : Grammar_Rule;
+      Start, Final : Token_Index;
+      Node         : ${root_node_type_name});
+   --  Record in Parser the successful parsing of Rule from Start to Final
+
+   procedure Get_Reusable
+     (Parser : in out Parser_Type;
+      Rule   : Grammar_Rule;
+      Pos    : Token_Index;
+      Result : out Parse_Result);
+   --  If Parser can reuse a result for the parsing of Rule at Pos, return it
+   --  in Result. Set Result.Final to No_Token_Index otherwise.
+
+   procedure Adopt_Reused_Nodes
+     (Parser : in out Parser_Type;
+      Root   : ${root_node_type_name});
+   --  Set parents in the tree that Parse just created, moving nodes that it
+   --  reused in the new token stream on the way.
+
+   procedure Collect_Live_Nodes
+     (Parser : in out Parser_Type;
+      Root   : ${root_node_type_name});
+   --  Fill Parser.Private_Part.Live with the nodes in the tree that Parse
+   --  just returned, not descending into nodes that it reused.
+
    ----------------------
    -- Create_From_File --
    ----------------------
@@ -63,6 +181,7 @@ package body ${ada_lib_name}.Analysis.Parsers is
               Symbol_Literals =>
                  Unit.Context.Symbol_Literals'Unrestricted_Access,
               % endif
+              Private_Part    => new Parser_Private_Part_Type,
               others          => <>);
    end Create_From_File;
 
@@ -74,18 +193,25 @@ package body ${ada_lib_name}.Analysis.Parsers is
      (Buffer, Charset : String;
       Read_BOM        : Boolean;
       Unit            : Analysis_Unit;
-      With_Trivia     : Boolean := False)
+      With_Trivia     : Boolean := False;
+      Edit            : Source_Location_Range := No_Source_Location_Range)
       return Parser_type
    is
       TDH : Token_Data_Handler_Access renames Token_Data (Unit);
    begin
-      Lex_From_Buffer (Buffer, Charset, Read_BOM, TDH.all, With_Trivia);
+      if Edit = No_Source_Location_Range then
+         Lex_From_Buffer (Buffer, Charset, Read_BOM, TDH.all, With_Trivia);
+      else
+         Relex_From_Buffer
+           (Buffer, Charset, Read_BOM, TDH.all, With_Trivia, Edit);
+      end if;
       return (Unit            => Unit,
               TDH             => TDH,
               % if ctx.symbol_literals:
               Symbol_Literals =>
                  Unit.Context.Symbol_Literals'Unrestricted_Access,
               % endif
+              Private_Part    => new Parser_Private_Part_Type,
               others          => <>);
    end Create_From_Buffer;
 
@@ -103,7 +229,7 @@ package body ${ada_lib_name}.Analysis.Parsers is
             Get_Token (Parser.TDH.all, Parser.Last_Fail.Pos);
          D : constant Diagnostic :=
            (if Parser.Last_Fail.Kind = Token_Fail then
-             (Sloc_Range => Last_Token.Sloc_Range,
+             (Sloc_Range => Lexer.Sloc_Range (Parser.TDH.all, Last_Token),
               Message    => To_Unbounded_Wide_Wide_String (To_Text
                 ("Expected """
                  & Token_Kind_Name (Parser.Last_Fail.Expected_Token_Id)
@@ -111,7 +237,7 @@ package body ${ada_lib_name}.Analysis.Parsers is
                  & Token_Kind_Name (Parser.Last_Fail.Found_Token_Id)
                  & """")))
             else
-              (Sloc_Range => Last_Token.Sloc_Range,
+              (Sloc_Range => Lexer.Sloc_Range (Parser.TDH.all, Last_Token),
                Message => To_Unbounded_Wide_Wide_String
                  (To_Text (Parser.Last_Fail.Custom_Message.all))));
       begin
@@ -133,7 +259,8 @@ package body ${ada_lib_name}.Analysis.Parsers is
                First_Garbage_Token : Lexer.Token_Data_Type renames
                   Get_Token (Parser.TDH.all, Parser.Current_Pos);
                D                   : constant Diagnostic :=
-                 (Sloc_Range => First_Garbage_Token.Sloc_Range,
+                 (Sloc_Range => Lexer.Sloc_Range
+                                  (Parser.TDH.all, First_Garbage_Token),
                   Message    => To_Unbounded_Wide_Wide_String (To_Text
                     ("End of input expected, got """
                      & Token_Kind_Name (First_Garbage_Token.Kind)
@@ -172,24 +299,390 @@ package body ${ada_lib_name}.Analysis.Parsers is
       % endfor
       end case;
       Process_Parsing_Error (Parser, Check_Complete);
-      Clean_All_Memos;
-      Set_Parents (Result, null);
+
+      --  When reusing nodes from a previous parsing, setting parents can stop
+      --  at reused nodes, as their children do not change. If parsing
+      --  failed, leave reused nodes alone: the caller is expected to parse
+      --  from scratch to get proper diagnostics.
+
+      if Parser.Private_Part.Reusable.Is_Empty then
+         Set_Parents (Result, null);
+      elsif Parser.Diagnostics.Length = 0 then
+         Adopt_Reused_Nodes (Parser, Result);
+      end if;
+
+      --  Recorded results are worth keeping only for nodes in the final tree
+
+      if Parser.Record_Results then
+         Collect_Live_Nodes (Parser, Result);
+      end if;
       return Result;
    end Parse;
 
+   -------------------
+   -- Record_Result --
+   -------------------
+
+   procedure Record_Result
+     (Parser       : in out Parser_Type;
+      Rule         : Grammar_Rule;
+      Start, Final : Token_Index;
+      Node         : ${root_node_type_name})
+   is
+      PP : Parser_Private_Part_Type renames Parser.Private_Part.all;
+   begin
+      --  Lookahead is a running maximum: it may be further than what parsing
+      --  Rule actually examined, which only makes reuse more conservative.
+      --  Note that the Last_Fail position is never decreasing, and that
+      --  parsers examine Final to decide where to stop.
+
+      PP.Lookahead := Token_Index'Max
+        (PP.Lookahead, Token_Index'Max (Final, Parser.Last_Fail.Pos));
+      PP.Results.Append
+        ((Rule      => Rule,
+          Node      => Node,
+          Start     => Start,
+          Final     => Final,
+          Lookahead => PP.Lookahead));
+   end Record_Result;
+
+   ------------------
+   -- Get_Reusable --
+   ------------------
+
+   procedure Get_Reusable
+     (Parser : in out Parser_Type;
+      Rule   : Grammar_Rule;
+      Pos    : Token_Index;
+      Result : out Parse_Result)
+   is
+      PP  : Parser_Private_Part_Type renames Parser.Private_Part.all;
+      Cur : constant Reusable_Maps.Cursor := PP.Reusable.Find ((Rule, Pos));
+   begin
+      if not Reusable_Maps.Has_Element (Cur) then
+         Result := (Rule => Rule, Node => null, others => <>);
+         return;
+      end if;
+
+      declare
+         R : constant Reusable_Result := Reusable_Maps.Element (Cur);
+      begin
+         Result := R.Result;
+         if Result.Node /= null then
+            PP.Reused.Include (Result.Node, R.Offset);
+         end if;
+         if Parser.Record_Results then
+            PP.Lookahead := Token_Index'Max (PP.Lookahead, Result.Lookahead);
+            PP.Results.Append (Result);
+         end if;
+      end;
+   end Get_Reusable;
+
+   ------------------------
+   -- Adopt_Reused_Nodes --
+   ------------------------
+
+   procedure Adopt_Reused_Nodes
+     (Parser : in out Parser_Type;
+      Root   : ${root_node_type_name})
+   is
+      PP : Parser_Private_Part_Type renames Parser.Private_Part.all;
+
+      procedure Shift_Tokens (Node : ${root_node_type_name}; Offset : Integer);
+      --  Add Offset to all token indexes in the Node tree
+
+      procedure Visit (Node, Parent : ${root_node_type_name});
+      --  Set Parent as the parent of Node and process its children, unless
+      --  Node was reused.
+
+      ------------------
+      -- Shift_Tokens --
+      ------------------
+
+      procedure Shift_Tokens (Node : ${root_node_type_name}; Offset : Integer)
+      is
+      begin
+         if Node = null then
+            return;
+         end if;
+
+         if Node.Token_Start /= No_Token_Index then
+            Node.Token_Start :=
+               Token_Index (Integer (Node.Token_Start) + Offset);
+         end if;
+         if Node.Token_End /= No_Token_Index then
+            Node.Token_End := Token_Index (Integer (Node.Token_End) + Offset);
+         end if;
+         Node.Shift_Token_Fields (Offset);
+
+         for I in 1 .. Node.Child_Count loop
+            Shift_Tokens (Node.Child (I), Offset);
+         end loop;
+      end Shift_Tokens;
+
+      -----------
+      -- Visit --
+      -----------
+
+      procedure Visit (Node, Parent : ${root_node_type_name}) is
+         Cur : Node_Offset_Maps.Cursor;
+      begin
+         if Node = null then
+            return;
+         end if;
+
+         Node.Parent := Parent;
+
+         Cur := PP.Reused.Find (Node);
+         if Node_Offset_Maps.Has_Element (Cur) then
+            if Node_Offset_Maps.Element (Cur) /= 0 then
+               Shift_Tokens (Node, Node_Offset_Maps.Element (Cur));
+            end if;
+            return;
+         end if;
+
+         for I in 1 .. Node.Child_Count loop
+            Visit (Node.Child (I), Node);
+         end loop;
+      end Visit;
+
+   begin
+      Visit (Root, null);
+   end Adopt_Reused_Nodes;
+
+   ------------------------
+   -- Collect_Live_Nodes --
+   ------------------------
+
+   procedure Collect_Live_Nodes
+     (Parser : in out Parser_Type;
+      Root   : ${root_node_type_name})
+   is
+      PP : Parser_Private_Part_Type renames Parser.Private_Part.all;
+
+      procedure Visit (Node : ${root_node_type_name});
+
+      -----------
+      -- Visit --
+      -----------
+
+      procedure Visit (Node : ${root_node_type_name}) is
+      begin
+         if Node = null then
+            return;
+         end if;
+
+         PP.Live.Include (Node);
+         if PP.Reused.Contains (Node) then
+            return;
+         end if;
+
+         for I in 1 .. Node.Child_Count loop
+            Visit (Node.Child (I));
+         end loop;
+      end Visit;
+
+   begin
+      PP.Live.Clear;
+      Visit (Root);
+   end Collect_Live_Nodes;
+
    % for parser in ctx.generated_parsers:
    ${parser.body}
    % endfor
 
-   ---------------------
-   -- Clean_All_Memos --
-   ---------------------
+   -----------
+   -- Reset --
+   -----------
+
+   procedure Reset (Parser : in out Parser_Type) is
+   begin
+      Parser.Current_Pos := First_Token_Index;
+      Parser.Last_Fail := (Kind => Token_Fail, others => <>);
+      Parser.Diagnostics.Clear;
+
+      % for parser in memoized_parsers:
+      Clear (Parser.Private_Part.${parser.name}_Memo);
+      % endfor
+      % if ctx.instrument_parsers:
+      Parser.Private_Part.Stats := (others => <>);
+      % endif
+      Parser.Private_Part.Lookahead := No_Token_Index;
+      Parser.Private_Part.Results.Clear;
+      Parser.Private_Part.Reusable.Clear;
+      Parser.Private_Part.Reused.Clear;
+      Parser.Private_Part.Live.Clear;
+   end Reset;
+
+   -------------
+   -- Destroy --
+   -------------
+
+   procedure Destroy (Parser : in out Parser_Type) is
+   begin
+      % for parser in memoized_parsers:
+      Destroy (Parser.Private_Part.${parser.name}_Memo);
+      % endfor
+      Parser.Private_Part.Results.Destroy;
+      Free (Parser.Private_Part);
+   end Destroy;
+
+   ------------------
+   -- Enable_Reuse --
+   ------------------
+
+   procedure Enable_Reuse
+     (Parser       : in out Parser_Type;
+      Old_Results  : Parse_Result_Vectors.Vector;
+      Prefix_Last  : Token_Index;
+      Suffix_First : Token_Index;
+      Offset       : Integer)
+   is
+      function Shift (Index : Token_Index) return Token_Index is
+        (Token_Index (Integer (Index) + Offset));
+   begin
+      for R of Old_Results loop
+
+         --  Results that depend only on tokens before the edit can be reused
+         --  as-is. Results that depend only on tokens after the edit must be
+         --  moved in the new token stream.
+
+         if R.Lookahead <= Prefix_Last then
+            Parser.Private_Part.Reusable.Include
+              ((R.Rule, R.Start), (Result => R, Offset => 0));
+
+         elsif R.Start >= Suffix_First then
+            Parser.Private_Part.Reusable.Include
+              ((R.Rule, Shift (R.Start)),
+               (Result => (Rule      => R.Rule,
+                           Node      => R.Node,
+                           Start     => Shift (R.Start),
+                           Final     => Shift (R.Final),
+                           Lookahead => Shift (R.Lookahead)),
+                Offset => Offset));
+         end if;
+      end loop;
+   end Enable_Reuse;
+
+   ----------------------------
+   -- Destroy_Replaced_Nodes --
+   ----------------------------
+
+   procedure Destroy_Replaced_Nodes
+     (Parser   : Parser_Type;
+      Old_Root : ${root_node_type_name})
+   is
+      procedure Visit (Node : ${root_node_type_name});
+
+      -----------
+      -- Visit --
+      -----------
+
+      procedure Visit (Node : ${root_node_type_name}) is
+      begin
+         if Node = null or else Parser.Private_Part.Live.Contains (Node) then
+            return;
+         end if;
+
+         Node.Destroy_Node;
+         for I in 1 .. Node.Child_Count loop
+            Visit (Node.Child (I));
+         end loop;
+      end Visit;
 
-   procedure Clean_All_Memos is
    begin
-      % for fn in ctx.fns:
-         Clear (${fn}_Memo);
+      --  As Take_Results keeps only results for nodes in the tree, all reused
+      --  nodes come from Old_Root, so reaching a live node here means that
+      --  its whole subtree is still in use.
+
+      Visit (Old_Root);
+   end Destroy_Replaced_Nodes;
+
+   ------------------
+   -- Take_Results --
+   ------------------
+
+   procedure Take_Results
+     (Parser  : in out Parser_Type;
+      Results : in out Parse_Result_Vectors.Vector)
+   is
+      PP : Parser_Private_Part_Type renames Parser.Private_Part.all;
+   begin
+      Results.Clear;
+      for R of PP.Results loop
+         if R.Node = null or else PP.Live.Contains (R.Node) then
+            Results.Append (R);
+         end if;
+      end loop;
+      PP.Results.Clear;
+   end Take_Results;
+
+   ----------------------
+   -- Has_Reused_Nodes --
+   ----------------------
+
+   function Has_Reused_Nodes (Parser : Parser_Type) return Boolean is
+   begin
+      for Cur in Parser.Private_Part.Reused.Iterate loop
+         if Parser.Private_Part.Live.Contains (Node_Offset_Maps.Key (Cur)) then
+            return True;
+         end if;
+      end loop;
+      return False;
+   end Has_Reused_Nodes;
+
+   -----------------------
+   -- Update_Memo_Stats --
+   -----------------------
+
+   procedure Update_Memo_Stats
+     (Parser : Parser_Type;
+      Stats  : in out Memo_Statistics_Array) is
+      <%
+         memoized_rules = [name for name in ctx.user_rule_names
+                           if ctx.grammar.rules[name].is_memoized]
+      %>
+   begin
+      % for name in memoized_rules:
+      <% memo = 'Parser.Private_Part.{}_Memo'.format(
+            ctx.grammar.rules[name].gen_fn_name) %>
+      declare
+         S : Memo_Statistics renames Stats (${Name.from_lower(name)}_Rule);
+      begin
+         S.Hits := S.Hits + Long_Long_Integer (Hits (${memo}));
+         S.Misses := S.Misses + Long_Long_Integer (Misses (${memo}));
+         S.Evictions :=
+            S.Evictions + Long_Long_Integer (Evictions (${memo}));
+      end;
       % endfor
-   end Clean_All_Memos;
+      % if not memoized_rules:
+      null;
+      % endif
+   end Update_Memo_Stats;
+
+   % if ctx.instrument_parsers:
+   -------------------------
+   -- Update_Parser_Stats --
+   -------------------------
+
+   procedure Update_Parser_Stats
+     (Parser : Parser_Type;
+      Stats  : in out Parser_Statistics_Array) is
+   begin
+      for Rule in Stats'Range loop
+         declare
+            S      : Parser_Rule_Statistics renames Stats (Rule);
+            P_Stat : Parser_Rule_Statistics renames
+               Parser.Private_Part.Stats (Rule);
+         begin
+            S.Calls := S.Calls + P_Stat.Calls;
+            S.Memo_Hits := S.Memo_Hits + P_Stat.Memo_Hits;
+            S.Memo_Misses := S.Memo_Misses + P_Stat.Memo_Misses;
+            S.Failures := S.Failures + P_Stat.Failures;
+            S.Tokens := S.Tokens + P_Stat.Tokens;
+         end;
+      end loop;
+   end Update_Parser_Stats;
+   % endif
 
 end ${ada_lib_name}.Analysis.Parsers;
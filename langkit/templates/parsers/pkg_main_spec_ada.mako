@@ -2,6 +2,7 @@
 
 with Langkit_Support.Bump_Ptr;    use Langkit_Support.Bump_Ptr;
 with Langkit_Support.Diagnostics; use Langkit_Support.Diagnostics;
+with Langkit_Support.Slocs;       use Langkit_Support.Slocs;
 
 with ${ada_lib_name}.Lexer; use ${ada_lib_name}.Lexer;
 use ${ada_lib_name}.Lexer.Token_Data_Handlers;
@@ -26,6 +27,9 @@ private package ${ada_lib_name}.Analysis.Parsers is
       end case;
    end record;
 
+   type Parser_Private_Part is private;
+   --  Data that is private to each parser instance, such as memoization tables
+
    type Parser_Type is record
       Current_Pos     : Token_Index := First_Token_Index;
       Last_Fail       : Fail_Info;
@@ -36,7 +40,14 @@ private package ${ada_lib_name}.Analysis.Parsers is
       % if ctx.symbol_literals:
       Symbol_Literals : Symbol_Literal_Array_Access;
       % endif
+      Record_Results  : Boolean := False;
+      --  Whether to record the results of grammar rules, for later reuse in
+      --  incremental reparsing (see Take_Results).
+      Private_Part    : Parser_Private_Part;
    end record;
+   --  Each parser instance owns its private part, so different parsers can be
+   --  used at the same time, for instance to parse several analysis units in
+   --  parallel from different tasks.
 
    function Create_From_File
      (Filename, Charset : String;
@@ -54,11 +65,18 @@ private package ${ada_lib_name}.Analysis.Parsers is
      (Buffer, Charset : String;
       Read_BOM        : Boolean;
       Unit            : Analysis_Unit;
-      With_Trivia     : Boolean := False) return Parser_type;
+      With_Trivia     : Boolean := False;
+      Edit            : Source_Location_Range := No_Source_Location_Range)
+      return Parser_type;
    --  Create a parser to parse the source in Buffer, decoding it using
    --  Charset. The resulting tokens (and trivia if With_Trivia) are stored
    --  into TDH.
    --
+   --  If Edit is not No_Source_Location_Range, Unit's tokens must come from
+   --  a previous version of the source in which the text in Edit was
+   --  replaced to get Buffer: only the tokens that this edit affects are
+   --  lexed again (see Lexer.Relex_From_Buffer).
+   --
    --  This can raise Lexer.Unknown_Charset or Lexer.Invalid_Input exceptions
    --  if the lexer has trouble decoding the input.
 
@@ -71,9 +89,62 @@ private package ${ada_lib_name}.Analysis.Parsers is
    --  consider the case when the parser could not consume all the input tokens
    --  as an error.
 
-   procedure Clean_All_Memos;
-   --  TODO??? We want to allow multiple parsers to run at the same time so
-   --  memos should be stored in Parser_Type. In the end, this should be turned
-   --  into a Parser_Type finalizer.
+   procedure Reset (Parser : in out Parser_Type);
+   --  Reset Parser's state (position, diagnostics and memoization tables) so
+   --  that it can be used to parse again the same token stream.
+
+   procedure Destroy (Parser : in out Parser_Type);
+   --  Free all resources owned by Parser. Note that this does not free the
+   --  memory pool used to allocate AST nodes.
+
+   procedure Update_Memo_Stats
+     (Parser : Parser_Type;
+      Stats  : in out Memo_Statistics_Array);
+   --  Add the statistics for all memoization tables in Parser to Stats
+
+   procedure Enable_Reuse
+     (Parser       : in out Parser_Type;
+      Old_Results  : Parse_Result_Vectors.Vector;
+      Prefix_Last  : Token_Index;
+      Suffix_First : Token_Index;
+      Offset       : Integer);
+   --  Make Parser reuse results in Old_Results, which come from a previous
+   --  parsing of the same unit, instead of parsing the corresponding tokens
+   --  again. Old tokens up to Prefix_Last must be identical to the new ones,
+   --  and so must old tokens from Suffix_First on, except that their index
+   --  in the new token stream is increased by Offset.
+   --
+   --  When Parse succeeds, it moves the reused nodes in the new token stream
+   --  and sets their parents.
+
+   procedure Destroy_Replaced_Nodes
+     (Parser   : Parser_Type;
+      Old_Root : ${root_node_type_name});
+   --  Assuming that Parser reused results (see Enable_Reuse) and that Parse
+   --  succeeded, destroy all nodes in Old_Root that are not part of the new
+   --  tree.
+
+   procedure Take_Results
+     (Parser  : in out Parser_Type;
+      Results : in out Parse_Result_Vectors.Vector);
+   --  Replace the content of Results with the rule results that Parser
+   --  recorded, keeping only the ones that reference nodes in the tree that
+   --  Parse returned.
+
+   function Has_Reused_Nodes (Parser : Parser_Type) return Boolean;
+   --  Return whether the tree that Parse returned contains nodes that Parser
+   --  reused.
+
+   % if ctx.instrument_parsers:
+   procedure Update_Parser_Stats
+     (Parser : Parser_Type;
+      Stats  : in out Parser_Statistics_Array);
+   --  Add the parsing statistics collected by Parser to Stats
+   % endif
+
+private
+
+   type Parser_Private_Part_Type;
+   type Parser_Private_Part is access all Parser_Private_Part_Type;
 
 end ${ada_lib_name}.Analysis.Parsers;
@@ -13,13 +13,16 @@
 
 with Ada.Containers;                  use Ada.Containers;
 with Ada.Containers.Hashed_Maps;
+with Ada.Containers.Hashed_Sets;
 with Ada.Containers.Ordered_Maps;
 with Ada.Exceptions;
 with Ada.Strings.Wide_Wide_Unbounded; use Ada.Strings.Wide_Wide_Unbounded;
+with Ada.Task_Attributes;
 with Ada.Text_IO;                     use Ada.Text_IO;
 with Ada.Unchecked_Conversion;
 with Ada.Unchecked_Deallocation;
 
+with System.Multiprocessors;
 with System.Storage_Elements;    use System.Storage_Elements;
 
 with Langkit_Support.Array_Utils;
@@ -88,6 +91,58 @@ package body ${ada_lib_name}.Analysis is
    procedure Free is new Ada.Unchecked_Deallocation
      (Analysis_Unit_Type, Analysis_Unit);
 
+   protected Live_Contexts is
+      procedure Add;
+      --  Register the creation of an analysis context
+
+      procedure Remove (Last : out Boolean);
+      --  Register the destruction of an analysis context. Set Last to whether
+      --  no other context is alive.
+
+   private
+      Count : Natural := 0;
+   end Live_Contexts;
+
+   type Dependency_State is record
+      Stack       : Unit_Dependency_Vectors.Vector;
+      --  Dependencies recorded for the memoized properties being evaluated.
+      --  Each evaluation owns the dependencies from the start of its frame to
+      --  the end of the stack, minus the ones that nested evaluations own.
+
+      Frame_Start : Natural := 0;
+      --  Index in Stack of the first dependency for the innermost memoized
+      --  property being evaluated, or zero if there is none.
+
+      Context     : Analysis_Context;
+      --  Analysis context for the innermost memoized property being
+      --  evaluated. Null dependencies refer to its root scope.
+   end record;
+   type Dependency_State_Access is access Dependency_State;
+
+   procedure Free is new Ada.Unchecked_Deallocation
+     (Dependency_State, Dependency_State_Access);
+
+   package Dependency_States is new Ada.Task_Attributes
+     (Dependency_State_Access, null);
+   --  Dependency state for each task. It is allocated when the task enters
+   --  its first dependency frame, and freed when it leaves it, so that
+   --  terminating tasks do not leak it. Storing an access rather than the
+   --  record itself keeps accesses to it cheap.
+
+   function Current_Version
+     (Context : Analysis_Context;
+      Unit    : Analysis_Unit) return Cache_Version_Type;
+   --  Return the current cache version of Unit, or the version of Context's
+   --  root scope if Unit is null.
+
+   procedure Append_Dependency
+     (Deps  : in out Unit_Dependency_Vectors.Vector;
+      First : Positive;
+      Dep   : Unit_Dependency);
+   --  Append Dep to Deps unless the elements of Deps from index First already
+   --  include a dependency on the same unit. In that case, the existing one
+   --  has an older version, or the same, so it is the one to keep.
+
    procedure Update_Charset (Unit : Analysis_Unit; Charset : String);
    --  If Charset is an empty string, do nothing. Otherwise, update
    --  Unit.Charset field to Charset.
@@ -102,6 +157,50 @@ package body ${ada_lib_name}.Analysis is
    --  unit using Get_Parser and replace Unit's AST_Root and the diagnostics
    --  with the parsers's output.
 
+   procedure Prepare_Parsing (Unit : Analysis_Unit);
+   --  Destroy Unit's AST and diagnostics so that it can be parsed again
+
+   procedure Parse_Unit
+     (Unit         : Analysis_Unit;
+      Read_BOM     : Boolean;
+      Get_Parser   : access function (Unit     : Analysis_Unit;
+                                      Read_BOM : Boolean)
+                                      return Parser_Type;
+      Memo_Stats   : in out Memo_Statistics_Array
+      % if ctx.instrument_parsers:
+      ; Parser_Stats : in out Parser_Statistics_Array
+      % endif
+     );
+   --  Parse Unit, which Prepare_Parsing must have processed, using Get_Parser
+   --  and add parsing statistics to the given arrays. This does not touch the
+   --  rest of the analysis context, so different units can be parsed this way
+   --  in different tasks, provided that the symbol table is thread-safe.
+
+   Max_Old_AST_Mem_Pools : constant := 16;
+   --  Maximum number of memory pools that incremental reparsing keeps alive
+   --  for a single analysis unit: when it is reached, the next incremental
+   --  reparse parses from scratch so that memory usage remains bounded.
+
+   procedure Do_Incremental_Parsing
+     (Unit                : Analysis_Unit;
+      Read_BOM            : Boolean;
+      Get_Parser          : access function (Unit     : Analysis_Unit;
+                                             Read_BOM : Boolean)
+                                             return Parser_Type;
+      Get_Relexing_Parser : access function (Unit     : Analysis_Unit;
+                                             Read_BOM : Boolean)
+                                             return Parser_Type;
+      Edit                : Source_Location_Range);
+   --  Like Do_Parsing, but reuse subtrees of the current AST_Root that are
+   --  outside of Edit. See the incremental Reparse procedure.
+   --
+   --  Get_Relexing_Parser must behave like Get_Parser, except that it must
+   --  only lex again the part of the source that Edit affects: it is used
+   --  only when Unit's tokens come from the source that precedes Edit.
+
+   procedure Free_Old_AST_Mem_Pools (Unit : Analysis_Unit);
+   --  Free all memory pools in Unit.Old_AST_Mem_Pools
+
    function Get_Unit
      (Context           : Analysis_Context;
       Filename, Charset : String;
@@ -116,6 +215,17 @@ package body ${ada_lib_name}.Analysis is
    --  using Get_Parser to either parse from a file or from a buffer. Return
    --  the resulting analysis unit.
 
+   function Get_Or_Create_Unit
+     (Context           : Analysis_Context;
+      Filename, Charset : String;
+      With_Trivia       : Boolean;
+      Rule              : Grammar_Rule;
+      Created           : out Boolean)
+      return Analysis_Unit;
+   --  Helper for Get_Unit and Get_From_Files: return the analysis unit in
+   --  Context for Filename, creating it if needed (in which case set Created
+   --  to True), and update its charset. This does not parse the unit.
+
    % if ctx.symbol_literals:
       function Create_Symbol_Literals
         (Symbols : Symbol_Table) return Symbol_Literal_Array;
@@ -140,6 +250,33 @@ package body ${ada_lib_name}.Analysis is
       end if;
    end Update_Charset;
 
+   -------------------
+   -- Live_Contexts --
+   -------------------
+
+   protected body Live_Contexts is
+
+      ---------
+      -- Add --
+      ---------
+
+      procedure Add is
+      begin
+         Count := Count + 1;
+      end Add;
+
+      ------------
+      -- Remove --
+      ------------
+
+      procedure Remove (Last : out Boolean) is
+      begin
+         Count := Count - 1;
+         Last := Count = 0;
+      end Remove;
+
+   end Live_Contexts;
+
    ------------
    -- Create --
    ------------
@@ -149,6 +286,7 @@ package body ${ada_lib_name}.Analysis is
       % if ctx.default_unit_file_provider:
          ; Unit_File_Provider : Unit_File_Provider_Access_Cst := null
       % endif
+      ; Compact_Sources : Boolean := False
      ) return Analysis_Context
    is
       % if ctx.default_unit_file_provider:
@@ -159,6 +297,7 @@ package body ${ada_lib_name}.Analysis is
       % endif
       Symbols : constant Symbol_Table := Create;
    begin
+      Live_Contexts.Add;
       return new Analysis_Context_Type'
         (Ref_Count  => 1,
          Units_Map  => <>,
@@ -175,6 +314,17 @@ package body ${ada_lib_name}.Analysis is
          % if ctx.symbol_literals:
             , Symbol_Literals => Create_Symbol_Literals (Symbols)
          % endif
+         , Compact_Sources => Compact_Sources
+         , Page_Cache => Create_Page_Cache
+         , Memo_Stats => <>
+         , Cache_Version => 0
+         % if ctx.instrument_parsers:
+         , Parser_Stats => <>
+         % endif
+         % if ctx.instrument_properties:
+         , Property_Stats => <>
+         , Current_Profile => null
+         % endif
         );
    end Create;
 
@@ -228,37 +378,29 @@ package body ${ada_lib_name}.Analysis is
       end if;
    end Dec_Ref;
 
-   --------------
-   -- Get_Unit --
-   --------------
+   ------------------------
+   -- Get_Or_Create_Unit --
+   ------------------------
 
-   function Get_Unit
+   function Get_Or_Create_Unit
      (Context           : Analysis_Context;
       Filename, Charset : String;
-      Reparse           : Boolean;
-      Get_Parser        : access function (Unit     : Analysis_Unit;
-                                           Read_BOM : Boolean)
-                                           return Parser_Type;
       With_Trivia       : Boolean;
-      Rule              : Grammar_Rule)
+      Rule              : Grammar_Rule;
+      Created           : out Boolean)
       return Analysis_Unit
    is
       use Units_Maps;
 
-      Fname   : constant Unbounded_String := To_Unbounded_String (Filename);
-      Cur     : constant Cursor := Context.Units_Map.Find (Fname);
-      Created : constant Boolean := Cur = No_Element;
-      Unit    : Analysis_Unit;
-
-      Read_BOM : constant Boolean := Charset'Length = 0;
-      --  Unless the caller requested a specific charset for this unit, allow
-      --  the lexer to automatically discover the source file encoding before
-      --  defaulting to the context-specific one. We do this trying to match a
-      --  byte order mark.
+      Fname : constant Unbounded_String := To_Unbounded_String (Filename);
+      Cur   : constant Cursor := Context.Units_Map.Find (Fname);
+      Unit  : Analysis_Unit;
 
       Actual_Charset : Unbounded_String;
 
    begin
+      Created := Cur = No_Element;
+
       --  Determine which encoding to use.  The parameter comes first, then the
       --  unit-specific default, then the context-specific one.
 
@@ -283,12 +425,16 @@ package body ${ada_lib_name}.Analysis is
             Diagnostics       => <>,
             With_Trivia       => With_Trivia,
             Is_Env_Populated  => False,
-            Has_Filled_Caches => False,
+            Cache_Version     => 0,
             Rule              => Rule,
             AST_Mem_Pool      => No_Pool,
+            Old_AST_Mem_Pools => Pool_Vectors.Empty_Vector,
+            Keep_Parse_Results => False,
+            Parse_Results     => Parse_Result_Vectors.Empty_Vector,
             Destroyables      => Destroyable_Vectors.Empty_Vector,
             Referenced_Units  => <>,
-            Lex_Env_Data_Acc  => new Lex_Env_Data_Type);
+            Lex_Env_Data_Acc  => new Lex_Env_Data_Type,
+            Extensions        => <>);
          Initialize (Unit.TDH, Context.Symbols);
          Context.Units_Map.Insert (Fname, Unit);
       else
@@ -296,6 +442,35 @@ package body ${ada_lib_name}.Analysis is
       end if;
       Unit.Charset := Actual_Charset;
 
+      return Unit;
+   end Get_Or_Create_Unit;
+
+   --------------
+   -- Get_Unit --
+   --------------
+
+   function Get_Unit
+     (Context           : Analysis_Context;
+      Filename, Charset : String;
+      Reparse           : Boolean;
+      Get_Parser        : access function (Unit     : Analysis_Unit;
+                                           Read_BOM : Boolean)
+                                           return Parser_Type;
+      With_Trivia       : Boolean;
+      Rule              : Grammar_Rule)
+      return Analysis_Unit
+   is
+      Created : Boolean;
+      Unit    : constant Analysis_Unit := Get_Or_Create_Unit
+        (Context, Filename, Charset, With_Trivia, Rule, Created);
+
+      Read_BOM : constant Boolean := Charset'Length = 0;
+      --  Unless the caller requested a specific charset for this unit, allow
+      --  the lexer to automatically discover the source file encoding before
+      --  defaulting to the context-specific one. We do this trying to match a
+      --  byte order mark.
+
+   begin
       --  (Re)parse it if needed
 
       if Created
@@ -310,6 +485,7 @@ package body ${ada_lib_name}.Analysis is
          Update_After_Reparse (Unit);
       end if;
 
+      Record_Dependency (Unit);
       return Unit;
    end Get_Unit;
 
@@ -333,7 +509,59 @@ package body ${ada_lib_name}.Analysis is
       Read_BOM   : Boolean;
       Get_Parser : access function (Unit     : Analysis_Unit;
                                     Read_BOM : Boolean)
-                                    return Parser_Type)
+                                    return Parser_Type) is
+   begin
+      Prepare_Parsing (Unit);
+
+      --  (Re-)loading an unit changes the result of properties that read it,
+      --  so invalidate the caches that depend on it. Memoized properties
+      --  record which units they read, so results for properties that only
+      --  read other units stay valid.
+      Reset_Property_Caches (Unit);
+
+      Parse_Unit
+        (Unit, Read_BOM, Get_Parser, Unit.Context.Memo_Stats
+         % if ctx.instrument_parsers:
+         , Unit.Context.Parser_Stats
+         % endif
+        );
+   end Do_Parsing;
+
+   ---------------------
+   -- Prepare_Parsing --
+   ---------------------
+
+   procedure Prepare_Parsing (Unit : Analysis_Unit) is
+   begin
+      --  If we have an AST_Mem_Pool already, we are reparsing. We want to
+      --  destroy it to free all the allocated memory.
+      if Unit.AST_Root /= null then
+         Unit.AST_Root.Destroy;
+      end if;
+      if Unit.AST_Mem_Pool /= No_Pool then
+         Free (Unit.AST_Mem_Pool);
+      end if;
+      Free_Old_AST_Mem_Pools (Unit);
+      Unit.Parse_Results.Clear;
+      Unit.AST_Root := null;
+      Unit.Diagnostics.Clear;
+   end Prepare_Parsing;
+
+   ----------------
+   -- Parse_Unit --
+   ----------------
+
+   procedure Parse_Unit
+     (Unit         : Analysis_Unit;
+      Read_BOM     : Boolean;
+      Get_Parser   : access function (Unit     : Analysis_Unit;
+                                      Read_BOM : Boolean)
+                                      return Parser_Type;
+      Memo_Stats   : in out Memo_Statistics_Array
+      % if ctx.instrument_parsers:
+      ; Parser_Stats : in out Parser_Statistics_Array
+      % endif
+     )
    is
 
       procedure Add_Diagnostic (Message : String);
@@ -353,23 +581,6 @@ package body ${ada_lib_name}.Analysis is
       Parser : Parser_Type;
 
    begin
-      --  If we have an AST_Mem_Pool already, we are reparsing. We want to
-      --  destroy it to free all the allocated memory.
-      if Unit.AST_Root /= null then
-         Unit.AST_Root.Destroy;
-      end if;
-      if Unit.AST_Mem_Pool /= No_Pool then
-         Free (Unit.AST_Mem_Pool);
-      end if;
-      Unit.AST_Root := null;
-      Unit.Has_Filled_Caches := False;
-      Unit.Diagnostics.Clear;
-
-      --  As (re-)loading an unit can change how any AST node property in the
-      --  whole analysis context behaves, we have to invalidate caches. This
-      --  is likely overkill, but kill all caches here as it's easy to do.
-      Reset_Property_Caches (Unit.Context);
-
       --  Now create the parser. This is where lexing occurs, so this is where
       --  we get most "setup" issues: missing input file, bad charset, etc.
       --  If we have such an error, catch it, turn it into diagnostics and
@@ -405,13 +616,250 @@ package body ${ada_lib_name}.Analysis is
       --  We have correctly setup a parser! Now let's parse and return what we
       --  get.
 
-      Unit.AST_Mem_Pool := Create;
+      Unit.AST_Mem_Pool := Create (Unit.Context.Page_Cache);
       Parser.Mem_Pool := Unit.AST_Mem_Pool;
+      Parser.Record_Results := Unit.Keep_Parse_Results;
+
+      --  Do not leak the parser if parsing is aborted
 
-      Unit.AST_Root := Parse (Parser, Rule => Unit.Rule);
+      begin
+         Unit.AST_Root := Parse (Parser, Rule => Unit.Rule);
+      exception
+         when others =>
+            Destroy (Parser);
+            raise;
+      end;
       Unit.Diagnostics := Parser.Diagnostics;
-      Clean_All_Memos;
-   end Do_Parsing;
+      if Unit.Keep_Parse_Results then
+         Take_Results (Parser, Unit.Parse_Results);
+      end if;
+      Update_Memo_Stats (Parser, Memo_Stats);
+      % if ctx.instrument_parsers:
+      Update_Parser_Stats (Parser, Parser_Stats);
+      % endif
+      Destroy (Parser);
+
+      if Unit.Context.Compact_Sources then
+         Compact (Unit.TDH);
+      end if;
+   end Parse_Unit;
+
+   ----------------------------
+   -- Do_Incremental_Parsing --
+   ----------------------------
+
+   procedure Do_Incremental_Parsing
+     (Unit                : Analysis_Unit;
+      Read_BOM            : Boolean;
+      Get_Parser          : access function (Unit     : Analysis_Unit;
+                                             Read_BOM : Boolean)
+                                             return Parser_Type;
+      Get_Relexing_Parser : access function (Unit     : Analysis_Unit;
+                                             Read_BOM : Boolean)
+                                             return Parser_Type;
+      Edit                : Source_Location_Range)
+   is
+      TDH          : Token_Data_Handler renames Unit.TDH;
+      Old_Tokens   : Token_Vectors.Vector;
+      Old_Lines    : Integer_Vectors.Vector;
+      Old_First    : constant Positive := TDH.Source_First;
+      Old_Length   : constant Integer := TDH.Source_Last - TDH.Source_First;
+      Parser       : Parser_Type;
+      Pool         : Bump_Ptr_Pool;
+      Root         : ${root_node_type_name};
+      Prefix_Last  : Natural := 0;
+      Old_Suffix   : Natural;
+      New_Suffix   : Natural;
+   begin
+      --  Parse from scratch when there is nothing to reuse, and when too
+      --  many old memory pools are alive.
+
+      if Unit.AST_Root = null
+         or else not Unit.Keep_Parse_Results
+         or else Edit = No_Source_Location_Range
+         or else Unit.Old_AST_Mem_Pools.Length >= Max_Old_AST_Mem_Pools
+      then
+         Unit.Keep_Parse_Results := True;
+         Do_Parsing (Unit, Read_BOM, Get_Parser);
+         return;
+      end if;
+
+      --  Relexing overrides the old tokens, so keep a copy of them (and of
+      --  the line table to get their source locations) to find out which
+      --  tokens changed. As for Do_Parsing, invalidate caches that depend on
+      --  this unit: results for nodes we are about to reuse included.
+
+      Old_Tokens := Token_Vectors.Copy (TDH.Tokens);
+      Old_Lines := Integer_Vectors.Copy (TDH.Line_Starts);
+      Reset_Property_Caches (Unit);
+
+      begin
+         Parser := Get_Relexing_Parser (Unit, Read_BOM);
+      exception
+         when Name_Error | Lexer.Unknown_Charset | Lexer.Invalid_Input =>
+            --  Let Do_Parsing turn these into diagnostics
+
+            Old_Tokens.Destroy;
+            Old_Lines.Destroy;
+            Do_Parsing (Unit, Read_BOM, Get_Parser);
+            return;
+      end;
+
+      --  Find the tokens that did not change: first the ones before the edit,
+      --  then the ones after. End slocs are exclusive, so tokens that end
+      --  where the edit starts, or that start where it ends, are outside of
+      --  it. Same_Token rejects the ones that relexing merged with the new
+      --  text.
+
+      declare
+         New_First  : constant Positive := TDH.Source_First;
+         Char_Delta : constant Integer :=
+            (TDH.Source_Last - TDH.Source_First) - Old_Length;
+
+         function Old_Sloc (Old_Index : Natural) return Source_Location_Range;
+         --  Return the source location range of the old token at Old_Index
+
+         function Same_Token (Old_Index, New_Index : Natural) return Boolean;
+         --  Return whether the old token at Old_Index and the new token at
+         --  New_Index have the same kind and the same location in the source
+         --  buffer, taking into account the Char_Delta shift for tokens after
+         --  the edit.
+
+         --------------
+         -- Old_Sloc --
+         --------------
+
+         function Old_Sloc (Old_Index : Natural) return Source_Location_Range
+         is
+            T : constant Lexer.Token_Data_Type := Old_Tokens.Get (Old_Index);
+         begin
+            return (Start_Line   => Get_Line (Old_Lines, T.Source_First),
+                    End_Line     => Get_Line (Old_Lines, T.Source_Last + 1),
+                    Start_Column => T.Start_Column,
+                    End_Column   => T.End_Column);
+         end Old_Sloc;
+
+         ----------------
+         -- Same_Token --
+         ----------------
+
+         function Same_Token (Old_Index, New_Index : Natural) return Boolean
+         is
+            Old_T  : constant Lexer.Token_Data_Type :=
+               Old_Tokens.Get (Old_Index);
+            New_T  : constant Lexer.Token_Data_Type :=
+               TDH.Tokens.Get (New_Index);
+            Shift  : constant Integer :=
+              (if Compare (Start_Sloc (Edit),
+                           Start_Sloc (Old_Sloc (Old_Index))) = Before
+               then 0
+               else Char_Delta);
+         begin
+            return Old_T.Kind = New_T.Kind
+              and then Old_T.Source_First - Old_First + Shift
+                       = New_T.Source_First - New_First
+              and then Old_T.Source_Last - Old_First + Shift
+                       = New_T.Source_Last - New_First;
+         end Same_Token;
+
+         Old_Last : constant Natural := Old_Tokens.Last_Index;
+         New_Last : constant Natural := TDH.Tokens.Last_Index;
+      begin
+         while Prefix_Last < Natural'Min (Old_Last, New_Last)
+           and then Compare
+             (Start_Sloc (Edit),
+              End_Sloc (Old_Sloc (Prefix_Last + 1))) /= After
+           and then Same_Token (Prefix_Last + 1, Prefix_Last + 1)
+         loop
+            Prefix_Last := Prefix_Last + 1;
+         end loop;
+
+         Old_Suffix := Old_Last + 1;
+         New_Suffix := New_Last + 1;
+         while Old_Suffix - 1 > Prefix_Last
+           and then New_Suffix - 1 > Prefix_Last
+           and then Compare
+             (End_Sloc (Edit),
+              Start_Sloc (Old_Sloc (Old_Suffix - 1))) /= Before
+           and then Same_Token (Old_Suffix - 1, New_Suffix - 1)
+         loop
+            Old_Suffix := Old_Suffix - 1;
+            New_Suffix := New_Suffix - 1;
+         end loop;
+      end;
+      Old_Tokens.Destroy;
+      Old_Lines.Destroy;
+
+      --  Now parse, reusing what we can
+
+      Enable_Reuse (Parser, Unit.Parse_Results,
+                    Prefix_Last  => Token_Index (Prefix_Last),
+                    Suffix_First => Token_Index (Old_Suffix),
+                    Offset       => New_Suffix - Old_Suffix);
+      Pool := Create (Unit.Context.Page_Cache);
+      Parser.Mem_Pool := Pool;
+      Parser.Record_Results := True;
+      begin
+         Root := Parse (Parser, Rule => Unit.Rule);
+      exception
+         when others =>
+            Destroy (Parser);
+            Free (Pool);
+            raise;
+      end;
+      Update_Memo_Stats (Parser, Unit.Context.Memo_Stats);
+      % if ctx.instrument_parsers:
+      Update_Parser_Stats (Parser, Unit.Context.Parser_Stats);
+      % endif
+
+      --  Diagnostics may depend on tokens that the reused nodes cover, so on
+      --  parsing errors, start again from scratch to get the same diagnostics
+      --  as a regular reparse.
+
+      if Parser.Diagnostics.Length > 0 then
+         Destroy (Parser);
+         Free (Pool);
+         Do_Parsing (Unit, Read_BOM, Get_Parser);
+         return;
+      end if;
+
+      Destroy_Replaced_Nodes (Parser, Unit.AST_Root);
+      Take_Results (Parser, Unit.Parse_Results);
+
+      --  If no node was reused, no node from old memory pools is alive
+
+      if Has_Reused_Nodes (Parser) then
+         Unit.Old_AST_Mem_Pools.Append (Unit.AST_Mem_Pool);
+      else
+         Free (Unit.AST_Mem_Pool);
+         Free_Old_AST_Mem_Pools (Unit);
+      end if;
+
+      Unit.AST_Mem_Pool := Pool;
+      Unit.AST_Root := Root;
+      Unit.Diagnostics.Clear;
+      Destroy (Parser);
+
+      if Unit.Context.Compact_Sources then
+         Compact (Unit.TDH);
+      end if;
+   end Do_Incremental_Parsing;
+
+   ----------------------------
+   -- Free_Old_AST_Mem_Pools --
+   ----------------------------
+
+   procedure Free_Old_AST_Mem_Pools (Unit : Analysis_Unit) is
+   begin
+      for I in 1 .. Unit.Old_AST_Mem_Pools.Length loop
+         declare
+            Pool : Bump_Ptr_Pool := Unit.Old_AST_Mem_Pools.Get (I);
+         begin
+            Free (Pool);
+         end;
+      end loop;
+      Unit.Old_AST_Mem_Pools.Clear;
+   end Free_Old_AST_Mem_Pools;
 
    -------------------
    -- Get_From_File --
@@ -464,6 +912,273 @@ package body ${ada_lib_name}.Analysis is
                        With_Trivia, Rule);
    end Get_From_Buffer;
 
+   --------------------
+   -- Get_From_Files --
+   --------------------
+
+   function Get_From_Files
+     (Context     : Analysis_Context;
+      Filenames   : Filename_Array;
+      Charset     : String := "";
+      Reparse     : Boolean := False;
+      With_Trivia : Boolean := False;
+      Rule        : Grammar_Rule :=
+         ${Name.from_lower(ctx.main_rule_name)}_Rule;
+      Workers     : Natural := 0;
+      Chunk_Size  : Positive := 1)
+      return Analysis_Unit_Array
+   is
+      use Ada.Exceptions;
+
+      Read_BOM : constant Boolean := Charset'Length = 0;
+      --  See Get_Unit
+
+      Units : Analysis_Unit_Array (Filenames'Range);
+
+      Jobs      : array (1 .. Filenames'Length) of Positive;
+      Job_Count : Natural := 0;
+      --  Indexes in Filenames/Units for the units to parse
+
+      Reparsed : array (Filenames'Range) of Boolean := (others => False);
+      --  Whether each unit requires an update after parsing (see Get_Unit)
+
+      function Hash (Unit : Analysis_Unit) return Hash_Type is
+        (Hash_Type'Mod (To_Integer (Unit.all'Address)));
+
+      package Unit_Sets is new Ada.Containers.Hashed_Sets
+        (Element_Type        => Analysis_Unit,
+         Hash                => Hash,
+         Equivalent_Elements => "=");
+
+      Queued : Unit_Sets.Set;
+      --  Units for which there is a job. Filenames can designate the same
+      --  unit several times, and two workers must never parse the same unit.
+
+      Error : Exception_Occurrence_Access;
+      --  First unexpected exception that a worker got, if any
+
+      procedure Free is new Ada.Unchecked_Deallocation
+        (Exception_Occurrence, Exception_Occurrence_Access);
+
+   begin
+      --  The units map is not thread-safe: create all units and destroy the
+      --  trees to be replaced before spawning workers.
+
+      for I in Filenames'Range loop
+         declare
+            Created : Boolean;
+            Unit    : constant Analysis_Unit := Get_Or_Create_Unit
+              (Context, To_String (Filenames (I)), Charset, With_Trivia, Rule,
+               Created);
+         begin
+            Units (I) := Unit;
+            if not Queued.Contains (Unit) then
+               Reparsed (I) :=
+                  Reparse or else (With_Trivia and then not Unit.With_Trivia);
+               if Created or else Reparsed (I) then
+                  Queued.Insert (Unit);
+                  Prepare_Parsing (Unit);
+                  Job_Count := Job_Count + 1;
+                  Jobs (Job_Count) := I;
+               end if;
+            end if;
+         end;
+      end loop;
+
+      if Job_Count = 0 then
+         return Units;
+      end if;
+
+      --  See Do_Parsing for why we invalidate caches
+
+      for J in 1 .. Job_Count loop
+         Reset_Property_Caches (Units (Jobs (J)));
+      end loop;
+
+      Set_Thread_Safe (Context.Symbols, True);
+
+      declare
+         Worker_Count : constant Positive :=
+           (if Workers = 0
+            then Positive (System.Multiprocessors.Number_Of_CPUs)
+            else Workers);
+
+         protected Dispatcher is
+            procedure Next_Chunk (First, Last : out Natural);
+            --  Assign to the caller the Jobs (First .. Last) slice. Return an
+            --  empty slice when there is no job left.
+
+            procedure Add_Stats
+              (Memo_Stats   : Memo_Statistics_Array
+               % if ctx.instrument_parsers:
+               ; Parser_Stats : Parser_Statistics_Array
+               % endif
+              );
+            --  Add statistics from some worker to Context's
+
+            procedure Set_Error (Exc : Exception_Occurrence);
+            --  Record Exc in Error, unless there is already an error, and
+            --  make all workers stop.
+
+         private
+            Next : Positive := 1;
+         end Dispatcher;
+
+         task type Worker_Task;
+
+         ----------------
+         -- Dispatcher --
+         ----------------
+
+         protected body Dispatcher is
+
+            ----------------
+            -- Next_Chunk --
+            ----------------
+
+            procedure Next_Chunk (First, Last : out Natural) is
+            begin
+               if Error /= null or else Next > Job_Count then
+                  First := 1;
+                  Last := 0;
+               else
+                  First := Next;
+                  Last := Natural'Min (Job_Count, Next + Chunk_Size - 1);
+                  Next := Last + 1;
+               end if;
+            end Next_Chunk;
+
+            ---------------
+            -- Add_Stats --
+            ---------------
+
+            procedure Add_Stats
+              (Memo_Stats   : Memo_Statistics_Array
+               % if ctx.instrument_parsers:
+               ; Parser_Stats : Parser_Statistics_Array
+               % endif
+              ) is
+            begin
+               for R in Grammar_Rule loop
+                  declare
+                     S : Memo_Statistics renames Context.Memo_Stats (R);
+                     W : Memo_Statistics renames Memo_Stats (R);
+                  begin
+                     S.Hits := S.Hits + W.Hits;
+                     S.Misses := S.Misses + W.Misses;
+                     S.Evictions := S.Evictions + W.Evictions;
+                  end;
+                  % if ctx.instrument_parsers:
+                  declare
+                     S : Parser_Rule_Statistics renames
+                        Context.Parser_Stats (R);
+                     W : Parser_Rule_Statistics renames Parser_Stats (R);
+                  begin
+                     S.Calls := S.Calls + W.Calls;
+                     S.Memo_Hits := S.Memo_Hits + W.Memo_Hits;
+                     S.Memo_Misses := S.Memo_Misses + W.Memo_Misses;
+                     S.Failures := S.Failures + W.Failures;
+                     S.Tokens := S.Tokens + W.Tokens;
+                  end;
+                  % endif
+               end loop;
+            end Add_Stats;
+
+            ---------------
+            -- Set_Error --
+            ---------------
+
+            procedure Set_Error (Exc : Exception_Occurrence) is
+            begin
+               if Error = null then
+                  Error := Save_Occurrence (Exc);
+               end if;
+            end Set_Error;
+
+         end Dispatcher;
+
+         -----------------
+         -- Worker_Task --
+         -----------------
+
+         task body Worker_Task is
+            Memo_Stats   : Memo_Statistics_Array;
+            % if ctx.instrument_parsers:
+            Parser_Stats : Parser_Statistics_Array;
+            % endif
+            First, Last  : Natural;
+         begin
+            loop
+               Dispatcher.Next_Chunk (First, Last);
+               exit when First > Last;
+
+               for J in First .. Last loop
+                  declare
+                     Filename : constant String :=
+                        To_String (Filenames (Jobs (J)));
+
+                     function Get_Parser
+                       (Unit     : Analysis_Unit;
+                        Read_BOM : Boolean)
+                        return Parser_Type
+                     is (Create_From_File
+                           (Filename, To_String (Unit.Charset), Read_BOM,
+                            Unit, With_Trivia));
+                  begin
+                     Parse_Unit
+                       (Units (Jobs (J)), Read_BOM, Get_Parser'Access,
+                        Memo_Stats
+                        % if ctx.instrument_parsers:
+                        , Parser_Stats
+                        % endif
+                       );
+                  end;
+               end loop;
+            end loop;
+
+            Dispatcher.Add_Stats
+              (Memo_Stats
+               % if ctx.instrument_parsers:
+               , Parser_Stats
+               % endif
+              );
+         exception
+            when Exc : others =>
+               Dispatcher.Set_Error (Exc);
+         end Worker_Task;
+
+         Pool : array (1 .. Natural'Min (Worker_Count, Job_Count))
+            of Worker_Task;
+         pragma Unreferenced (Pool);
+      begin
+         --  Leaving this block waits for all workers to complete
+         null;
+      end;
+
+      Set_Thread_Safe (Context.Symbols, False);
+
+      if Error /= null then
+         declare
+            Exc : Exception_Occurrence;
+         begin
+            Save_Occurrence (Exc, Error.all);
+            Free (Error);
+            Reraise_Occurrence (Exc);
+         end;
+      end if;
+
+      --  Lexical environments are shared between units: update them
+      --  sequentially.
+
+      for I in Units'Range loop
+         if Reparsed (I) then
+            Update_After_Reparse (Units (I));
+         end if;
+      end loop;
+
+      return Units;
+   end Get_From_Files;
+
    % if ctx.default_unit_file_provider:
 
    -----------------------
@@ -514,6 +1229,13 @@ package body ${ada_lib_name}.Analysis is
          raise Constraint_Error with "No such analysis unit";
       end if;
 
+      --  Cached property results may depend on the unit we are about to
+      --  remove: they must not be used anymore. Results in all units depend
+      --  on the unit that owns their node, and they check it first, so none
+      --  of them will read the removed unit once it is freed.
+
+      Reset_Property_Caches (Context);
+
       --  We remove the corresponding analysis unit from this context but
       --  users could keep references on it, so make sure it can live
       --  independently.
@@ -534,6 +1256,7 @@ package body ${ada_lib_name}.Analysis is
 
    procedure Destroy (Context : in out Analysis_Context) is
       Std_Unit : Analysis_Unit := Get_From_File (Context, "standard.ads");
+      Last     : Boolean;
    begin
 
       --  TODO: This is a hack to make sure that we don't deallocate standard
@@ -549,8 +1272,21 @@ package body ${ada_lib_name}.Analysis is
 
       Dec_Ref (Std_Unit);
 
+      --  Units that are still referenced keep the page cache alive until they
+      --  are destroyed.
+
+      Release (Context.Page_Cache);
       Destroy (Context.Symbols);
       Free (Context);
+
+      --  Lookups combine rebindings into values that only the table of
+      --  rebindings owns, and any context can use them: release them once no
+      --  context is left.
+
+      Live_Contexts.Remove (Last);
+      if Last then
+         AST_Envs.Clear_Rebindings;
+      end if;
    end Destroy;
 
    ---------------------------
@@ -657,6 +1393,42 @@ package body ${ada_lib_name}.Analysis is
       Update_After_Reparse (Unit);
    end Reparse;
 
+   -------------
+   -- Reparse --
+   -------------
+
+   procedure Reparse
+     (Unit    : Analysis_Unit;
+      Charset : String := "";
+      Buffer  : String;
+      Edit    : Source_Location_Range)
+   is
+      function Get_Parser
+        (Unit     : Analysis_Unit;
+         Read_BOM : Boolean)
+         return Parser_Type
+      is (Create_From_Buffer (Buffer, To_String (Unit.Charset), Read_BOM,
+                              Unit));
+
+      function Get_Relexing_Parser
+        (Unit     : Analysis_Unit;
+         Read_BOM : Boolean)
+         return Parser_Type
+      is (Create_From_Buffer (Buffer, To_String (Unit.Charset), Read_BOM,
+                              Unit, Edit => Edit));
+   begin
+      Update_Charset (Unit, Charset);
+      Do_Incremental_Parsing
+        (Unit, Charset'Length = 0, Get_Parser'Access,
+         Get_Relexing_Parser'Access, Edit);
+      Unit.Charset := To_Unbounded_String (Charset);
+
+      --  Lexical environments are computed from scratch: env actions may
+      --  evaluate properties, which may depend on any node, reused or not.
+
+      Update_After_Reparse (Unit);
+   end Reparse;
+
    -------------
    -- Destroy --
    -------------
@@ -673,6 +1445,9 @@ package body ${ada_lib_name}.Analysis is
 
       Free (Unit.TDH);
       Free (Unit.AST_Mem_Pool);
+      Free_Old_AST_Mem_Pools (Unit);
+      Unit.Old_AST_Mem_Pools.Destroy;
+      Unit.Parse_Results.Destroy;
       for D of Unit.Destroyables loop
          D.Destroy (D.Object);
       end loop;
@@ -814,6 +1589,106 @@ package body ${ada_lib_name}.Analysis is
       return Unit_File_Provider_Access_Cst is (Context.Unit_File_Provider);
    % endif
 
+   ----------------
+   -- Memo_Stats --
+   ----------------
+
+   function Memo_Stats
+     (Context : Analysis_Context) return Memo_Statistics_Array
+   is (Context.Memo_Stats);
+
+   ----------------------
+   -- Reset_Memo_Stats --
+   ----------------------
+
+   procedure Reset_Memo_Stats (Context : Analysis_Context) is
+   begin
+      Context.Memo_Stats := (others => <>);
+   end Reset_Memo_Stats;
+
+   ----------------------
+   -- AST_Memory_Stats --
+   ----------------------
+
+   function AST_Memory_Stats
+     (Context : Analysis_Context) return Pool_Statistics
+   is
+      Result : Pool_Statistics;
+   begin
+      for Unit of Context.Units_Map loop
+         Result := Result + Statistics (Unit.AST_Mem_Pool);
+         for I in 1 .. Unit.Old_AST_Mem_Pools.Length loop
+            Result := Result + Statistics (Unit.Old_AST_Mem_Pools.Get (I));
+         end loop;
+      end loop;
+      return Result;
+   end AST_Memory_Stats;
+
+   ----------------------
+   -- Page_Cache_Stats --
+   ----------------------
+
+   function Page_Cache_Stats
+     (Context : Analysis_Context) return Page_Cache_Statistics
+   is (Statistics (Context.Page_Cache));
+
+   % if ctx.instrument_parsers:
+   ------------------
+   -- Parser_Stats --
+   ------------------
+
+   function Parser_Stats
+     (Context : Analysis_Context) return Parser_Statistics_Array
+   is (Context.Parser_Stats);
+
+   ------------------------
+   -- Reset_Parser_Stats --
+   ------------------------
+
+   procedure Reset_Parser_Stats (Context : Analysis_Context) is
+   begin
+      Context.Parser_Stats := (others => <>);
+   end Reset_Parser_Stats;
+   % endif
+
+   % if ctx.instrument_properties:
+   -------------------
+   -- Property_Name --
+   -------------------
+
+   function Property_Name (Id : Property_Id) return String is
+   begin
+      case Id is
+         % if ctx.instrumented_properties:
+            % for prop in ctx.instrumented_properties:
+               when ${prop.profiling_id} =>
+                  return "${prop.qualname}";
+            % endfor
+         % else:
+            when No_Property =>
+               return "";
+         % endif
+      end case;
+   end Property_Name;
+
+   --------------------
+   -- Property_Stats --
+   --------------------
+
+   function Property_Stats
+     (Context : Analysis_Context) return Property_Statistics_Array
+   is (Context.Property_Stats);
+
+   --------------------------
+   -- Reset_Property_Stats --
+   --------------------------
+
+   procedure Reset_Property_Stats (Context : Analysis_Context) is
+   begin
+      Context.Property_Stats := (others => <>);
+   end Reset_Property_Stats;
+   % endif
+
    ----------------
    -- Token_Data --
    ----------------
@@ -826,7 +1701,10 @@ package body ${ada_lib_name}.Analysis is
    ----------
 
    function Root (Unit : Analysis_Unit) return ${root_node_type_name} is
-     (Unit.AST_Root);
+   begin
+      Record_Dependency (Unit);
+      return Unit.AST_Root;
+   end Root;
 
    -----------------
    -- First_Token --
@@ -870,16 +1748,6 @@ package body ${ada_lib_name}.Analysis is
    function Get_Filename (Unit : Analysis_Unit) return String is
      (To_String (Unit.File_Name));
 
-   -----------------------
-   -- Set_Filled_Caches --
-   -----------------------
-
-   procedure Set_Filled_Caches (Unit : Analysis_Unit)
-   is
-   begin
-      Unit.Has_Filled_Caches := True;
-   end Set_Filled_Caches;
-
    --------------
    -- Get_Unit --
    --------------
@@ -889,6 +1757,7 @@ package body ${ada_lib_name}.Analysis is
       return Analysis_Unit
    is
    begin
+      Record_Dependency (Node.Unit);
       return Node.Unit;
    end Get_Unit;
 
@@ -960,26 +1829,259 @@ package body ${ada_lib_name}.Analysis is
    ---------------------------
 
    procedure Reset_Property_Caches (Unit : Analysis_Unit) is
+   begin
+      Unit.Cache_Version := Unit.Cache_Version + 1;
+      Unit.Context.Cache_Version := Unit.Context.Cache_Version + 1;
 
-      -----------
-      -- Visit --
-      -----------
+      --  Dynamic env getters evaluate properties, so lexical env lookups that
+      --  go through them can change as well.
 
-      function Visit
-        (Node : access ${root_node_value_type}'Class)
-         return Visit_Status
-      is
-      begin
-         Node.Reset_Property_Caches;
-         return Into;
-      end Visit;
+      AST_Envs.Invalidate_Lookup_Caches;
+   end Reset_Property_Caches;
+
+   ---------------------
+   -- Current_Version --
+   ---------------------
+
+   function Current_Version
+     (Context : Analysis_Context;
+      Unit    : Analysis_Unit) return Cache_Version_Type
+   is
+     (if Unit /= null
+      then Unit.Cache_Version
+      elsif Context = null
+      then 0
+      else Cache_Version_Type (AST_Envs.Version (Context.Root_Scope)));
+
+   -----------------------
+   -- Append_Dependency --
+   -----------------------
 
+   procedure Append_Dependency
+     (Deps  : in out Unit_Dependency_Vectors.Vector;
+      First : Positive;
+      Dep   : Unit_Dependency) is
    begin
-      if Unit.Has_Filled_Caches and Unit.AST_Root /= null then
-         Unit.AST_Root.Traverse (Visit'Access);
+      for I in First .. Deps.Last_Index loop
+         if Deps.Get (I).Unit = Dep.Unit then
+            return;
+         end if;
+      end loop;
+      Deps.Append (Dep);
+   end Append_Dependency;
+
+   ----------------------------
+   -- Enter_Dependency_Frame --
+   ----------------------------
+
+   function Enter_Dependency_Frame
+     (Context : Analysis_Context) return Dependency_Frame
+   is
+      State  : Dependency_State_Access := Dependency_States.Value;
+      Result : Dependency_Frame;
+   begin
+      if State = null then
+         State := new Dependency_State;
+         Dependency_States.Set_Value (State);
       end if;
-      Unit.Has_Filled_Caches := False;
-   end Reset_Property_Caches;
+
+      Result := (Parent_Start   => State.Frame_Start,
+                 Start          => State.Stack.Length + 1,
+                 Parent_Context => State.Context);
+      State.Frame_Start := Result.Start;
+      State.Context := Context;
+      return Result;
+   end Enter_Dependency_Frame;
+
+   ----------------------------
+   -- Leave_Dependency_Frame --
+   ----------------------------
+
+   procedure Leave_Dependency_Frame
+     (Frame : in out Dependency_Frame;
+      Deps  : in out Unit_Dependency_Vectors.Vector)
+   is
+      State : Dependency_State_Access;
+   begin
+      if Frame = No_Dependency_Frame then
+         return;
+      end if;
+
+      --  Nested evaluations have already recorded their dependencies in
+      --  Frame, so everything from its start to the end of the stack belongs
+      --  to it.
+
+      State := Dependency_States.Value;
+      for I in Frame.Start .. State.Stack.Last_Index loop
+         Append_Dependency (Deps, 1, State.Stack.Get (I));
+      end loop;
+      while State.Stack.Length >= Frame.Start loop
+         State.Stack.Pop;
+      end loop;
+
+      State.Frame_Start := Frame.Parent_Start;
+      State.Context := Frame.Parent_Context;
+      if State.Frame_Start = 0 then
+         State.Stack.Destroy;
+         Free (State);
+         Dependency_States.Set_Value (null);
+      else
+         Record_Dependencies (Deps);
+      end if;
+      Frame := No_Dependency_Frame;
+   end Leave_Dependency_Frame;
+
+   -----------------------
+   -- Record_Dependency --
+   -----------------------
+
+   procedure Record_Dependency (Unit : Analysis_Unit) is
+      State : constant Dependency_State_Access := Dependency_States.Value;
+   begin
+      if State /= null and then State.Frame_Start /= 0 then
+         Append_Dependency
+           (State.Stack,
+            State.Frame_Start,
+            (Unit, Current_Version (State.Context, Unit)));
+      end if;
+   end Record_Dependency;
+
+   -------------------------
+   -- Record_Dependencies --
+   -------------------------
+
+   procedure Record_Dependencies (Deps : Unit_Dependency_Vectors.Vector) is
+      State : constant Dependency_State_Access := Dependency_States.Value;
+   begin
+      if State /= null and then State.Frame_Start /= 0 then
+         for D of Deps loop
+            Append_Dependency (State.Stack, State.Frame_Start, D);
+         end loop;
+      end if;
+   end Record_Dependencies;
+
+   -------------------
+   -- Is_Up_To_Date --
+   -------------------
+
+   function Is_Up_To_Date
+     (Context : Analysis_Context;
+      Deps    : Unit_Dependency_Vectors.Vector) return Boolean is
+   begin
+      for D of Deps loop
+         if Current_Version (Context, D.Unit) /= D.Version then
+            return False;
+         end if;
+      end loop;
+      return True;
+   end Is_Up_To_Date;
+
+   -----------------
+   -- Cache_Epoch --
+   -----------------
+
+   function Cache_Epoch (Context : Analysis_Context) return Cache_Version_Type
+   is
+     (if Context = null
+      then 0
+      else Context.Cache_Version
+           + Cache_Version_Type (AST_Envs.Version (Context.Root_Scope)));
+
+   -----------------
+   -- Env_Visited --
+   -----------------
+
+   procedure Env_Visited (Node : ${root_node_type_name}) is
+   begin
+      Record_Dependency (if Node = null then null else Node.Unit);
+   end Env_Visited;
+
+   ------------------
+   -- Env_Modified --
+   ------------------
+
+   procedure Env_Modified (Node : ${root_node_type_name}) is
+   begin
+      if Node /= null then
+         Node.Unit.Cache_Version := Node.Unit.Cache_Version + 1;
+         Node.Unit.Context.Cache_Version :=
+           Node.Unit.Context.Cache_Version + 1;
+      end if;
+   end Env_Modified;
+
+   % if ctx.instrument_properties:
+   --------------------
+   -- Enter_Property --
+   --------------------
+
+   procedure Enter_Property
+     (Profile : aliased out Property_Profile;
+      Id      : Property_Id;
+      Node    : access ${root_node_value_type}'Class)
+   is
+      Context : constant Analysis_Context :=
+        (if Node = null or else Node.Unit = null
+         then null
+         else Node.Unit.Context);
+   begin
+      Profile :=
+        (Context       => Context,
+         Id            => Id,
+         Start         => Ada.Real_Time.Clock,
+         Parent        => null,
+         Children_Time => 0.0,
+         Memo_Hit      => False);
+
+      --  Nested property calls need Profile to report their time to it.
+      --  Statistics and call nesting are per context, so that tasks can
+      --  evaluate properties on different contexts concurrently.
+
+      if Context /= null then
+         Profile.Parent := Context.Current_Profile;
+         Context.Current_Profile := Profile'Unchecked_Access;
+      end if;
+   end Enter_Property;
+
+   --------------------
+   -- Leave_Property --
+   --------------------
+
+   procedure Leave_Property
+     (Profile               : in out Property_Profile;
+      Raised_Property_Error : Boolean := False)
+   is
+      use type Ada.Real_Time.Time;
+
+      Elapsed : constant Duration :=
+         Ada.Real_Time.To_Duration (Ada.Real_Time.Clock - Profile.Start);
+   begin
+      if Profile.Context /= null then
+         declare
+            S : Property_Statistics renames
+               Profile.Context.Property_Stats (Profile.Id);
+         begin
+            S.Calls := S.Calls + 1;
+            S.Total_Time := S.Total_Time + Elapsed;
+            S.Self_Time := S.Self_Time + (Elapsed - Profile.Children_Time);
+            if Profile.Memo_Hit then
+               S.Memo_Hits := S.Memo_Hits + 1;
+            end if;
+            if Raised_Property_Error then
+               S.Property_Errors := S.Property_Errors + 1;
+            end if;
+         end;
+
+         --  From the point of view of the enclosing property call, all the
+         --  time spent in this one is time spent in nested calls.
+
+         if Profile.Parent /= null then
+            Profile.Parent.Children_Time :=
+               Profile.Parent.Children_Time + Elapsed;
+         end if;
+         Profile.Context.Current_Profile := Profile.Parent;
+      end if;
+   end Leave_Property;
+   % endif
 
    ${array_types.body(LexicalEnvType.array_type())}
    ${array_types.body(T.root_node.env_el().array_type())}
@@ -1387,9 +2489,9 @@ package body ${ada_lib_name}.Analysis is
       TDH                  : Token_Data_Handler renames Node.Unit.TDH;
       Sloc_Start, Sloc_End : Source_Location;
 
-      function Get
-        (Index : Token_Index) return Lexer.Token_Data_Type is
-        (Get_Token (TDH, Index));
+      function Token_Sloc
+        (Index : Token_Index) return Source_Location_Range is
+        (Lexer.Sloc_Range (TDH, Get_Token (TDH, Index)));
 
    begin
       if Node.Is_Synthetic then
@@ -1417,14 +2519,14 @@ package body ${ada_lib_name}.Analysis is
             Tok_End : constant Token_Index :=
               Token_Index'Min (Node.Token_End + 1, Last_Token (TDH));
          begin
-            Sloc_Start := End_Sloc (Get (Tok_Start).Sloc_Range);
-            Sloc_End := Start_Sloc (Get (Tok_End).Sloc_Range);
+            Sloc_Start := End_Sloc (Token_Sloc (Tok_Start));
+            Sloc_End := Start_Sloc (Token_Sloc (Tok_End));
          end;
       else
-         Sloc_Start := Start_Sloc (Get (Node.Token_Start).Sloc_Range);
+         Sloc_Start := Start_Sloc (Token_Sloc (Node.Token_Start));
          Sloc_End := (if Node.Token_End /= No_Token_Index
-                      then End_Sloc (Get (Node.Token_End).Sloc_Range)
-                      else Start_Sloc (Get (Node.Token_Start).Sloc_Range));
+                      then End_Sloc (Token_Sloc (Node.Token_End))
+                      else Start_Sloc (Token_Sloc (Node.Token_Start)));
       end if;
       return Make_Range (Sloc_Start, Sloc_End);
    end Sloc_Range;
@@ -1462,42 +2564,72 @@ package body ${ada_lib_name}.Analysis is
       --  assume that all lookups fall into this node's sloc range.
       pragma Assert (Compare (Sloc_Range (Node, Snap), Sloc) = Inside);
 
-      Children : constant ${root_node_array.array()} := Node.Children;
-      Pos      : Relative_Position;
-      Result   : ${root_node_type_name};
+      Low, High : Natural;
+      Found     : Natural := 0;
    begin
       --  Look for a child node that contains Sloc (i.e. return the most
       --  precise result).
+      --
+      --  Note that we assume here that child nodes are ordered so that the
+      --  first one has a sloc range that is before the sloc range of the
+      --  second child node, etc. This makes it possible to do a binary search
+      --  on children, without building the array of children.
+
+      Low := 1;
+      High := Node.Child_Count;
+      while Low <= High loop
+         declare
+            Middle : constant Positive := (Low + High) / 2;
+            Index  : Positive := Middle;
+            Child  : ${root_node_type_name} := Node.Child (Index);
+         begin
+            --  Absent children have no sloc range: use the next present
+            --  child instead, if any.
 
-      for Child of Children loop
-         --  Note that we assume here that child nodes are ordered so that the
-         --  first one has a sloc range that is before the sloc range of the
-         --  second child node, etc.
+            while Child = null and then Index < High loop
+               Index := Index + 1;
+               Child := Node.Child (Index);
+            end loop;
 
-         if Child /= null then
-            Lookup_Relative (Child, Sloc, Pos, Result, Snap);
-            case Pos is
-               when Before =>
-                   --  If this is the first node, Sloc is before it, so we can
-                   --  stop here.  Otherwise, Sloc is between the previous
-                   --  child node and the next one...  so we can stop here,
-                   --  too.
-                   return Node;
-
-               when Inside =>
-                   return Result;
-
-               when After =>
-                   --  Sloc is after the current child node, so see with the
-                   --  next one.
-                   null;
-            end case;
-         end if;
+            if Child = null then
+               High := Middle - 1;
+            else
+               case Compare (Child, Sloc, Snap) is
+                  when Before =>
+                     High := Middle - 1;
+                  when Inside =>
+                     Found := Index;
+                     exit;
+                  when After =>
+                     Low := Index + 1;
+               end case;
+            end if;
+         end;
+      end loop;
+
+      --  If we found no children that covers Sloc, Node still covers it (see
+      --  the assertion).
+
+      if Found = 0 then
+         return Node;
+      end if;
+
+      --  Sloc ranges of consecutive children can overlap (for instance when
+      --  snapping), so make sure we return the result for the first child
+      --  that covers Sloc.
+
+      for I in reverse 1 .. Found - 1 loop
+         declare
+            Child : constant ${root_node_type_name} := Node.Child (I);
+         begin
+            if Child /= null then
+               exit when Compare (Child, Sloc, Snap) /= Inside;
+               Found := I;
+            end if;
+         end;
       end loop;
 
-      --  If we reach this point, we found no children that covers Sloc, but
-      --  Node still covers it (see the assertion).
-      return Node;
+      return Lookup_Internal (Node.Child (Found), Sloc, Snap);
    end Lookup_Internal;
 
    -------------
@@ -1531,6 +2663,21 @@ package body ${ada_lib_name}.Analysis is
                      else null);
    end Lookup_Relative;
 
+   ----------
+   -- Hash --
+   ----------
+
+   function Hash
+     (Node : ${root_node_type_name}) return Ada.Containers.Hash_Type is
+   begin
+      --  Null is a valid value for node arguments of memoized properties
+
+      if Node = null then
+         return 0;
+      end if;
+      return Hash_Type'Mod (To_Integer (Node.all'Address));
+   end Hash;
+
    -------------------
    -- Get_Extension --
    -------------------
@@ -1540,9 +2687,18 @@ package body ${ada_lib_name}.Analysis is
       ID   : Extension_ID;
       Dtor : Extension_Destructor) return Extension_Access
    is
-      use Extension_Vectors;
-   begin
-      for Slot of Node.Extensions loop
+      use Extension_Vectors, Extension_Maps;
+
+      Key    : constant ${root_node_type_name} :=
+         ${root_node_type_name} (Node);
+      Cur    : constant Extension_Maps.Cursor :=
+         Node.Unit.Extensions.Find (Key);
+      Slots  : Extension_Vectors.Vector :=
+        (if Has_Element (Cur)
+         then Element (Cur)
+         else Extension_Vectors.Empty_Vector);
+   begin
+      for Slot of Slots loop
          if Slot.ID = ID then
             return Slot.Extension;
          end if;
@@ -1552,10 +2708,14 @@ package body ${ada_lib_name}.Analysis is
          New_Ext : constant Extension_Access :=
            new Extension_Type'(Extension_Type (System.Null_Address));
       begin
-         Append (Node.Extensions,
+         --  Slots is a shallow copy of the vector in the map: store it back
+         --  as appending may have reallocated its elements.
+
+         Append (Slots,
                  Extension_Slot'(ID        => ID,
                                  Extension => New_Ext,
                                  Dtor      => Dtor));
+         Node.Unit.Extensions.Include (Key, Slots);
          return New_Ext;
       end;
    end Get_Extension;
@@ -1567,16 +2727,32 @@ package body ${ada_lib_name}.Analysis is
    procedure Free_Extensions (Node : access ${root_node_value_type}'Class) is
       procedure Free is new Ada.Unchecked_Deallocation
         (Extension_Type, Extension_Access);
-      use Extension_Vectors;
-      Slot : Extension_Slot;
+      use Extension_Vectors, Extension_Maps;
+
+      Cur   : Extension_Maps.Cursor;
+      Slots : Extension_Vectors.Vector;
+      Slot  : Extension_Slot;
    begin
+      --  Most nodes have no extension: avoid the lookup when no node has one
+
+      if Node.Unit = null or else Node.Unit.Extensions.Is_Empty then
+         return;
+      end if;
+
+      Cur := Node.Unit.Extensions.Find (${root_node_type_name} (Node));
+      if not Has_Element (Cur) then
+         return;
+      end if;
+      Slots := Element (Cur);
+      Node.Unit.Extensions.Delete (Cur);
+
       --  Explicit iteration for perf
-      for J in First_Index (Node.Extensions) .. Last_Index (Node.Extensions)
-      loop
-         Slot := Get (Node.Extensions, J);
+      for J in First_Index (Slots) .. Last_Index (Slots) loop
+         Slot := Get (Slots, J);
          Slot.Dtor (Node, Slot.Extension.all);
          Free (Slot.Extension);
       end loop;
+      Destroy (Slots);
    end Free_Extensions;
 
    --------------
@@ -1899,7 +3075,7 @@ package body ${ada_lib_name}.Analysis is
               Source_Buffer => Text_Cst_Access (TDH.Source_Buffer),
               Source_First  => Raw_Data.Source_First,
               Source_Last   => Raw_Data.Source_Last,
-              Sloc_Range    => Raw_Data.Sloc_Range);
+              Sloc_Range    => Lexer.Sloc_Range (TDH, Raw_Data));
    end Convert;
 
    ----------
@@ -1908,6 +3084,9 @@ package body ${ada_lib_name}.Analysis is
 
    function Data (Token : Token_Type) return Token_Data_Type is
    begin
+      --  The result references the source buffer, so it must not be compact
+
+      Expand (Token.TDH.all);
       return Convert (Token.TDH.all, Token, Raw_Data (Token));
    end Data;
 
@@ -1918,7 +3097,7 @@ package body ${ada_lib_name}.Analysis is
    function Text (Token : Token_Type) return Text_Type is
       RD : constant Lexer.Token_Data_Type := Raw_Data (Token);
    begin
-      return Token.TDH.Source_Buffer (RD.Source_First .. RD.Source_Last);
+      return Text (Token.TDH.all, RD.Source_First, RD.Source_Last);
    end Text;
 
    ----------
@@ -1926,13 +3105,13 @@ package body ${ada_lib_name}.Analysis is
    ----------
 
    function Text (First, Last : Token_Type) return Text_Type is
-      FD : constant Token_Data_Type := Data (First);
-      LD : constant Token_Data_Type := Data (Last);
+      FD : constant Lexer.Token_Data_Type := Raw_Data (First);
+      LD : constant Lexer.Token_Data_Type := Raw_Data (Last);
    begin
       if First.TDH /= Last.TDH then
          raise Constraint_Error;
       end if;
-      return FD.Source_Buffer.all (FD.Source_First .. LD.Source_Last);
+      return Text (First.TDH.all, FD.Source_First, LD.Source_Last);
    end Text;
 
    ----------
@@ -2598,6 +3777,25 @@ package body ${ada_lib_name}.Analysis is
       return ${LexicalEnvType.name()}
    is (Group (Envs.Items));
 
+   --------------------
+   -- Resolve_Unique --
+   --------------------
+
+   function Resolve_Unique
+     (Self      : Lexical_Env;
+      Key       : Symbol_Type;
+      From      : ${root_node_type_name} := null;
+      Recursive : Boolean := True) return Env_Element
+   is
+      Result : constant Env_Element :=
+         AST_Envs.Get_First (Self, Key, From, Recursive);
+   begin
+      if Result.Is_Null then
+         raise Property_Error with "no such element in lexical environment";
+      end if;
+      return Result;
+   end Resolve_Unique;
+
    ## Generate the bodies of the root grammar class properties
    % for prop in T.root_node.get_properties(include_inherited=False):
    ${prop.prop_def}
@@ -13,6 +13,9 @@
 
 with Ada.Containers.Hashed_Maps;
 with Ada.Finalization;
+% if ctx.instrument_properties:
+with Ada.Real_Time;
+% endif
 with Ada.Strings.Unbounded; use Ada.Strings.Unbounded;
 with Ada.Strings.Unbounded.Hash;
 with Ada.Unchecked_Deallocation;
@@ -58,6 +61,10 @@ package ${ada_lib_name}.Analysis is
    --  Special value to mean the absence of analysis unit. No analysis units
    --  can be passed this value.
 
+   type Analysis_Unit_Array is array (Positive range <>) of Analysis_Unit;
+
+   type Filename_Array is array (Positive range <>) of Unbounded_String;
+
    No_Analysis_Context : constant Analysis_Context;
    --  Special value to mean the absence of analysis unit. No analysis units
    --  can be passed this value.
@@ -72,6 +79,58 @@ package ${ada_lib_name}.Analysis is
    );
    ${ada_doc('langkit.grammar_rule_type', 3)}
 
+   type Memo_Statistics is record
+      Hits, Misses, Evictions : Long_Long_Integer := 0;
+   end record;
+   --  Statistics about the use of the memoization table for some grammar
+   --  rule: number of lookups that found a result, number of lookups that
+   --  found nothing and number of results that were evicted to make room for
+   --  new ones. Use them to tune memoization for this rule in the grammar.
+   --  Rules that can never be tried twice at the same token index have no
+   --  memoization table, so their statistics are always zero.
+
+   type Memo_Statistics_Array is array (Grammar_Rule) of Memo_Statistics;
+
+   % if ctx.instrument_parsers:
+   type Parser_Rule_Statistics is record
+      Calls, Memo_Hits, Memo_Misses, Failures, Tokens : Long_Long_Integer := 0;
+   end record;
+   ${ada_doc('langkit.parser_rule_stats_type', 3)}
+
+   type Parser_Statistics_Array is
+      array (Grammar_Rule) of Parser_Rule_Statistics;
+   % endif
+
+   % if ctx.instrument_properties:
+   <% instrumented_properties = ctx.instrumented_properties %>
+   type Property_Id is (
+      % if instrumented_properties:
+         % for i, prop in enumerate(instrumented_properties):
+            % if i > 0:
+               ,
+            % endif
+            ${prop.profiling_id}
+         % endfor
+      % else:
+         No_Property
+         --  Placeholder: there is no property to collect statistics for
+      % endif
+   );
+   ${ada_doc('langkit.property_id_type', 3)}
+
+   function Property_Name (Id : Property_Id) return String;
+   ${ada_doc('langkit.property_name', 3)}
+
+   type Property_Statistics is record
+      Calls, Memo_Hits, Property_Errors : Long_Long_Integer := 0;
+      Total_Time, Self_Time             : Duration := 0.0;
+   end record;
+   ${ada_doc('langkit.property_stats_type', 3)}
+
+   type Property_Statistics_Array is
+      array (Property_Id) of Property_Statistics;
+   % endif
+
    type ${root_node_value_type} is abstract tagged private;
    --  This "by-value" type is public to expose the fact that the various
    --  AST nodes are a hierarchy of tagged types, but it is not intended to be
@@ -135,6 +194,7 @@ package ${ada_lib_name}.Analysis is
       % if ctx.default_unit_file_provider:
          ; Unit_File_Provider : Unit_File_Provider_Access_Cst := null
       % endif
+      ; Compact_Sources : Boolean := False
      ) return Analysis_Context;
    ${ada_doc('langkit.create_context', 3)}
 
@@ -166,6 +226,19 @@ package ${ada_lib_name}.Analysis is
       return Analysis_Unit;
    ${ada_doc('langkit.get_unit_from_buffer', 3)}
 
+   function Get_From_Files
+     (Context     : Analysis_Context;
+      Filenames   : Filename_Array;
+      Charset     : String := "";
+      Reparse     : Boolean := False;
+      With_Trivia : Boolean := False;
+      Rule        : Grammar_Rule :=
+         ${Name.from_lower(ctx.main_rule_name)}_Rule;
+      Workers     : Natural := 0;
+      Chunk_Size  : Positive := 1)
+      return Analysis_Unit_Array;
+   ${ada_doc('langkit.get_units_from_files', 3)}
+
    function Has_Unit
      (Context       : Analysis_Context;
       Unit_Filename : String) return Boolean;
@@ -195,6 +268,45 @@ package ${ada_lib_name}.Analysis is
                      File_Name : String);
    ${ada_doc('langkit.remove_unit', 3)}
 
+   function Memo_Stats
+     (Context : Analysis_Context) return Memo_Statistics_Array;
+   --  Return memoization statistics for all grammar rules, accumulated over
+   --  all parsing done in Context since its creation or since the last call
+   --  to Reset_Memo_Stats.
+
+   procedure Reset_Memo_Stats (Context : Analysis_Context);
+   --  Reset to zero all memoization statistics for Context
+
+   function AST_Memory_Stats
+     (Context : Analysis_Context) return Pool_Statistics;
+   --  Return statistics about the memory pools that hold the AST of all units
+   --  in Context, including the pools that incremental reparsing keeps
+   --  alive.
+
+   function Page_Cache_Stats
+     (Context : Analysis_Context) return Page_Cache_Statistics;
+   --  Return statistics about the cache of free pages that memory pools for
+   --  units in Context share, so that reparsing reuses pages instead of
+   --  allocating new ones.
+
+   % if ctx.instrument_parsers:
+   function Parser_Stats
+     (Context : Analysis_Context) return Parser_Statistics_Array;
+   ${ada_doc('langkit.context_parser_stats', 3)}
+
+   procedure Reset_Parser_Stats (Context : Analysis_Context);
+   ${ada_doc('langkit.context_reset_parser_stats', 3)}
+   % endif
+
+   % if ctx.instrument_properties:
+   function Property_Stats
+     (Context : Analysis_Context) return Property_Statistics_Array;
+   ${ada_doc('langkit.context_property_stats', 3)}
+
+   procedure Reset_Property_Stats (Context : Analysis_Context);
+   ${ada_doc('langkit.context_reset_property_stats', 3)}
+   % endif
+
    procedure Destroy (Context : in out Analysis_Context);
    ${ada_doc('langkit.destroy_context', 3)}
 
@@ -216,6 +328,13 @@ package ${ada_lib_name}.Analysis is
       Buffer  : String);
    ${ada_doc('langkit.unit_reparse_buffer', 3)}
 
+   procedure Reparse
+     (Unit    : Analysis_Unit;
+      Charset : String := "";
+      Buffer  : String;
+      Edit    : Source_Location_Range);
+   ${ada_doc('langkit.unit_reparse_incremental', 3)}
+
    procedure Populate_Lexical_Env (Unit : Analysis_Unit);
    ${ada_doc('langkit.unit_populate_lexical_env', 3)}
 
@@ -324,13 +443,25 @@ package ${ada_lib_name}.Analysis is
       Node        : ${root_node_type_name};
    end record;
 
+   procedure Env_Visited (Node : ${root_node_type_name});
+   --  Record that the memoized property being evaluated, if any, depends on
+   --  the lexical environments of Node's unit, or on the root scope of its
+   --  context if Node is null.
+
+   procedure Env_Modified (Node : ${root_node_type_name});
+   --  Invalidate the results of memoized properties that depend on the
+   --  lexical environments of Node's unit. Do nothing if Node is null: the
+   --  version of the root scope covers this case.
+
    package AST_Envs is new Langkit_Support.Lexical_Env
      (Element_T        => ${root_node_type_name},
       Element_Metadata => ${T.env_md.name()},
       No_Element       => null,
       Empty_Metadata   => No_Metadata,
       Combine          => Combine,
-      Getter_State_T   => Env_Getter_State_T);
+      Getter_State_T   => Env_Getter_State_T,
+      Env_Visited      => Env_Visited,
+      Env_Modified     => Env_Modified);
 
    --  The following subtypes are introduced to ease code generation, so we
    --  don't have to deal with the AST_Envs suffix.
@@ -946,6 +1077,61 @@ private
    type Analysis_Context is access all Analysis_Context_Type;
    type Analysis_Unit is access all Analysis_Unit_Type;
 
+   type Cache_Version_Type is mod 2 ** 32;
+   --  Version number for the content of analysis units, as seen by memoized
+   --  properties. See Unit_Dependency.
+
+   type Unit_Dependency is record
+      Unit    : Analysis_Unit;
+      --  Analysis unit that the result of a memoized property depends on,
+      --  including the lexical environments that its nodes own. Null stands
+      --  for the root scope of the context: see AST_Envs.Version.
+
+      Version : Cache_Version_Type;
+      --  Version of Unit when the result was computed. The result is stale
+      --  as soon as Unit's version changes.
+   end record;
+
+   package Unit_Dependency_Vectors is new Langkit_Support.Vectors
+     (Unit_Dependency, Small_Vector_Capacity => 2);
+
+   type Dependency_Frame is record
+      Parent_Start, Start : Natural := 0;
+      Parent_Context      : Analysis_Context;
+   end record;
+   --  Bounds of the dependencies recorded during the evaluation of a
+   --  memoized property, and context of the enclosing evaluation. See
+   --  Enter_Dependency_Frame.
+
+   No_Dependency_Frame : constant Dependency_Frame := (0, 0, null);
+
+   % if ctx.instrument_properties:
+   type Property_Profile;
+   type Property_Profile_Access is access all Property_Profile;
+
+   type Property_Profile is record
+      Context       : Analysis_Context;
+      --  Context in which to accumulate statistics. Null if there is none,
+      --  in which case the call is not recorded.
+
+      Id            : Property_Id;
+      --  Property being evaluated
+
+      Start         : Ada.Real_Time.Time;
+      --  Time when the evaluation started
+
+      Parent        : Property_Profile_Access;
+      --  Profile for the enclosing property call in Context, if any
+
+      Children_Time : Duration;
+      --  Time spent so far in property calls nested in this one
+
+      Memo_Hit      : Boolean;
+      --  Whether the result was found in the memoization table
+   end record;
+   --  Bookkeeping for the evaluation of a property. See Enter_Property.
+   % endif
+
    No_Analysis_Unit    : constant Analysis_Unit := null;
    No_Analysis_Context : constant Analysis_Context := null;
 
@@ -991,6 +1177,36 @@ private
          Symbol_Literals : Symbol_Literal_Array;
          --  List of pre-computed symbols in the Symbols table
       % endif
+
+      Compact_Sources : Boolean;
+      --  Whether to store source buffers in compact form after parsing. See
+      --  the Create function.
+
+      Page_Cache : Langkit_Support.Bump_Ptr.Page_Cache;
+      --  Cache of free pages for the memory pools of all units in this
+      --  context.
+
+      Memo_Stats : Memo_Statistics_Array;
+      --  Memoization statistics accumulated by all parsers for this context
+
+      Cache_Version : Cache_Version_Type;
+      --  Bumped every time the version of one of this context's units
+      --  changes. See Cache_Epoch.
+
+      % if ctx.instrument_parsers:
+      Parser_Stats : Parser_Statistics_Array;
+      --  Parsing statistics accumulated by all parsers for this context
+      % endif
+
+      % if ctx.instrument_properties:
+      Property_Stats : Property_Statistics_Array;
+      --  Evaluation statistics accumulated by all properties for nodes in
+      --  this context.
+
+      Current_Profile : Property_Profile_Access;
+      --  Profile for the innermost property call being evaluated in this
+      --  context, if any. See Enter_Property.
+      % endif
    end record;
 
    procedure Reset_Property_Caches (Context : Analysis_Context);
@@ -1011,6 +1227,49 @@ private
    package Destroyable_Vectors is new Langkit_Support.Vectors
      (Destroyable_Type);
 
+   type Parse_Result is record
+      Rule      : Grammar_Rule;
+      Node      : ${root_node_type_name};
+      Start     : Token_Index := No_Token_Index;
+      Final     : Token_Index := No_Token_Index;
+      Lookahead : Token_Index := No_Token_Index;
+   end record;
+   --  Successful result for the parsing of Rule at the Start token: Node is
+   --  the resulting tree and Final is the index of the first token after it.
+   --  Lookahead is the index of the furthest token that the parser may have
+   --  examined to produce this result, so that parsing Rule at Start yields
+   --  the same result as long as tokens from Start to Lookahead do not
+   --  change.
+
+   package Parse_Result_Vectors is new Langkit_Support.Vectors
+     (Parse_Result);
+
+   package Pool_Vectors is new Langkit_Support.Vectors (Bump_Ptr_Pool);
+
+   --------------------------
+   -- Extensions internals --
+   --------------------------
+
+   type Extension_Slot is record
+      ID        : Extension_ID;
+      Extension : Extension_Access;
+      Dtor      : Extension_Destructor;
+   end record;
+
+   package Extension_Vectors is new Langkit_Support.Vectors
+     (Element_Type => Extension_Slot);
+
+   function Hash
+     (Node : ${root_node_type_name}) return Ada.Containers.Hash_Type;
+   --  Hash Node's address, or return 0 if Node is null
+
+   package Extension_Maps is new Ada.Containers.Hashed_Maps
+     (Key_Type        => ${root_node_type_name},
+      Element_Type    => Extension_Vectors.Vector,
+      Hash            => Hash,
+      Equivalent_Keys => "=",
+      "="             => Extension_Vectors."=");
+
    package Analysis_Unit_Sets
    is new Langkit_Support.Cheap_Sets (Analysis_Unit, null);
 
@@ -1069,10 +1328,10 @@ private
       --  populate multiple times the same unit and hence avoid infinite
       --  populate recursions for circular dependencies.
 
-      Has_Filled_Caches : Boolean;
-      --  Set iff at least one memoized property has been evaluated
-      --  successfully in one of the nodes, i.e. whether we need to invalidate
-      --  the cache on the AST_Root tree.
+      Cache_Version     : Cache_Version_Type;
+      --  Version of this unit for memoized properties. See
+      --  Reset_Property_Caches. Every change is also reflected in the
+      --  Cache_Version of the context.
 
       Rule              : Grammar_Rule;
       --  The grammar rule used to parse this unit
@@ -1081,6 +1340,20 @@ private
       --  This memory pool shall only be used for AST parsing. Stored here
       --  because it is more convenient, but one shall not allocate from it.
 
+      Old_AST_Mem_Pools : Pool_Vectors.Vector;
+      --  Memory pools from previous parsings that may still contain nodes
+      --  in AST_Root, as incremental reparsing reuses nodes.
+
+      Keep_Parse_Results : Boolean;
+      --  Whether parsing must record rule results in Parse_Results. This is
+      --  enabled the first time the unit is reparsed incrementally, so that
+      --  units that are never edited do not pay for it.
+
+      Parse_Results     : Parse_Result_Vectors.Vector;
+      --  Rule results from the last parsing of this unit, so that the next
+      --  incremental reparsing can reuse them. All nodes they reference are
+      --  part of AST_Root.
+
       Destroyables      : Destroyable_Vectors.Vector;
       --  Collection of objects to destroy when destroying the analysis unit
 
@@ -1089,6 +1362,11 @@ private
       --  visibility/computation of the reference graph.
 
       Lex_Env_Data_Acc  : Lex_Env_Data;
+
+      Extensions        : Extension_Maps.Map;
+      --  Extensions for the nodes of this unit (see Get_Extension). Very few
+      --  nodes have extensions, so keeping them in this side table rather
+      --  than in nodes saves memory.
    end record;
 
    function Token_Data
@@ -1099,12 +1377,72 @@ private
       Object  : System.Address;
       Destroy : Destroy_Procedure);
 
-   procedure Set_Filled_Caches (Unit : Analysis_Unit);
-   --  Tag Unit as having filled caches for properties memoization
-
    procedure Reset_Property_Caches (Unit : Analysis_Unit);
-   --  If AST_Node is not null, invoke Reset_Property_Caches primitives on all
-   --  the nodes it contains.
+   --  Invalidate the results of memoized properties that depend on Unit, as
+   --  well as lexical env lookup caches. This only bumps Unit's cache
+   --  version: stale results are discarded lazily, the next time the
+   --  corresponding properties are evaluated.
+   --
+   --  As dynamic env getters evaluate properties, the results of lexical env
+   --  lookups can change as well, hence the invalidation of lookup caches.
+   --  Memoized properties do not need this: the properties that dynamic env
+   --  getters evaluate during their lookups record their own dependencies.
+
+   function Enter_Dependency_Frame
+     (Context : Analysis_Context) return Dependency_Frame;
+   --  Start recording the analysis units that the memoized property about to
+   --  be evaluated depends on. Context is the analysis context of the node
+   --  it is evaluated on. Return the frame to pass to Leave_Dependency_Frame
+   --  once the evaluation is done.
+   --
+   --  Dependencies are recorded in a stack that belongs to the current task,
+   --  so that tasks can evaluate properties on different contexts
+   --  concurrently.
+
+   procedure Leave_Dependency_Frame
+     (Frame : in out Dependency_Frame;
+      Deps  : in out Unit_Dependency_Vectors.Vector);
+   --  Stop recording dependencies for Frame: append them to Deps and record
+   --  them as dependencies of the enclosing memoized property, if any. Reset
+   --  Frame to No_Dependency_Frame. Do nothing if Frame is already
+   --  No_Dependency_Frame.
+
+   procedure Record_Dependency (Unit : Analysis_Unit);
+   --  If a memoized property is being evaluated, record that its result
+   --  depends on Unit, or on the root scope of its context if Unit is null.
+
+   procedure Record_Dependencies (Deps : Unit_Dependency_Vectors.Vector);
+   --  Likewise for all dependencies in Deps, keeping their versions. This is
+   --  used when memoized properties return cached results.
+
+   function Is_Up_To_Date
+     (Context : Analysis_Context;
+      Deps    : Unit_Dependency_Vectors.Vector) return Boolean;
+   --  Return whether none of the dependencies in Deps, which were recorded
+   --  for a property evaluated in Context, changed since then.
+
+   function Cache_Epoch (Context : Analysis_Context) return Cache_Version_Type;
+   --  Return a number that changes whenever the version of any dependency
+   --  that can be recorded in Context changes. Memoized properties compare it
+   --  to the one they saw last so that they call Is_Up_To_Date only when
+   --  something changed in the context.
+
+   % if ctx.instrument_properties:
+   procedure Enter_Property
+     (Profile : aliased out Property_Profile;
+      Id      : Property_Id;
+      Node    : access ${root_node_value_type}'Class);
+   --  Start timing an evaluation of the Id property on Node. Return in
+   --  Profile what Leave_Property needs to record the call. Profile becomes
+   --  the current profile of Node's context until Leave_Property, so it must
+   --  not be moved in the meantime.
+
+   procedure Leave_Property
+     (Profile               : in out Property_Profile;
+      Raised_Property_Error : Boolean := False);
+   --  Stop timing the evaluation of a property and record it in the
+   --  statistics of the corresponding context.
+   % endif
 
    function Is_Referenced
      (Unit, Referenced : Analysis_Unit) return Boolean;
@@ -1152,19 +1490,6 @@ private
       ${prop.prop_decl}
    % endfor
 
-   --------------------------
-   -- Extensions internals --
-   --------------------------
-
-   type Extension_Slot is record
-      ID        : Extension_ID;
-      Extension : Extension_Access;
-      Dtor      : Extension_Destructor;
-   end record;
-
-   package Extension_Vectors is new Langkit_Support.Vectors
-     (Element_Type => Extension_Slot);
-
    --------------------------------------
    -- Environments handling (internal) --
    --------------------------------------
@@ -1190,6 +1515,15 @@ private
       return ${LexicalEnvType.name()};
    --  Convenience wrapper for uniform types handling in code generation
 
+   function Resolve_Unique
+     (Self      : Lexical_Env;
+      Key       : Symbol_Type;
+      From      : ${root_node_type_name} := null;
+      Recursive : Boolean := True) return Env_Element;
+   --  Return the first element that AST_Envs.Get (Self, Key, From, Recursive)
+   --  would return, stopping the lookup as soon as it is found. Raise a
+   --  Property_Error if there is no such element. Useful for code generation.
+
    -------------------------------
    -- Root AST node (internals) --
    -------------------------------
@@ -1206,8 +1540,6 @@ private
       --  relates to and Token_End is No_Token_Index. Otherwise, both tokens
       --  are inclusive, i.e. they both belong to this node.
 
-      Extensions             : Extension_Vectors.Vector;
-
       Self_Env               : AST_Envs.Lexical_Env;
       --  Hold the environment this node defines, or the parent environment
       --  otherwise.
@@ -1216,7 +1548,7 @@ private
    end record;
 
    procedure Free_Extensions (Node : access ${root_node_value_type}'Class);
-   --  Implementation helper to free the extensions associatde to Node
+   --  Implementation helper to free the extensions associated to Node
 
    ${array_types.private_decl(LexicalEnvType.array_type())}
    ${array_types.private_decl(T.root_node.env_el().array_type())}
@@ -1238,6 +1570,13 @@ private
    --  Internal procedure that will execute all post add to env actions for
    --  Node. This is meant to be called by Populate_Lexical_Env.
 
+   procedure Shift_Token_Fields
+     (Node   : access ${root_node_value_type};
+      Offset : Integer) is null;
+   --  Add Offset to the index of all tokens that Node's token fields
+   --  reference. This is used to move nodes that incremental reparsing reuses
+   --  in the new token stream.
+
    function Is_Visible_From
      (Env, Referenced : AST_Envs.Lexical_Env) return Boolean;
 
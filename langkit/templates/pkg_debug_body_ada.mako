@@ -44,7 +44,7 @@ package body ${ada_lib_name}.Debug is
          begin
             Put (Token_Kind_Name (D.Kind));
             Put (" " & Image (Text (TDH.all, D), With_Quotes => True));
-            Put_Line (" [" & Image (D.Sloc_Range) & "]");
+            Put_Line (" [" & Image (Sloc_Range (TDH.all, D)) & "]");
          end;
       end if;
    end PTok;
@@ -0,0 +1,133 @@
+## vim: filetype=makoada
+
+## Helpers to render the single loop that iterates over a chain of fused
+## collection expressions. See langkit.expressions.collections.Map.Expr for
+## the meaning of "stages".
+
+<%namespace name="scopes" file="scopes_ada.mako" />
+
+## Render the loop that iterates over the source collection of "stages" and
+## that runs them all for each item. The last stage passes each item it yields
+## to "sink", a def that takes the Ada expression for this item. "loop_name" is
+## the name of the loop, so that stages can exit it from nested loops.
+<%def name="render(stages, sink, loop_name)">
+   <%
+      first = stages[0]
+      source = first.collection
+      list_element_var = (first.list_element_var.name
+                          if first.list_element_var else
+                          None)
+      element_var = first.element_var.name
+      iteration_var = list_element_var or element_var
+   %>
+
+   ${source.render_pre()}
+
+   % for stage in stages:
+      % if stage.index_var:
+         ${stage.index_var.name} := 0;
+      % endif
+   % endfor
+
+   ## Empty lists are null: handle this pecularity here to make it easier for
+   ## property writers.
+   % if source.type.is_list_type:
+   if ${source.render_expr()} /= null then
+   % endif
+
+   ${loop_name} : for ${iteration_var} of
+      % if source.type.is_list_type:
+         ${source.render_expr()}.Vec
+      % else:
+         ${source.render_expr()}.Items
+      % endif
+   loop
+      % if list_element_var:
+         ${element_var} :=
+            ${first.element_var.type.name()} (${list_element_var});
+      % endif
+
+      ${stage_body(stages, 0, sink, loop_name)}
+   end loop ${loop_name};
+
+   % if source.type.is_list_type:
+   end if;
+   % endif
+</%def>
+
+## Run the Ith stage on the item that its element variable holds
+<%def name="stage_body(stages, i, sink, loop_name)">
+   <% stage = stages[i] %>
+   % if stage.filter:
+      ${stage.filter.render_pre()}
+      if ${stage.filter.render_expr()} then
+         ${stage_yield(stages, i, sink, loop_name)}
+      end if;
+   % else:
+      ${stage_yield(stages, i, sink, loop_name)}
+   % endif
+
+   % if stage.index_var:
+      ${stage.index_var.name} := ${stage.index_var.name} + 1;
+   % endif
+   ${scopes.finalize_scope(stage.iter_scope)}
+</%def>
+
+## Compute the item(s) that the Ith stage yields and pass them to the next
+## stage.
+<%def name="stage_yield(stages, i, sink, loop_name)">
+   <% stage = stages[i] %>
+   % if stage.take_while:
+      ${stage.take_while.render_pre()}
+      if not (${stage.take_while.render_expr()}) then
+         ${exit_loop(stages, i, loop_name)}
+      end if;
+   % endif
+
+   ${stage.expr.render_pre()}
+   % if stage.concat:
+      <%
+         # Items of AST lists have the root node type: convert them for the
+         # next stage.
+         item = 'Concat_Item'
+         if stage.expr.type.is_list_type and i + 1 < len(stages):
+            item = '{} ({})'.format(stages[i + 1].element_var.type.name(),
+                                    item)
+      %>
+      for Concat_Item of
+         % if stage.expr.type.is_list_type:
+            ${stage.expr.render_expr()}.Vec
+         % else:
+            ${stage.expr.render_expr()}.Items
+         % endif
+      loop
+         ${consume(stages, i + 1, item, sink, loop_name)}
+      end loop;
+   % else:
+      ${consume(stages, i + 1, stage.expr.render_expr(), sink, loop_name)}
+   % endif
+</%def>
+
+## Exit the loop from the Ith stage. This skips the end of this stage and of
+## the enclosing ones, so finalize their scopes first.
+<%def name="exit_loop(stages, i, loop_name)">
+   % for stage in reversed(stages[:i + 1]):
+      ${scopes.finalize_scope(stage.iter_scope)}
+   % endfor
+   exit ${loop_name};
+</%def>
+
+## Pass "item" to the Ith stage, or to the sink if all stages ran
+<%def name="consume(stages, i, item, sink, loop_name)">
+   % if i == len(stages):
+      ${sink(item)}
+   % else:
+      <% stage = stages[i] %>
+      declare
+         ${stage.element_var.name} : constant
+            ${stage.element_var.type.name()} := ${item};
+      begin
+         ${stage_body(stages, i, sink, loop_name)}
+      end;
+   % endif
+</%def>
@@ -41,6 +41,58 @@ is
 
    Property_Result : ${property.type.name()} := ${property.type.nullexpr()};
 
+   % if ctx.instrument_properties:
+      Profile : aliased Property_Profile;
+
+   % endif
+   % if property.memoized:
+      <% deps = 'Self.{}'.format(property.memoization_deps_field_name) %>
+      Dependencies : Dependency_Frame := No_Dependency_Frame;
+   % endif
+
+   % if property.memoization_table:
+      <%
+         uid = property.uid
+         table = 'Self.{}'.format(property.memoization_table_field_name)
+      %>
+      Memo_Key : constant Memo_Key_${uid} :=
+        (${', '.join('{0} => {0}'.format(arg.name)
+                     for arg in property.arguments)});
+
+      procedure Memoize (State : Memoization_State);
+      --  Store State and Property_Result for Memo_Key in Self's memoization
+      --  table. Clear the table first if it is full.
+
+      procedure Memoize (State : Memoization_State) is
+         Position : Memo_Tables_${uid}.Cursor;
+         Inserted : Boolean;
+      begin
+         if ${table} /= null
+            and then Natural (${table}.Length)
+                     >= ${property.memoization_table_size}
+         then
+            Clear (${table});
+         end if;
+         if ${table} = null then
+            ${table} := new Memo_Tables_${uid}.Map;
+         end if;
+
+         ${table}.Insert
+           (Memo_Key,
+            (State => State,
+             Value => (if State = Computed
+                       then Property_Result
+                       else ${property.type.nullexpr()})),
+            Position,
+            Inserted);
+         % if property.type.is_refcounted():
+            if Inserted and then State = Computed then
+               Inc_Ref (Property_Result);
+            end if;
+         % endif
+      end Memoize;
+   % endif
+
    ## For each scope, there is one of the following subprograms that finalizes
    ## all the ref-counted local variables it contains, excluding variables from
    ## children scopes.
@@ -68,7 +120,73 @@ is
    % endfor
 
 begin
+   % if ctx.instrument_properties:
+      Enter_Property (Profile, ${property.profiling_id}, Self);
+
+   % endif
    % if property.memoized:
+      ## Results that depend on analysis units or on lexical environments
+      ## that changed since they were computed are stale: discard them. Look
+      ## at the dependencies only if something changed in the context since
+      ## the last check.
+      if Self.${property.memoization_version_field_name}
+         /= Cache_Epoch (Self.Unit.Context)
+      then
+         if not Is_Up_To_Date (Self.Unit.Context, ${deps}) then
+            % if property.memoization_table:
+               Clear (${table});
+            % else:
+               % if property.type.is_refcounted():
+                  if Self.${property.memoization_state_field_name} = Computed
+                  then
+                     Dec_Ref (Self.${property.memoization_value_field_name});
+                  end if;
+               % endif
+               Self.${property.memoization_state_field_name} := Not_Computed;
+            % endif
+            ${deps}.Clear;
+         end if;
+         Self.${property.memoization_version_field_name} :=
+            Cache_Epoch (Self.Unit.Context);
+      end if;
+   % endif
+
+   % if property.memoization_table:
+      if ${table} /= null then
+         declare
+            Position : constant Memo_Tables_${uid}.Cursor :=
+               ${table}.Find (Memo_Key);
+         begin
+            if Memo_Tables_${uid}.Has_Element (Position) then
+               declare
+                  Memo : constant Memo_Value_${uid} :=
+                     Memo_Tables_${uid}.Element (Position);
+               begin
+                  case Memo.State is
+                     when Not_Computed =>
+                        null;
+                     when Computed =>
+                        % if property.type.is_refcounted():
+                           Inc_Ref (Memo.Value);
+                        % endif
+                        Record_Dependencies (${deps});
+                        % if ctx.instrument_properties:
+                           Profile.Memo_Hit := True;
+                           Leave_Property (Profile);
+                        % endif
+                        return Memo.Value;
+                     when Raise_Property_Error =>
+                        Record_Dependencies (${deps});
+                        % if ctx.instrument_properties:
+                           Profile.Memo_Hit := True;
+                        % endif
+                        raise Property_Error;
+                  end case;
+               end;
+            end if;
+         end;
+      end if;
+   % elif property.memoized:
       case Self.${property.memoization_state_field_name} is
          when Not_Computed =>
             null;
@@ -80,13 +198,37 @@ begin
                % if property.type.is_refcounted():
                   Inc_Ref (Result);
                % endif
+               Record_Dependencies (${deps});
+               % if ctx.instrument_properties:
+                  Profile.Memo_Hit := True;
+                  Leave_Property (Profile);
+               % endif
                return Result;
             end;
          when Raise_Property_Error =>
+            Record_Dependencies (${deps});
+            % if ctx.instrument_properties:
+               Profile.Memo_Hit := True;
+            % endif
             raise Property_Error;
       end case;
    % endif
 
+   % if property.memoized:
+      ## Record what the result is going to depend on: the unit that owns Self
+      ## must come first (see Remove), then the units of node arguments, then
+      ## whatever the evaluation reads.
+      Dependencies := Enter_Dependency_Frame (Self.Unit.Context);
+      Record_Dependency (Self.Unit);
+      % for arg in property.arguments:
+         % if is_ast_node(arg.type):
+            if ${arg.name} /= null then
+               Record_Dependency (${arg.name}.Unit);
+            end if;
+         % endif
+      % endfor
+   % endif
+
    ${property.constructed_expr.render_pre()}
 
    Property_Result := ${property.constructed_expr.render_expr()};
@@ -96,17 +238,25 @@ begin
    ${scopes.finalize_scope(property.vars.root_scope)}
 
    % if property.memoized:
+      Leave_Dependency_Frame (Dependencies, ${deps});
+   % endif
+   % if property.memoization_table:
+      Memoize (Computed);
+   % elif property.memoized:
       Self.${property.memoization_state_field_name} := Computed;
       % if property.type.is_refcounted():
          Inc_Ref (Property_Result);
-         Self.Unit.Set_Filled_Caches;
       % endif
       Self.${property.memoization_value_field_name} := Property_Result;
    % endif
 
+   % if ctx.instrument_properties:
+      Leave_Property (Profile);
+   % endif
    return Property_Result;
 
-% if property.vars.root_scope.has_refcounted_vars(True):
+% if property.vars.root_scope.has_refcounted_vars(True) \
+      or property.memoized or ctx.instrument_properties:
    exception
       when Property_Error =>
          % for scope in all_scopes:
@@ -116,11 +266,30 @@ begin
          % endfor
 
          % if property.memoized:
+            Leave_Dependency_Frame (Dependencies, ${deps});
+         % endif
+         % if property.memoization_table:
+            Memoize (Raise_Property_Error);
+         % elif property.memoized:
             Self.${property.memoization_state_field_name} :=
                Raise_Property_Error;
          % endif
+         % if ctx.instrument_properties:
+            Leave_Property (Profile, Raised_Property_Error => True);
+         % endif
+
+         raise;
 
+      % if property.memoized or ctx.instrument_properties:
+      when others =>
+         % if property.memoized:
+            Leave_Dependency_Frame (Dependencies, ${deps});
+         % endif
+         % if ctx.instrument_properties:
+            Leave_Property (Profile);
+         % endif
          raise;
+      % endif
 % endif
 end ${property.name};
 % endif
@@ -0,0 +1,28 @@
+## vim: filetype=makoada
+
+<%namespace name="loops" file="collection_loop_ada.mako" />
+
+<%
+   result_var = length.result_var.name
+   last_stage = length.stages[-1]
+%>
+
+<%def name="count_item(item)">
+   ## Items that come from concatenated arrays are already computed, but the
+   ## expression for other items must still be evaluated, as it can raise a
+   ## Property_Error.
+   % if not last_stage.concat:
+      declare
+         Ignored : constant ${length.map_expr.type.element_type().name()} :=
+            ${item};
+         pragma Unreferenced (Ignored);
+      begin
+         null;
+      end;
+   % endif
+   ${result_var} := ${result_var} + 1;
+</%def>
+
+${result_var} := 0;
+
+${loops.render(length.stages, count_item, length.loop_name)}
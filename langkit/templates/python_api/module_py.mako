@@ -101,6 +101,11 @@ class _SlocRange(ctypes.Structure):
     def wrap(self):
         return SlocRange(self.start.wrap(), self.end.wrap())
 
+    @classmethod
+    def unwrap(cls, sloc_range):
+        return _SlocRange(_Sloc.unwrap(sloc_range.start),
+                          _Sloc.unwrap(sloc_range.end))
+
 
 class _Diagnostic(ctypes.Structure):
     _fields_ = [("sloc_range", _SlocRange),
@@ -119,6 +124,34 @@ class _Exception(ctypes.Structure):
         return NativeException(self.information)
 
 
+% if ctx.instrument_parsers:
+class _ParserRuleStats(ctypes.Structure):
+    _fields_ = [("calls", ctypes.c_uint64),
+                ("memo_hits", ctypes.c_uint64),
+                ("memo_misses", ctypes.c_uint64),
+                ("failures", ctypes.c_uint64),
+                ("tokens", ctypes.c_uint64)]
+
+    def wrap(self):
+        return ParserRuleStats(self.calls, self.memo_hits, self.memo_misses,
+                               self.failures, self.tokens)
+% endif
+
+
+% if ctx.instrument_properties:
+class _PropertyStats(ctypes.Structure):
+    _fields_ = [("calls", ctypes.c_uint64),
+                ("memo_hits", ctypes.c_uint64),
+                ("property_errors", ctypes.c_uint64),
+                ("total_time", ctypes.c_double),
+                ("self_time", ctypes.c_double)]
+
+    def wrap(self):
+        return PropertyStats(self.calls, self.memo_hits, self.property_errors,
+                             self.total_time, self.self_time)
+% endif
+
+
 % if ctx.default_unit_file_provider:
 ${py_doc('langkit.unit_kind_type')}
 str_to_unit_kind = {
@@ -184,6 +217,7 @@ class AnalysisContext(object):
 % if ctx.default_unit_file_provider:
                  unit_file_provider=None,
 % endif
+                 compact_sources=False,
                  _c_value=None):
         ${py_doc('langkit.create_context', 8)}
 % if ctx.default_unit_file_provider:
@@ -195,6 +229,7 @@ class AnalysisContext(object):
 % if ctx.default_unit_file_provider:
                 c_ufp,
 % endif
+                compact_sources,
             )
             if _c_value is None else
             _context_incref(_c_value)
@@ -232,6 +267,17 @@ class AnalysisContext(object):
                                                  with_trivia)
         return AnalysisUnit(c_value)
 
+    def get_from_files(self, filenames, charset=None, reparse=False,
+                       with_trivia=False, workers=None, chunk_size=1):
+        ${py_doc('langkit.get_units_from_files', 8)}
+        count = len(filenames)
+        c_filenames = (ctypes.c_char_p * count)(*filenames)
+        c_units = (_analysis_unit * count)()
+        _get_analysis_units_from_files(self._c_value, c_filenames, count,
+                                       charset or '', reparse, with_trivia,
+                                       workers or 0, chunk_size, c_units)
+        return [AnalysisUnit(c_value) for c_value in c_units]
+
 % if ctx.default_unit_file_provider:
     def get_from_provider(self, name, kind, charset=None, reparse=False,
                           with_trivia=False):
@@ -254,6 +300,38 @@ class AnalysisContext(object):
         if not _remove_analysis_unit(self._c_value, filename):
             raise KeyError('No such unit: {}'.format(filename))
 
+% if ctx.instrument_parsers:
+    @property
+    def parser_stats(self):
+        ${py_doc('langkit.context_parser_stats', 8)}
+        result = {}
+        for i, rule_name in enumerate(_grammar_rule_names):
+            stats = _ParserRuleStats()
+            _context_parser_rule_stats(self._c_value, i, ctypes.byref(stats))
+            result[rule_name] = stats.wrap()
+        return result
+
+    def reset_parser_stats(self):
+        ${py_doc('langkit.context_reset_parser_stats', 8)}
+        _context_reset_parser_stats(self._c_value)
+% endif
+
+% if ctx.instrument_properties:
+    @property
+    def property_stats(self):
+        ${py_doc('langkit.context_property_stats', 8)}
+        result = {}
+        for i, prop_name in enumerate(_property_names):
+            stats = _PropertyStats()
+            _context_property_stats(self._c_value, i, ctypes.byref(stats))
+            result[prop_name] = stats.wrap()
+        return result
+
+    def reset_property_stats(self):
+        ${py_doc('langkit.context_reset_property_stats', 8)}
+        _context_reset_property_stats(self._c_value)
+% endif
+
 
 class AnalysisUnit(object):
     ${py_doc('langkit.analysis_unit_type', 4)}
@@ -321,9 +399,16 @@ class AnalysisUnit(object):
         ctx = _unit_context(self._c_value)
         return AnalysisContext(_c_value=ctx)
 
-    def reparse(self, buffer=None, charset=None):
+    def reparse(self, buffer=None, charset=None, edit=None):
         ${py_doc('langkit.unit_reparse_generic', 8)}
-        if buffer is None:
+        if edit is not None:
+            if buffer is None:
+                raise TypeError('Incremental reparsing requires a buffer')
+            c_edit = _SlocRange.unwrap(edit)
+            _unit_reparse_incremental(self._c_value, charset or '',
+                                      buffer, len(buffer),
+                                      ctypes.byref(c_edit))
+        elif buffer is None:
             _unit_reparse_from_file(self._c_value, charset or '')
         else:
             _unit_reparse_from_buffer(self._c_value, charset or '',
@@ -599,6 +684,40 @@ class Diagnostic(object):
         return '<Diagnostic {} at {:#x}>'.format(repr(str(self)), id(self))
 
 
+% if ctx.instrument_parsers:
+${py_doc('langkit.parser_rule_stats_type')}
+ParserRuleStats = collections.namedtuple(
+    'ParserRuleStats', 'calls memo_hits memo_misses failures tokens'
+)
+
+# Names of grammar rules, in the order the C API uses to designate them
+_grammar_rule_names = [
+% for name in ctx.user_rule_names:
+    '${name}',
+% endfor
+]
+% endif
+
+
+% if ctx.instrument_properties:
+${py_doc('langkit.property_stats_type')}
+PropertyStats = collections.namedtuple(
+    'PropertyStats', 'calls memo_hits property_errors total_time self_time'
+)
+
+# Names of properties, in the order the C API uses to designate them
+_property_names = [
+% if ctx.instrumented_properties:
+    % for prop in ctx.instrumented_properties:
+    '${prop.qualname}',
+    % endfor
+% else:
+    '',
+% endif
+]
+% endif
+
+
 % if ctx.default_unit_file_provider:
 
 ## TODO: if this is needed some day, also bind create_unit_file_provider to
@@ -940,6 +1059,7 @@ _create_analysis_context = _import_func(
 % if ctx.default_unit_file_provider:
         _unit_file_provider,
 % endif
+        ctypes.c_int,
     ], _analysis_context
 )
 _context_incref = _import_func(
@@ -954,6 +1074,32 @@ _destroy_analysis_context = _import_func(
     '${capi.get_name("destroy_analysis_context")}',
     [_analysis_context, ], None
 )
+% if ctx.instrument_parsers:
+_context_parser_rule_stats = _import_func(
+    '${capi.get_name("context_parser_rule_stats")}',
+    [_analysis_context,
+     ctypes.c_uint,
+     ctypes.POINTER(_ParserRuleStats)],
+    ctypes.c_int
+)
+_context_reset_parser_stats = _import_func(
+    '${capi.get_name("context_reset_parser_stats")}',
+    [_analysis_context], None
+)
+% endif
+% if ctx.instrument_properties:
+_context_property_stats = _import_func(
+    '${capi.get_name("context_property_stats")}',
+    [_analysis_context,
+     ctypes.c_uint,
+     ctypes.POINTER(_PropertyStats)],
+    ctypes.c_int
+)
+_context_reset_property_stats = _import_func(
+    '${capi.get_name("context_reset_property_stats")}',
+    [_analysis_context], None
+)
+% endif
 _get_analysis_unit_from_file = _import_func(
     '${capi.get_name("get_analysis_unit_from_file")}',
     [_analysis_context,  # context
@@ -971,6 +1117,19 @@ _get_analysis_unit_from_buffer = _import_func(
      ctypes.c_size_t],   # buffer_size
     _analysis_unit
 )
+_get_analysis_units_from_files = _import_func(
+    '${capi.get_name("get_analysis_units_from_files")}',
+    [_analysis_context,                # context
+     ctypes.POINTER(ctypes.c_char_p),  # filenames
+     ctypes.c_size_t,                  # count
+     ctypes.c_char_p,                  # charset
+     ctypes.c_int,                     # reparse
+     ctypes.c_int,                     # with_trivia
+     ctypes.c_uint,                    # workers
+     ctypes.c_uint,                    # chunk_size
+     ctypes.POINTER(_analysis_unit)],  # units
+    None
+)
 % if ctx.default_unit_file_provider:
 _get_analysis_unit_from_provider = _import_func(
     '${capi.get_name("get_analysis_unit_from_provider")}',
@@ -1048,6 +1207,15 @@ _unit_reparse_from_buffer = _import_func(
      ctypes.c_size_t],  # buffer_size
     None
 )
+_unit_reparse_incremental = _import_func(
+    '${capi.get_name("unit_reparse_incremental")}',
+    [_analysis_unit,    # context
+     ctypes.c_char_p,   # charset
+     ctypes.c_char_p,   # buffer
+     ctypes.c_size_t,   # buffer_size
+     ctypes.POINTER(_SlocRange)],  # edit
+    None
+)
 _unit_populate_lexical_env = _import_func(
     '${capi.get_name("unit_populate_lexical_env")}',
     [_analysis_unit], ctypes.c_int
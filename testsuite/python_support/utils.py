@@ -82,12 +82,20 @@ def emit_and_print_errors(grammar_fn,
 
 def build_and_run(grammar, py_script,
                   lexer=None,
-                  library_fields_all_public=False):
+                  library_fields_all_public=False,
+                  instrument_parsers=False,
+                  instrument_properties=False):
     """
     Compile and emit code for CTX and build the generated library. Then run
     PY_SCRIPT with this library available.
 
     An exception is raised if any step fails (the script must return code 0).
+
+    :param bool instrument_parsers: Whether to generate parsers that collect
+        statistics about grammar rules.
+
+    :param bool instrument_properties: Whether to generate properties that
+        collect statistics about their evaluation.
     """
 
     if lexer is None:
@@ -110,6 +118,10 @@ def build_and_run(grammar, py_script,
     argv = ['-vnone', 'make']
     if ctx.library_fields_all_public:
         argv.append('--library-fields-all-public')
+    if instrument_parsers:
+        argv.append('--instrument-parsers')
+    if instrument_properties:
+        argv.append('--instrument-properties')
     m.run(argv)
 
     # Then execute a script with it. Note that in order to use the generated
@@ -0,0 +1,75 @@
+from StringIO import StringIO
+
+import libfoolang
+
+
+def make_source(seed):
+    """
+    Return a source buffer whose parse tree depends on `seed`. Identifiers are
+    shared between sources so that workers look up the same symbols.
+    """
+    items = []
+    for i in range(30):
+        expr = 'id_{}'.format((seed + i) % 5) if i % 3 else str(seed + i)
+        for j in range((seed + i) % 4):
+            expr = '({} + {})'.format(expr, j)
+        items.append(expr)
+    return ', '.join(items)
+
+
+def dump(unit):
+    result = StringIO()
+    for d in unit.diagnostics:
+        result.write('{}\n'.format(d))
+    if unit.root:
+        unit.root.dump(file=result)
+    return result.getvalue()
+
+
+filenames = ['src_{}.txt'.format(i) for i in range(12)]
+for i, f in enumerate(filenames):
+    with open(f, 'w') as fp:
+        fp.write(make_source(i))
+
+# Reference results from sequential parsing
+ctx = libfoolang.AnalysisContext()
+expected = [dump(ctx.get_from_file(f)) for f in filenames]
+del ctx
+
+for workers, chunk_size in [(1, 1), (4, 1), (3, 5), (None, 2)]:
+    ctx = libfoolang.AnalysisContext()
+    units = ctx.get_from_files(filenames, workers=workers,
+                               chunk_size=chunk_size)
+    print('workers={}, chunk_size={}: {}'.format(
+        workers, chunk_size,
+        [u.filename for u in units] == filenames
+        and [dump(u) for u in units] == expected
+    ))
+
+    # Reparsing must pick up changes on disk, including in symbols
+    with open(filenames[0], 'w') as fp:
+        fp.write('new_id + 1')
+    units = ctx.get_from_files(filenames[:2], reparse=True, workers=2)
+    units[0].root.dump()
+    with open(filenames[0], 'w') as fp:
+        fp.write(make_source(0))
+
+    # Units must be registered in the context
+    for f in filenames:
+        ctx.remove(f)
+
+# Files that appear several times are parsed once, even when reparsing
+ctx = libfoolang.AnalysisContext()
+for reparse in (False, True):
+    units = ctx.get_from_files(filenames[:3] * 2, reparse=reparse, workers=4)
+    print('Duplicates (reparse={}): {}'.format(
+        reparse,
+        [u.filename for u in units] == filenames[:3] * 2
+        and [dump(u) for u in units] == expected[:3] * 2
+    ))
+
+# Errors are reported as diagnostics
+ctx = libfoolang.AnalysisContext()
+u, = ctx.get_from_files(['no_such_file.txt'])
+print('Missing file: {} diagnostic(s), root={}'.format(len(u.diagnostics),
+                                                       u.root))
@@ -0,0 +1,48 @@
+"""
+Test that AnalysisContext.get_from_files parses files on several workers and
+that it gives the same results as sequential parsing.
+"""
+
+import os.path
+
+from langkit.compiled_types import ASTNode, Field, root_grammar_class
+from langkit.diagnostics import Diagnostics
+from langkit.parsers import Grammar, List, Or, Row, Tok
+
+from lexer_example import Token
+from utils import build_and_run
+
+
+Diagnostics.set_lang_source_dir(os.path.abspath(__file__))
+
+
+@root_grammar_class()
+class FooNode(ASTNode):
+    pass
+
+
+class Literal(FooNode):
+    tok = Field()
+
+
+class Ref(FooNode):
+    name = Field()
+
+
+class Plus(FooNode):
+    left = Field()
+    right = Field()
+
+
+foo_grammar = Grammar('main_rule')
+A = foo_grammar
+foo_grammar.add_rules(
+    main_rule=List(A.expr, sep=','),
+    expr=Or(Row(A.atom, '+', A.expr) ^ Plus,
+            A.atom),
+    atom=Or(Row(Tok(Token.Number, keep=True)) ^ Literal,
+            Row(Tok(Token.Identifier, keep=True)) ^ Ref,
+            Row('(', A.expr, ')')[1]),
+)
+build_and_run(foo_grammar, 'main.py')
+print 'Done'
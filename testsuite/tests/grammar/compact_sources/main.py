@@ -0,0 +1,50 @@
+from StringIO import StringIO
+
+import libfoolang
+
+
+def sloc_range(start_line, start_col, end_line, end_col):
+    return libfoolang.SlocRange(libfoolang.Sloc(start_line, start_col),
+                                libfoolang.Sloc(end_line, end_col))
+
+
+def summary(unit):
+    result = StringIO()
+    for d in unit.diagnostics:
+        result.write('{}\n'.format(d))
+    for t in unit.iter_tokens():
+        result.write('{} {} {}\n'.format(t.kind, repr(t.text), t.sloc_range))
+    if unit.root:
+        unit.root.dump(file=result)
+    return result.getvalue()
+
+
+compact_ctx = libfoolang.AnalysisContext(compact_sources=True)
+regular_ctx = libfoolang.AnalysisContext()
+
+
+def check(label, buffer):
+    units = [ctx.get_from_buffer('main.txt', buffer)
+             for ctx in (compact_ctx, regular_ctx)]
+    print('{}: {}'.format(label, summary(units[0]) == summary(units[1])))
+
+
+check('Simple', 'a, 1, b')
+check('Lines', 'a,\n  b,\n\tc')
+check('Errors', 'a, , b')
+check('Empty', '')
+
+# Incremental reparsing replaces the compact source buffer. The first
+# incremental reparse is a full one: the second one lexes again only a part of
+# the source.
+u = compact_ctx.get_from_buffer('main.txt', 'a, b, c')
+u.reparse('a, bb, c', edit=sloc_range(1, 4, 1, 5))
+u.reparse('a, bbb, c', edit=sloc_range(1, 4, 1, 6))
+ref = regular_ctx.get_from_buffer('main.txt', 'a, bbb, c')
+print('Incremental: {}'.format(summary(u) == summary(ref)))
+
+u = compact_ctx.get_from_buffer('main.txt', 'a, 22, c')
+for t in u.iter_tokens():
+    if t.kind != 'Termination':
+        print('{} {} {}'.format(t.kind, repr(t.text), t.sloc_range))
+u.root.dump()
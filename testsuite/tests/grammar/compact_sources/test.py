@@ -0,0 +1,40 @@
+"""
+Test that analysis contexts that store sources in compact form give the same
+tokens and trees as regular ones, including after incremental reparsing.
+"""
+
+import os.path
+
+from langkit.compiled_types import ASTNode, Field, root_grammar_class
+from langkit.diagnostics import Diagnostics
+from langkit.parsers import Grammar, List, Or, Row, Tok
+
+from lexer_example import Token
+from utils import build_and_run
+
+
+Diagnostics.set_lang_source_dir(os.path.abspath(__file__))
+
+
+@root_grammar_class()
+class FooNode(ASTNode):
+    pass
+
+
+class Literal(FooNode):
+    tok = Field()
+
+
+class Name(FooNode):
+    tok = Field()
+
+
+foo_grammar = Grammar('main_rule')
+A = foo_grammar
+foo_grammar.add_rules(
+    main_rule=List(A.atom, sep=','),
+    atom=Or(Row(Tok(Token.Number, keep=True)) ^ Literal,
+            Row(Tok(Token.Identifier, keep=True)) ^ Name),
+)
+build_and_run(foo_grammar, 'main.py')
+print 'Done'
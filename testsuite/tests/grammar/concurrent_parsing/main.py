@@ -0,0 +1,62 @@
+from StringIO import StringIO
+import threading
+
+import libfoolang
+
+
+def make_source(seed):
+    """
+    Return a source buffer whose parse tree depends on `seed`.
+    """
+    items = []
+    for i in range(50):
+        expr = str(seed + i)
+        for j in range((seed + i) % 7):
+            expr = '({} + {})'.format(expr, j) if j % 2 else '{} + {}'.format(
+                j, expr
+            )
+        items.append(expr)
+    return ', '.join(items)
+
+
+def parse(ctx, seed):
+    """
+    Parse the source for `seed` in `ctx` and return a dump of the result.
+    """
+    u = ctx.get_from_buffer('main.txt', make_source(seed))
+    result = StringIO()
+    for d in u.diagnostics:
+        result.write('{}\n'.format(d))
+    u.root.dump(file=result)
+    return result.getvalue()
+
+
+seeds = range(8)
+
+# First compute expected results sequentially
+ctx = libfoolang.AnalysisContext()
+expected = {seed: parse(ctx, seed) for seed in seeds}
+del ctx
+
+# Then parse the same sources from several threads at the same time. Each
+# thread has its own analysis context, as contexts themselves are not
+# thread-safe.
+errors = []
+
+
+def worker(seed):
+    ctx = libfoolang.AnalysisContext()
+    for _ in range(20):
+        result = parse(ctx, seed)
+        if result != expected[seed]:
+            errors.append(seed)
+            return
+
+
+threads = [threading.Thread(target=worker, args=(seed, )) for seed in seeds]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+
+print('Errors: {}'.format(sorted(set(errors))))
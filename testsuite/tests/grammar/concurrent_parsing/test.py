@@ -0,0 +1,48 @@
+"""
+Test that several analysis units can be parsed at the same time from different
+threads. Memoization tables used to be global, so this used to corrupt
+results. Also exercise non-default memoization table settings.
+"""
+
+import os.path
+
+from langkit.compiled_types import ASTNode, Field, root_grammar_class
+from langkit.diagnostics import Diagnostics
+from langkit.parsers import Grammar, List, Or, Row, Tok
+
+from lexer_example import Token
+from utils import build_and_run
+
+
+Diagnostics.set_lang_source_dir(os.path.abspath(__file__))
+
+
+@root_grammar_class()
+class FooNode(ASTNode):
+    pass
+
+
+class Literal(FooNode):
+    tok = Field()
+
+
+class Plus(FooNode):
+    left = Field()
+    right = Field()
+
+
+foo_grammar = Grammar('main_rule')
+A = foo_grammar
+foo_grammar.add_rules(
+    main_rule=List(A.expr, sep=','),
+
+    # Both alternatives start with the same rule, so its memoization table is
+    # heavily used.
+    expr=Or(Row(A.atom, '+', A.expr) ^ Plus,
+            A.atom).memoize(size=32, ways=4),
+
+    atom=Or(Row(Tok(Token.Number, keep=True)) ^ Literal,
+            Row('(', A.expr, ')')[1]).memoize(full=True),
+)
+build_and_run(foo_grammar, 'main.py')
+print 'Done'
@@ -0,0 +1,45 @@
+import libfoolang
+
+
+def sloc_range(start_line, start_col, end_line, end_col):
+    return libfoolang.SlocRange(libfoolang.Sloc(start_line, start_col),
+                                libfoolang.Sloc(end_line, end_col))
+
+
+def tokens(unit):
+    return [(t.kind, t.text, str(t.sloc_range)) for t in unit.iter_tokens()]
+
+
+def reparse(unit, buffer, edit):
+    print('== {} =='.format(repr(buffer)))
+    unit.reparse(buffer, edit=edit)
+    for d in unit.diagnostics:
+        print('  {}'.format(d))
+
+    # Compare with the result of a full lexing
+    ref = libfoolang.AnalysisContext().get_from_buffer('main.txt', buffer)
+    print('  Same tokens as full lexing: {}'.format(
+        tokens(unit) == tokens(ref)))
+
+
+ctx = libfoolang.AnalysisContext()
+u = ctx.get_from_buffer('main.txt', 'a, b,\nc, d,\n  e')
+
+# The first incremental reparse lexes everything
+reparse(u, 'a, bb,\nc, d,\n  e', sloc_range(1, 4, 1, 5))
+
+# Change the length of a line
+reparse(u, 'a, bb,\nxyz, d,\n  e', sloc_range(2, 1, 2, 2))
+
+# Insert a line
+reparse(u, 'a, bb,\n\nxyz, d,\n  e', sloc_range(1, 7, 1, 7))
+
+# Remove lines
+reparse(u, 'a, bb,xyz, d,\n  e', sloc_range(1, 7, 3, 1))
+
+# Edit the end of the source
+reparse(u, 'a, bb,xyz, d,\nf', sloc_range(2, 1, 2, 4))
+
+for kind, text, sloc in tokens(u):
+    if kind != 'Termination':
+        print('  {} {}'.format(text, sloc))
@@ -0,0 +1,45 @@
+import libfoolang
+
+
+def sloc_range(start_col, end_col):
+    return libfoolang.SlocRange(libfoolang.Sloc(1, start_col),
+                                libfoolang.Sloc(1, end_col))
+
+
+def dump(unit):
+    for d in unit.diagnostics:
+        print('  {}'.format(d))
+    if unit.root:
+        for i, node in enumerate(unit.root):
+            print('  {}: {} {}'.format(i, node.text, node.sloc_range))
+
+
+def reparse(unit, buffer, start_col, end_col):
+    old_nodes = list(unit.root) if unit.root else []
+    print('== {} =='.format(buffer))
+    unit.reparse(buffer, edit=sloc_range(start_col, end_col))
+    dump(unit)
+    if unit.root:
+        print('  Reused: {}'.format(
+            [i for i, node in enumerate(unit.root)
+             if any(node is n for n in old_nodes)]
+        ))
+
+
+ctx = libfoolang.AnalysisContext()
+u = ctx.get_from_buffer('main.txt', 'a, b, c')
+print('== a, b, c ==')
+dump(u)
+
+# The first incremental reparse parses from scratch
+reparse(u, 'a, 1, c', 4, 5)
+
+# Replace one token: nodes before and after it are reused
+reparse(u, 'a, 22, c', 4, 5)
+
+# Insert tokens: nodes after the edit are reused and moved
+reparse(u, 'a, 22, x, c', 6, 6)
+
+# Parsing errors yield the same diagnostics as a regular reparse
+reparse(u, 'a, 22, , c', 8, 9)
+reparse(u, 'a, 22, y, c', 8, 8)
@@ -0,0 +1,59 @@
+import libfoolang
+
+
+def sloc_range(start_col, end_col):
+    return libfoolang.SlocRange(libfoolang.Sloc(1, start_col),
+                                libfoolang.Sloc(1, end_col))
+
+
+def nodes(node):
+    result = [node]
+    for i in range(len(node)):
+        if node[i] is not None:
+            result.extend(nodes(node[i]))
+    return result
+
+
+def dump(node, indent=0):
+    # Do not print list nodes, only their items
+    if not node.is_list_type:
+        print('  {}{} "{}"'.format('  ' * indent, node.kind_name, node.text))
+        indent += 1
+
+    for i in range(len(node)):
+        child = node[i]
+        if child is None:
+            continue
+        if child.parent is not node:
+            print('  {}Wrong parent for {}'.format('  ' * indent,
+                                                   child.kind_name))
+        dump(child, indent)
+
+
+def reparse(unit, buffer, start_col, end_col):
+    old_nodes = nodes(unit.root)
+    print('== {} =='.format(buffer))
+    unit.reparse(buffer, edit=sloc_range(start_col, end_col))
+    for d in unit.diagnostics:
+        print('  {}'.format(d))
+    dump(unit.root)
+    reused = ['"{}"'.format(node.text) for node in nodes(unit.root)
+              if any(node is n for n in old_nodes)]
+    print('  Reused: {}'.format(', '.join(reused) if reused else '<none>'))
+
+
+ctx = libfoolang.AnalysisContext()
+u = ctx.get_from_buffer('main.txt', 'b, (a)')
+print('== b, (a) ==')
+dump(u.root)
+
+# The first incremental reparse parses from scratch. It creates a Paren node
+# for "(a)" and then discards it.
+reparse(u, 'c, (a)', 1, 2)
+
+# The discarded Paren node must not be reused here: its child belongs to the
+# Group node that this reparse replaces.
+reparse(u, 'example (a)', 1, 3)
+
+# Reuse the nodes that the previous reparse adopted
+reparse(u, 'b, example (a)', 1, 1)
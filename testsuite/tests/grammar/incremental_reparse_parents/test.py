@@ -0,0 +1,67 @@
+"""
+Test that nodes that incremental reparsing reuses get the right parents, even
+when the previous parsing created nodes that it then discarded, and even after
+several incremental reparsings.
+"""
+
+import os.path
+
+from langkit.compiled_types import ASTNode, Field, root_grammar_class
+from langkit.diagnostics import Diagnostics
+from langkit.parsers import Grammar, List, Or, Row, Tok
+
+from lexer_example import Token
+from utils import build_and_run
+
+
+Diagnostics.set_lang_source_dir(os.path.abspath(__file__))
+
+
+@root_grammar_class()
+class FooNode(ASTNode):
+    pass
+
+
+class Literal(FooNode):
+    tok = Field()
+
+
+class Name(FooNode):
+    tok = Field()
+
+
+class Paren(FooNode):
+    expr = Field()
+
+
+class Group(FooNode):
+    expr = Field()
+
+
+class Plus(FooNode):
+    left = Field()
+    right = Field()
+
+
+class ExampleStmt(FooNode):
+    expr = Field()
+
+
+foo_grammar = Grammar('main_rule')
+A = foo_grammar
+foo_grammar.add_rules(
+    main_rule=List(A.item, sep=','),
+
+    # When "paren" is not followed by "+", the Paren node it creates is
+    # discarded and its child is adopted by a Group node instead.
+    item=Or(Row(A.paren, '+', A.atom) ^ Plus,
+            Row('(', A.atom, ')') ^ Group,
+            Row('example', A.paren) ^ ExampleStmt,
+            A.atom),
+    paren=Row('(', A.atom, ')') ^ Paren,
+
+    atom=Or(Row(Tok(Token.Number, keep=True)) ^ Literal,
+            Row(Tok(Token.Identifier, keep=True)) ^ Name),
+)
+build_and_run(foo_grammar, 'main.py')
+print 'Done'
@@ -0,0 +1,23 @@
+import libfoolang
+
+
+def dump(node, indent=0):
+    print('{}{} "{}"'.format('  ' * indent, node.kind_name, node.text))
+    if isinstance(node, libfoolang.Plus):
+        children = [node.f_left, node.f_right]
+    elif isinstance(node, libfoolang.Call):
+        children = [node.f_callee, node.f_arg]
+    else:
+        children = []
+    for child in children:
+        dump(child, indent + 1)
+
+
+ctx = libfoolang.AnalysisContext()
+for src in ('1 + f(2)(3) + x', 'g'):
+    print('== {} =='.format(src))
+    u = ctx.get_from_buffer('main.txt', src)
+    for d in u.diagnostics:
+        print(d)
+    if not u.diagnostics:
+        dump(u.root)
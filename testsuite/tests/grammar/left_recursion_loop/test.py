@@ -0,0 +1,57 @@
+"""
+Test that left-recursive rules that are parsed with a loop instead of
+seed-growing yield the expected trees.
+"""
+
+import os.path
+
+from langkit.compiled_types import ASTNode, Field, root_grammar_class
+from langkit.diagnostics import Diagnostics
+from langkit.parsers import Grammar, Or, Row, Tok
+
+from lexer_example import Token
+from utils import build_and_run
+
+
+Diagnostics.set_lang_source_dir(os.path.abspath(__file__))
+
+
+@root_grammar_class()
+class FooNode(ASTNode):
+    pass
+
+
+class Literal(FooNode):
+    tok = Field()
+
+
+class Name(FooNode):
+    tok = Field()
+
+
+class Plus(FooNode):
+    left = Field()
+    right = Field()
+
+
+class Call(FooNode):
+    callee = Field()
+    arg = Field()
+
+
+foo_grammar = Grammar('main_rule')
+A = foo_grammar
+foo_grammar.add_rules(
+    main_rule=Or(Row(A.main_rule, '+', A.call) ^ Plus,
+                 A.call),
+
+    call=Or(Row(A.call, '(', A.atom, ')') ^ Call,
+            A.atom),
+
+    atom=Or(Row(Tok(Token.Number, keep=True)) ^ Literal,
+            Row(Tok(Token.Identifier, keep=True)) ^ Name),
+)
+for name in ('main_rule', 'call'):
+    assert foo_grammar.rules[name].left_recursion_loop() is not None, name
+build_and_run(foo_grammar, 'main.py')
+print 'Done'
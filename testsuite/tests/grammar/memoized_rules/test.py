@@ -0,0 +1,57 @@
+"""
+Test that only grammar rules that can be tried several times at the same token
+index get a memoization table.
+"""
+
+from langkit.compiled_types import ASTNode, Field, root_grammar_class
+from langkit.diagnostics import Diagnostics
+from langkit.parsers import Grammar, List, Or, Row, Tok
+
+from os import path
+
+from lexer_example import Token
+from utils import emit_and_print_errors
+
+Diagnostics.set_lang_source_dir(path.abspath(__file__))
+
+
+foo_grammar = Grammar('main_rule')
+
+
+def lang_def():
+    @root_grammar_class()
+    class FooNode(ASTNode):
+        pass
+
+    class Example(FooNode):
+        items = Field()
+        expr = Field()
+
+    class Literal(FooNode):
+        tok = Field()
+
+    class Plus(FooNode):
+        left = Field()
+        right = Field()
+
+    A = foo_grammar
+    foo_grammar.add_rules(
+        # Neither main_rule nor items are referenced under a parser that
+        # backtracks, so they don't need memoization.
+        main_rule=Row('example', A.items, A.expr) ^ Example,
+        items=List(A.literal, empty_valid=True),
+
+        # expr is left-recursive but is parsed with a loop, so its leading
+        # self-reference is not a call and it does not need memoization.
+        # literal is referenced under a List and an Or, so it does.
+        expr=Or(Row(A.expr, '+', A.literal) ^ Plus,
+                A.literal),
+        literal=Row(Tok(Token.Number, keep=True)) ^ Literal,
+    )
+    return foo_grammar
+
+
+emit_and_print_errors(lang_def)
+for name in sorted(foo_grammar.rules):
+    print '{}: {}'.format(name, foo_grammar.rules[name].is_memoized)
+print 'Done'
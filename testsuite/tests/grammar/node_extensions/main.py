@@ -0,0 +1,44 @@
+import sys
+
+import libfoolang
+
+
+def sloc_range(start_col, end_col):
+    return libfoolang.SlocRange(libfoolang.Sloc(1, start_col),
+                                libfoolang.Sloc(1, end_col))
+
+
+def reparse(unit, buffer, edit=None):
+    # Creating wrappers attaches an extension to the corresponding nodes.
+    # This extension holds a reference to the wrapper, which destroying the
+    # node releases.
+    old_nodes = list(unit.root)
+    refcounts = [sys.getrefcount(n) for n in old_nodes]
+
+    print('== {} =='.format(buffer))
+    unit.reparse(buffer, edit=edit)
+    for d in unit.diagnostics:
+        print('  {}'.format(d))
+    print('  {}'.format(' '.join('{}:{}'.format(n.kind_name, n.text)
+                                 for n in unit.root)))
+    print('  Released: {}'.format(
+        [sys.getrefcount(n) < r for n, r in zip(old_nodes, refcounts)]
+    ))
+    print('  Reused: {}'.format(
+        [i for i, node in enumerate(unit.root)
+         if any(node is n for n in old_nodes)]
+    ))
+
+
+ctx = libfoolang.AnalysisContext()
+u = ctx.get_from_buffer('main.txt', 'a, 1, b')
+
+# Regular reparsing destroys all nodes
+reparse(u, '1, c, 2, d')
+reparse(u, 'e, 3')
+
+# Incremental reparsing destroys only the nodes that it does not reuse. The
+# first one parses from scratch.
+reparse(u, 'e, 3, f', sloc_range(5, 5))
+reparse(u, 'x, 3, f', sloc_range(1, 2))
+reparse(u, 'x, 3, g', sloc_range(7, 8))
@@ -0,0 +1,26 @@
+import libfoolang
+
+
+def dump(node, indent=0):
+    # Do not print list nodes, only their items
+    if node.is_list_type:
+        for child in node:
+            dump(child, indent)
+        return
+
+    print('{}{} "{}"'.format('  ' * indent, node.kind_name, node.text))
+    for _, child in node.iter_fields():
+        if isinstance(child, libfoolang.FooNode):
+            dump(child, indent + 1)
+
+
+ctx = libfoolang.AnalysisContext()
+# Skipping alternatives must not change the diagnostics for invalid sources
+for src in ('example 1 null { a (b + 2) } c', 'example }', '{ a + }'):
+    print('== {} =='.format(src))
+    u = ctx.get_from_buffer('main.txt', src)
+    if u.diagnostics:
+        for d in u.diagnostics:
+            print(d)
+    else:
+        dump(u.root)
@@ -0,0 +1,83 @@
+"""
+Test the computation of FIRST sets for grammar rules and of the token kinds
+that let Or parsers skip alternatives, and check that the generated parsers
+still parse correctly.
+"""
+
+from langkit.compiled_types import ASTNode, Field, root_grammar_class
+from langkit.diagnostics import Diagnostics
+from langkit.parsers import Grammar, List, Or, Row, Tok
+
+from os import path
+
+from lexer_example import Token
+from utils import build_and_run, emit_and_print_errors
+
+Diagnostics.set_lang_source_dir(path.abspath(__file__))
+
+
+foo_grammar = None
+
+
+def lang_def():
+    global foo_grammar
+    foo_grammar = Grammar('main_rule')
+
+    @root_grammar_class()
+    class FooNode(ASTNode):
+        pass
+
+    class ExampleStmt(FooNode):
+        expr = Field()
+
+    class NullStmt(FooNode):
+        pass
+
+    class Block(FooNode):
+        stmts = Field()
+
+    class Literal(FooNode):
+        tok = Field()
+
+    class Name(FooNode):
+        tok = Field()
+
+    class Plus(FooNode):
+        left = Field()
+        right = Field()
+
+    A = foo_grammar
+    foo_grammar.add_rules(
+        main_rule=List(A.stmt),
+
+        # All alternatives start with different tokens
+        stmt=Or(Row('example', A.expr) ^ ExampleStmt,
+                Row('null') ^ NullStmt,
+                Row('{', List(A.stmt, empty_valid=True), '}') ^ Block,
+                A.expr),
+
+        # Both alternatives start with the same tokens: there is nothing to
+        # skip.
+        expr=Or(Row(A.atom, '+', A.expr) ^ Plus,
+                A.atom),
+
+        atom=Or(Row(Tok(Token.Number, keep=True)) ^ Literal,
+                Row(Tok(Token.Identifier, keep=True)) ^ Name,
+                Row('(', A.expr, ')')[1]),
+    )
+    return foo_grammar
+
+
+emit_and_print_errors(lang_def)
+for name in sorted(foo_grammar.rules):
+    rule = foo_grammar.rules[name]
+    print '{}:'.format(name)
+    print '  first set: {}'.format(', '.join(sorted(rule.first_set())))
+    if isinstance(rule, Or):
+        for i, kinds in rule.dispatch_table():
+            print '  {} -> alternative {}'.format(', '.join(kinds), i)
+
+# emit_and_print_errors has reset Langkit's global state: define node types
+# again to build the library.
+build_and_run(lang_def(), 'main.py')
+print 'Done'
@@ -0,0 +1,23 @@
+import libfoolang
+
+
+def dump_stats(ctx):
+    stats = ctx.parser_stats
+    for rule_name in sorted(stats):
+        s = stats[rule_name]
+        print('{}: calls={} memo_hits={} memo_misses={} failures={}'
+              ' tokens={}'.format(rule_name, s.calls, s.memo_hits,
+                                  s.memo_misses, s.failures, s.tokens))
+
+
+ctx = libfoolang.AnalysisContext()
+u = ctx.get_from_buffer('main.txt', '1 + 2')
+for d in u.diagnostics:
+    print(d)
+
+print('== After parsing ==')
+dump_stats(ctx)
+
+print('== After reset ==')
+ctx.reset_parser_stats()
+dump_stats(ctx)
@@ -0,0 +1,24 @@
+import libfoolang
+
+
+def lookup(unit, slocs):
+    for d in unit.diagnostics:
+        print(d)
+    for line, column in slocs:
+        node = unit.root.lookup(libfoolang.Sloc(line, column))
+        print('{}:{} -> {}'.format(
+            line, column, node.sloc_range if node is not None else None
+        ))
+
+
+ctx = libfoolang.AnalysisContext()
+lookup(ctx.get_from_buffer('main.txt', 'a (1) b c (2)\nd (3)'),
+       [(1, 1), (1, 4), (1, 6), (1, 7), (1, 12), (1, 13), (2, 1), (2, 4),
+        (3, 1)])
+
+# Look up slocs on both sides of absent children that are between present
+# ones.
+print('')
+lookup(ctx.get_from_buffer('block.txt', '{1 2}\n{3 (4) 5}'),
+       [(1, 2), (1, 3), (1, 4), (1, 5),
+        (2, 2), (2, 3), (2, 5), (2, 7), (2, 8), (2, 9)])
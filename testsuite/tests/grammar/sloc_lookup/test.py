@@ -0,0 +1,56 @@
+"""
+Test that looking up nodes from source locations returns the bottom-most node
+that contains them, including when some children are absent, even between
+present ones.
+"""
+
+import os.path
+
+from langkit.compiled_types import ASTNode, Field, root_grammar_class
+from langkit.diagnostics import Diagnostics
+from langkit.parsers import Grammar, List, Opt, Or, Row, Tok
+
+from lexer_example import Token
+from utils import build_and_run
+
+
+Diagnostics.set_lang_source_dir(os.path.abspath(__file__))
+
+
+@root_grammar_class()
+class FooNode(ASTNode):
+    pass
+
+
+class Decl(FooNode):
+    name = Field()
+    value = Field()
+
+
+class Block(FooNode):
+    first = Field()
+    second = Field()
+    third = Field()
+    last = Field()
+
+
+class Literal(FooNode):
+    tok = Field()
+
+
+foo_grammar = Grammar('main_rule')
+A = foo_grammar
+foo_grammar.add_rules(
+    main_rule=List(Or(A.decl, A.block)),
+    decl=Row(Tok(Token.Identifier, keep=True),
+             Opt(Row('(', A.literal, ')')[1])) ^ Decl,
+    block=Row('{',
+              A.literal,
+              Opt(Row('(', A.literal, ')')[1]),
+              Opt(Row('+', A.literal)[1]),
+              A.literal,
+              '}') ^ Block,
+    literal=Row(Tok(Token.Number, keep=True)) ^ Literal,
+)
+build_and_run(foo_grammar, 'main.py')
+print 'Done'
@@ -0,0 +1,94 @@
+with Ada.Text_IO; use Ada.Text_IO;
+
+with System;
+with System.Storage_Elements; use System.Storage_Elements;
+
+with Langkit_Support.Bump_Ptr; use Langkit_Support.Bump_Ptr;
+
+procedure Main is
+
+   procedure Alloc (Pool : Bump_Ptr_Pool; Size : Storage_Offset);
+   --  Allocate Size bytes from Pool
+
+   procedure Put (Label : String; Pool : Bump_Ptr_Pool);
+   --  Print statistics for Pool
+
+   procedure Put (Label : String; Cache : Page_Cache);
+   --  Print statistics for Cache
+
+   -----------
+   -- Alloc --
+   -----------
+
+   procedure Alloc (Pool : Bump_Ptr_Pool; Size : Storage_Offset) is
+      Addr : constant System.Address := Allocate (Pool, Size);
+      pragma Unreferenced (Addr);
+   begin
+      null;
+   end Alloc;
+
+   ---------
+   -- Put --
+   ---------
+
+   procedure Put (Label : String; Pool : Bump_Ptr_Pool) is
+      S : constant Pool_Statistics := Statistics (Pool);
+   begin
+      Put_Line (Label & ":");
+      Put_Line ("  Pages:        " & Natural'Image (S.Pages));
+      Put_Line ("  Large objects:" & Natural'Image (S.Large_Objects));
+      Put_Line ("  Bytes used:   " & Storage_Count'Image (S.Bytes_Used));
+      Put_Line ("  Bytes wasted: " & Storage_Count'Image (S.Bytes_Wasted));
+   end Put;
+
+   ---------
+   -- Put --
+   ---------
+
+   procedure Put (Label : String; Cache : Page_Cache) is
+      S : constant Page_Cache_Statistics := Statistics (Cache);
+   begin
+      Put_Line (Label & ":");
+      Put_Line ("  Cached pages:   " & Natural'Image (S.Cached_Pages));
+      Put_Line ("  Recycled pages: "
+                & Long_Long_Integer'Image (S.Recycled_Pages));
+      Put_Line ("  Allocated pages:"
+                & Long_Long_Integer'Image (S.Allocated_Pages));
+   end Put;
+
+   Cache : Page_Cache := Create_Page_Cache;
+   Pool  : Bump_Ptr_Pool := Create (Cache);
+begin
+   --  Each allocation needs a new page, and the last one is a large object
+
+   Alloc (Pool, 10_000);
+   Alloc (Pool, 10_000);
+   Alloc (Pool, 10_000);
+   Alloc (Pool, 20_000);
+   Put ("First pool", Pool);
+   Free (Pool);
+   Put ("Cache after the first pool", Cache);
+
+   --  The second pool must reuse the pages of the first one
+
+   Pool := Create (Cache);
+   for I in 1 .. 4 loop
+      Alloc (Pool, 10_000);
+   end loop;
+   Put ("Second pool", Pool);
+   Put ("Cache during the second pool", Cache);
+
+   --  Releasing the cache while a pool still uses it must be safe
+
+   Release (Cache);
+   Put_Line ("Cache released: " & Boolean'Image (Cache = No_Page_Cache));
+   Free (Pool);
+
+   --  Pools without cache still work
+
+   Pool := Create;
+   Alloc (Pool, 100);
+   Put ("Pool without cache", Pool);
+   Free (Pool);
+   Put_Line ("Done");
+end Main;
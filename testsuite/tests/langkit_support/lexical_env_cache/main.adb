@@ -0,0 +1,105 @@
+with Ada.Text_IO; use Ada.Text_IO;
+
+with Langkit_Support.Lexical_Env;
+with Langkit_Support.Symbols; use Langkit_Support.Symbols;
+
+procedure Main is
+
+   function Combine (L, R : Boolean) return Boolean is (L or else R);
+   function Can_Reach (El, From : Character) return Boolean is (El <= From);
+
+   package Envs is new Langkit_Support.Lexical_Env
+     (Element_T        => Character,
+      Element_Metadata => Boolean,
+      No_Element       => ' ',
+      Empty_Metadata   => False,
+      Combine          => Combine,
+      Getter_State_T   => Boolean);
+   use Envs;
+
+   procedure Put_Lookup
+     (Label     : String;
+      Env       : Lexical_Env;
+      Key       : Symbol_Type;
+      From      : Character := ' ';
+      Recursive : Boolean := True);
+   --  Print the result of a lookup in Env along with the cache statistics
+
+   ST  : Symbol_Table := Create;
+   Foo : constant Symbol_Type := Find (ST, "foo");
+
+   function Key (I : Positive) return Symbol_Type is
+     (Find (ST, "key" & Integer'Wide_Wide_Image (I)));
+
+   ----------------
+   -- Put_Lookup --
+   ----------------
+
+   procedure Put_Lookup
+     (Label     : String;
+      Env       : Lexical_Env;
+      Key       : Symbol_Type;
+      From      : Character := ' ';
+      Recursive : Boolean := True)
+   is
+      Result : constant Element_Array := Get (Env, Key, From, Recursive);
+      Img    : String (1 .. Result'Length);
+      Stats  : Lookup_Cache_Statistics;
+   begin
+      for I in Result'Range loop
+         Img (I - Result'First + 1) := Result (I);
+      end loop;
+      Stats := Lookup_Cache_Stats;
+      Put_Line (Label & ": """ & Img & """ (hits:"
+                & Long_Long_Integer'Image (Stats.Hits) & ", misses:"
+                & Long_Long_Integer'Image (Stats.Misses)
+                & ", invalidations:"
+                & Long_Long_Integer'Image (Stats.Invalidations) & ")");
+   end Put_Lookup;
+
+   Parent : Lexical_Env := Create (No_Env_Getter, ' ', False);
+   Child  : Lexical_Env := Create (Simple_Env_Getter (Parent), ' ', False);
+begin
+   --  The lookup cache is disabled by default
+
+   Set_Lookup_Cache (True);
+
+   Add (Parent, Foo, 'a');
+   Put_Lookup ("First lookup", Child, Foo);
+   Put_Lookup ("Same lookup", Child, Foo);
+
+   Add (Child, Foo, 'b');
+   Put_Lookup ("After Add", Child, Foo);
+   Put_Lookup ("Non-recursive", Child, Foo, Recursive => False);
+   Put_Lookup ("Same lookup", Child, Foo);
+   Put_Lookup ("With origin", Child, Foo, From => 'a');
+
+   Remove (Parent, Foo, 'a');
+   Put_Lookup ("After Remove", Child, Foo);
+
+   Set_Lookup_Cache (False);
+   Put_Lookup ("Cache disabled", Child, Foo);
+   Set_Lookup_Cache (True);
+
+   Reset_Lookup_Cache_Stats;
+   Put_Lookup ("Cache enabled", Child, Foo);
+
+   --  Caching the results for too many keys empties the cache
+
+   Reset_Lookup_Cache_Stats;
+   for I in 1 .. Max_Lookup_Cache_Keys + 1 loop
+      declare
+         Dummy : constant Element_Array := Get (Parent, Key (I));
+      begin
+         null;
+      end;
+   end loop;
+   Put_Lookup ("First key after filling", Parent, Key (1));
+   Put_Lookup
+     ("Last key after filling", Parent, Key (Max_Lookup_Cache_Keys + 1));
+
+   Destroy (Child);
+   Destroy (Parent);
+   Destroy (ST);
+   Put_Line ("Done");
+end Main;
@@ -0,0 +1,126 @@
+with Ada.Calendar;    use Ada.Calendar;
+with Ada.Command_Line; use Ada.Command_Line;
+with Ada.Text_IO;     use Ada.Text_IO;
+
+with Langkit_Support.Lexical_Env;
+with Langkit_Support.Symbols; use Langkit_Support.Symbols;
+
+--  Look up environments that reference each other through a chain of
+--  diamonds: without deduplication, the number of paths to explore is
+--  exponential in the number of diamonds. The number of diamonds can be
+--  passed on the command line, in which case the time spent in lookups is
+--  printed as well, so that this can be used as a benchmark.
+
+procedure Main is
+
+   function Combine (L, R : Boolean) return Boolean is (L or else R);
+   function Can_Reach (El, From : Character) return Boolean is (El <= From);
+
+   package Envs is new Langkit_Support.Lexical_Env
+     (Element_T        => Character,
+      Element_Metadata => Boolean,
+      No_Element       => ' ',
+      Empty_Metadata   => False,
+      Combine          => Combine,
+      Getter_State_T   => Boolean);
+   use Envs;
+
+   function Image (Elements : Element_Array) return String;
+   --  Return a string that contains all elements
+
+   -----------
+   -- Image --
+   -----------
+
+   function Image (Elements : Element_Array) return String is
+      Result : String (1 .. Elements'Length);
+   begin
+      for I in Elements'Range loop
+         Result (I - Elements'First + 1) := Elements (I);
+      end loop;
+      return Result;
+   end Image;
+
+   Timed    : constant Boolean := Argument_Count > 0;
+   Diamonds : constant Positive :=
+     (if Timed then Positive'Value (Argument (1)) else 64);
+
+   ST : Symbol_Table := Create;
+   X  : constant Symbol_Type := Find (ST, "x");
+   Y  : constant Symbol_Type := Find (ST, "y");
+
+   type Env_Array is array (Natural range <>) of Lexical_Env;
+
+   Joins       : Env_Array (0 .. Diamonds);
+   Left, Right : Env_Array (0 .. Diamonds - 1);
+   Start       : Time;
+begin
+   --  Joins (I) references both Left (I) and Right (I), which both reference
+   --  Joins (I + 1). Also make the last join reference the first one, so
+   --  that the graph contains a cycle.
+
+   for I in Joins'Range loop
+      Joins (I) := Create (No_Env_Getter, ' ', False);
+   end loop;
+   for I in Left'Range loop
+      Left (I) := Create (No_Env_Getter, ' ', False);
+      Right (I) := Create (No_Env_Getter, ' ', False);
+      Reference (Joins (I), Left (I), Transitive => True);
+      Reference (Joins (I), Right (I), Transitive => True);
+      Reference (Left (I), Joins (I + 1), Transitive => True);
+      Reference (Right (I), Joins (I + 1), Transitive => True);
+   end loop;
+   Reference (Joins (Diamonds), Joins (0), Transitive => True);
+
+   Add (Joins (Diamonds), X, 'x');
+   Add (Joins (0), Y, 'y');
+   Add (Right (Diamonds / 2), Y, 'z');
+
+   --  Disable the lookup cache so that all iterations actually walk the
+   --  graph.
+
+   Set_Lookup_Cache (False);
+   Start := Clock;
+   for Iteration in 1 .. (if Timed then 1_000 else 1) loop
+      declare
+         Result_X : constant Element_Array := Get (Joins (0), X);
+         Result_Y : constant Element_Array := Get (Joins (0), Y);
+      begin
+         if Iteration = 1 then
+            Put_Line ("x: """ & Image (Result_X) & """");
+            Put_Line ("y: """ & Image (Result_Y) & """");
+         end if;
+      end;
+   end loop;
+   Set_Lookup_Cache (True);
+   if Timed then
+      Put_Line ("Time for 1000 lookups:"
+                & Duration'Image (Clock - Start) & "s");
+   end if;
+
+   --  An environment can also be both a parent and a referenced environment
+
+   declare
+      Parent : Lexical_Env := Create (No_Env_Getter, ' ', False);
+      Child  : Lexical_Env :=
+        Create (Simple_Env_Getter (Parent), ' ', False);
+   begin
+      Add (Parent, X, 'p');
+      Reference (Child, Parent);
+      Put_Line ("Parent and referenced: """ & Image (Get (Child, X)) & """");
+      Destroy (Child);
+      Destroy (Parent);
+   end;
+
+   for Env of Left loop
+      Destroy (Env);
+   end loop;
+   for Env of Right loop
+      Destroy (Env);
+   end loop;
+   for Env of Joins loop
+      Destroy (Env);
+   end loop;
+   Destroy (ST);
+   Put_Line ("Done");
+end Main;
@@ -0,0 +1,81 @@
+with Ada.Text_IO; use Ada.Text_IO;
+
+with Langkit_Support.Lexical_Env;
+with Langkit_Support.Symbols; use Langkit_Support.Symbols;
+
+procedure Main is
+
+   function Combine (L, R : Boolean) return Boolean is (L or else R);
+   function Can_Reach (El, From : Character) return Boolean is (El <= From);
+
+   package Envs is new Langkit_Support.Lexical_Env
+     (Element_T        => Character,
+      Element_Metadata => Boolean,
+      No_Element       => ' ',
+      Empty_Metadata   => False,
+      Combine          => Combine,
+      Getter_State_T   => Boolean);
+   use Envs;
+
+   procedure Put_Lookup
+     (Env       : Lexical_Env;
+      Env_Name  : String;
+      Key       : Symbol_Type;
+      Recursive : Boolean := True);
+   --  Print the result of a lookup for Key in Env, both with Get and with
+   --  Get_First.
+
+   ST  : Symbol_Table := Create;
+   Foo : constant Symbol_Type := Find (ST, "foo");
+   Bar : constant Symbol_Type := Find (ST, "bar");
+   Baz : constant Symbol_Type := Find (ST, "baz");
+
+   ----------------
+   -- Put_Lookup --
+   ----------------
+
+   procedure Put_Lookup
+     (Env       : Lexical_Env;
+      Env_Name  : String;
+      Key       : Symbol_Type;
+      Recursive : Boolean := True)
+   is
+      Result : constant Element_Array := Get (Env, Key, ' ', Recursive);
+      First  : constant Env_Element := Get_First (Env, Key, ' ', Recursive);
+      Img    : String (1 .. Result'Length);
+   begin
+      for I in Result'Range loop
+         Img (I - Result'First + 1) := Result (I);
+      end loop;
+      Put_Line (Env_Name & "." & Image (Key)
+                & (if Recursive then "" else " (non-recursive)")
+                & ": """ & Img & """, first: "
+                & (if First.Is_Null then "none" else (1 => First.El)));
+   end Put_Lookup;
+
+   Root  : Lexical_Env := Create (No_Env_Getter, ' ', False);
+   Lib   : Lexical_Env := Create (No_Env_Getter, ' ', False);
+   Inner : Lexical_Env := Create (Simple_Env_Getter (Root), ' ', False);
+begin
+   Add (Lib, Foo, 'f');
+   Add (Inner, Bar, 'b');
+   Reference (Root, Lib, Transitive => True);
+
+   Put_Lookup (Inner, "Inner", Foo);
+   Put_Lookup (Inner, "Inner", Bar);
+   Put_Lookup (Inner, "Inner", Baz);
+   Put_Lookup (Root, "Root", Foo, Recursive => False);
+   Put_Lookup (Root, "Root", Bar, Recursive => False);
+
+   --  Keys added to a referenced environment after a lookup must be found
+
+   Add (Lib, Baz, 'z');
+   Put_Lookup (Inner, "Inner", Baz);
+   Put_Lookup (Root, "Root", Baz, Recursive => False);
+
+   Destroy (Inner);
+   Destroy (Root);
+   Destroy (Lib);
+   Destroy (ST);
+   Put_Line ("Done");
+end Main;
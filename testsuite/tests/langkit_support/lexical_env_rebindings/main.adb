@@ -0,0 +1,71 @@
+with Ada.Text_IO; use Ada.Text_IO;
+
+with Langkit_Support.Lexical_Env;
+
+procedure Main is
+
+   function Combine (L, R : Boolean) return Boolean is (L or else R);
+   function Can_Reach (El, From : Character) return Boolean is (El <= From);
+
+   package Envs is new Langkit_Support.Lexical_Env
+     (Element_T        => Character,
+      Element_Metadata => Boolean,
+      No_Element       => ' ',
+      Empty_Metadata   => False,
+      Combine          => Combine,
+      Getter_State_T   => Boolean);
+   use Envs;
+
+   A : Lexical_Env := Create (No_Env_Getter, 'a', False);
+   B : Lexical_Env := Create (No_Env_Getter, 'b', False);
+   C : Lexical_Env := Create (No_Env_Getter, 'c', False);
+
+   A_To_B : constant Env_Rebinding :=
+     (Simple_Env_Getter (A), Simple_Env_Getter (B));
+   B_To_C : constant Env_Rebinding :=
+     (Simple_Env_Getter (B), Simple_Env_Getter (C));
+
+   R1 : Env_Rebindings := Create ((1 => A_To_B));
+   R2 : Env_Rebindings := Create ((1 => A_To_B));
+   R3 : Env_Rebindings := Create ((1 => B_To_C));
+   R4 : Env_Rebindings := Create ((A_To_B, B_To_C));
+
+   Combined : constant Env_Rebindings := Combine (R1, R3);
+begin
+   Put_Line ("Equal bindings share rebindings: " & Boolean'Image (R1 = R2));
+   Put_Line ("Different bindings do not: " & Boolean'Image (R1 /= R3));
+   Put_Line ("Combine is memoized: "
+             & Boolean'Image (Combine (R1, R3) = Combined));
+   Put_Line ("Combine result is shared: " & Boolean'Image (Combined = R4));
+   Put_Line ("Combine result:"
+             & Natural'Image (Combined.Size) & " bindings, "
+             & Boolean'Image (Get_Env (Combined.Rebindings (1).New_Env) = B)
+             & ", "
+             & Boolean'Image (Get_Env (Combined.Rebindings (2).New_Env) = C));
+   Put_Line ("Null combinations: "
+             & Boolean'Image (Combine (null, R1) = R1) & ", "
+             & Boolean'Image (Combine (R1, null) = R1));
+
+   Clear_Rebindings;
+   declare
+      R5 : Env_Rebindings := Create ((1 => A_To_B));
+   begin
+      Put_Line ("Owned rebindings survive clearing:"
+                & Natural'Image (R1.Size) & " binding");
+      Put_Line ("Rebindings created after clearing are new: "
+                & Boolean'Image (R5 /= R1));
+      Put_Line ("Combine works after clearing: "
+                & Boolean'Image (Combine (R1, R3).Size = 2));
+      Destroy (R5);
+   end;
+
+   Destroy (R1);
+   Destroy (R2);
+   Destroy (R3);
+   Destroy (R4);
+   Destroy (A);
+   Destroy (B);
+   Destroy (C);
+   Clear_Rebindings;
+   Put_Line ("Done");
+end Main;
@@ -0,0 +1,71 @@
+with Ada.Text_IO; use Ada.Text_IO;
+
+with Langkit_Support.Symbols; use Langkit_Support.Symbols;
+with Langkit_Support.Text;    use Langkit_Support.Text;
+
+procedure Main is
+
+   function Name (I : Natural) return Text_Type is
+     (To_Text ("name_" & Natural'Image (I mod 500)));
+
+   ST : Symbol_Table := Create;
+
+   A : constant Symbol_Type := Find (ST, "foo");
+   B : constant Symbol_Type := Find (ST, "bar");
+
+   Buffer : constant Text_Type := "xfoox";
+begin
+   Put_Line ("Same symbol for equal texts: "
+             & Boolean'Image (Find (ST, Buffer (2 .. 4)) = A));
+   Put_Line ("Different symbols for different texts: "
+             & Boolean'Image (A /= B));
+   Put_Line ("Text: " & Image (B, With_Quotes => True));
+   Put_Line ("Lookup without creation: "
+             & Boolean'Image (Find (ST, "baz", Create => False) = null));
+
+   --  Look for the same names from several tasks at the same time: all must
+   --  get the same symbols.
+
+   Set_Thread_Safe (ST, True);
+   declare
+      type Symbol_Array is array (0 .. 1999) of Symbol_Type;
+      Results : array (1 .. 4) of Symbol_Array;
+      Same    : Boolean := True;
+   begin
+      declare
+         task type Worker is
+            entry Start (Index : Positive);
+         end Worker;
+
+         task body Worker is
+            I : Positive;
+         begin
+            accept Start (Index : Positive) do
+               I := Index;
+            end Start;
+            for J in Symbol_Array'Range loop
+               Results (I) (J) := Find (ST, Name (J + I));
+            end loop;
+         end Worker;
+
+         Workers : array (Results'Range) of Worker;
+      begin
+         for I in Workers'Range loop
+            Workers (I).Start (I);
+         end loop;
+
+         --  Leaving this block waits for all workers to complete
+      end;
+
+      for I in Results'Range loop
+         for J in Symbol_Array'Range loop
+            Same := Same and then Results (I) (J) = Find (ST, Name (J + I));
+         end loop;
+      end loop;
+      Put_Line ("Same symbols across tasks: " & Boolean'Image (Same));
+   end;
+   Set_Thread_Safe (ST, False);
+
+   Destroy (ST);
+   Put_Line ("Done");
+end Main;
@@ -0,0 +1,38 @@
+import sys
+
+import libfoolang
+
+
+ctx = libfoolang.AnalysisContext()
+u = ctx.get_from_file('source.txt')
+if u.diagnostics:
+    for d in u.diagnostics:
+        print(d)
+    sys.exit(1)
+
+u.populate_lexical_env()
+o = u.root.find(lambda n: isinstance(n, libfoolang.Def) and n.f_id.text == 'o')
+q = o.parent.parent
+foo = q.parent.parent
+
+nodes = [foo, q, o]
+symbols = ['p', 'o', 't']
+
+
+def def_img(node):
+    assert isinstance(node, libfoolang.Def)
+    return '<Def {} line {}>'.format(node.f_id.text,
+                                     node.sloc_range.start.line)
+
+
+for node in nodes:
+    print('== From {} =='.format(def_img(node)))
+
+    for sym in symbols:
+        try:
+            result = def_img(getattr(node, 'p_resolve_{}'.format(sym)).el)
+        except libfoolang.PropertyError:
+            result = '<PropertyError>'
+        print('  {} : {}'.format(sym, result))
+
+print 'Done.'
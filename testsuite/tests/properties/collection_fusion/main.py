@@ -0,0 +1,22 @@
+print 'main.py: Running...'
+
+
+import sys
+
+import libfoolang
+
+
+ctx = libfoolang.AnalysisContext()
+u = ctx.get_from_buffer('main.txt', '(main 1, 2, 3)')
+if u.diagnostics:
+    for d in u.diagnostics:
+        print(d)
+    sys.exit(1)
+
+root = u.root
+for prop in ('indexes', 'doubled_tail', 'tail_length', 'shifted_head',
+             'any_big', 'all_small', 'flat_heads', 'head_tail_lengths',
+             'any_long_tail'):
+    print '{} = {}'.format(prop, getattr(root, 'p_' + prop))
+
+print 'main.py: Done.'
@@ -0,0 +1,101 @@
+"""
+Test that chains of collection expressions, which are rendered as a single
+loop, compute the same results as separate collection expressions, and that
+they do not build intermediate arrays.
+"""
+
+import os.path
+import re
+
+from langkit.compiled_types import ASTNode, Field, Token, root_grammar_class
+from langkit.diagnostics import Diagnostics
+from langkit.expressions import Property, Self
+from langkit.parsers import Grammar, List, Row, Tok
+
+from lexer_example import Token as LexToken
+from utils import build_and_run
+
+
+Diagnostics.set_lang_source_dir(os.path.abspath(__file__))
+
+
+@root_grammar_class()
+class FooNode(ASTNode):
+    pass
+
+
+class Literal(FooNode):
+    tok = Field(type=Token)
+
+
+class LiteralSequence(FooNode):
+    name = Field(type=Token)
+    items = Field(type=Literal.list_type())
+
+    indexes = Property(Self.items.map(lambda i, _: i))
+
+    doubled_tail = Property(
+        Self.items.map(lambda i, _: i)
+        .filter(lambda i: i > 0)
+        .map(lambda i: i + i)
+    )
+
+    tail_length = Property(
+        Self.items.map(lambda i, _: i).filter(lambda i: i > 0).length
+    )
+
+    shifted_head = Property(
+        Self.items.map(lambda i, _: i)
+        .take_while(lambda i: i < 2)
+        .map(lambda n, i: n + i)
+    )
+
+    any_big = Property(Self.items.map(lambda i, _: i).any(lambda i: i > 1))
+    all_small = Property(Self.items.map(lambda i, _: i).all(lambda i: i < 2))
+
+    flat_heads = Property(
+        Self.items.mapcat(lambda _: Self.indexes)
+        .filter(lambda i: i < 1)
+        .length
+    )
+
+    # Fused stages that handle ref-counted values, and that can stop early
+    head_tail_lengths = Property(
+        Self.items.map(lambda i, _: i)
+        .take_while(lambda i: Self.indexes.length > i + 1)
+        .map(lambda i: Self.indexes.filter(lambda j: j > i))
+        .map(lambda a: a.length)
+    )
+
+    any_long_tail = Property(
+        Self.items.map(lambda i, _: Self.indexes.filter(lambda j: j > i))
+        .any(lambda a: a.length > 1)
+    )
+
+
+foo_grammar = Grammar('main_rule')
+foo_grammar.add_rules(
+    main_rule=foo_grammar.list_rule,
+    list_rule=Row('(',
+                  Tok(LexToken.Identifier, keep=True),
+                  List(foo_grammar.list_item, sep=','),
+                  ')') ^ LiteralSequence,
+    list_item=Row(Tok(LexToken.Number, keep=True)) ^ Literal,
+)
+build_and_run(foo_grammar, 'main.py')
+
+# Fused map expressions must not build arrays: count the vectors that each
+# property declares to build its arrays.
+with open(os.path.join('build', 'include', 'libfoolang',
+                       'libfoolang-analysis.adb')) as f:
+    analysis_body = f.read()
+for prop in ('indexes', 'doubled_tail', 'tail_length', 'shifted_head',
+             'any_big', 'all_small', 'flat_heads', 'head_tail_lengths',
+             'any_long_tail'):
+    name = 'P_' + '_'.join(w.capitalize() for w in prop.split('_'))
+    end = analysis_body.index('end {};'.format(name))
+    start = analysis_body.rindex('function {}'.format(name), 0, end)
+    print '{}: {} vector(s)'.format(
+        prop, len(re.findall(r'\w+_Vec :', analysis_body[start:end]))
+    )
+print 'Done'
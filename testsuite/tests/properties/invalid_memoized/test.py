@@ -0,0 +1,50 @@
+from langkit.compiled_types import (
+    ASTNode, LexicalEnvType, LongType, root_grammar_class
+)
+from langkit.diagnostics import Diagnostics
+from langkit.expressions import Property, Self
+from langkit.parsers import Grammar, Row
+
+from os import path
+from utils import emit_and_print_errors
+
+
+def run(name, prop):
+    """
+    Emit and print the errors we get for the below grammar with "prop" as a
+    property in Example.
+    """
+
+    Diagnostics.set_lang_source_dir(path.abspath(__file__))
+
+    print('== {} =='.format(name))
+
+    @root_grammar_class()
+    class FooNode(ASTNode):
+        pass
+
+    class Example(FooNode):
+        p = prop()
+
+    def lang_def():
+        foo_grammar = Grammar('main_rule')
+        foo_grammar.add_rules(
+            main_rule=Row('example') ^ Example,
+        )
+        return foo_grammar
+    emit_and_print_errors(lang_def)
+    print('')
+
+
+run("Unhashable argument",
+    lambda: Property(lambda env=LexicalEnvType: Self, memoized=True))
+
+run("Table size without memoization",
+    lambda: Property(lambda n=LongType: n, memo_table_size=16))
+
+run("Table size without arguments",
+    lambda: Property(Self, memoized=True, memo_table_size=16))
+
+run("Null table size",
+    lambda: Property(lambda n=LongType: n, memoized=True, memo_table_size=0))
+print 'Done'
@@ -0,0 +1,49 @@
+print 'main.py: Running...'
+
+
+import sys
+
+import libfoolang
+
+
+ctx = libfoolang.AnalysisContext()
+u = ctx.get_from_buffer('main.txt', '(main 1, 2, 3)')
+if u.diagnostics:
+    for d in u.diagnostics:
+        print(d)
+    sys.exit(1)
+
+u.populate_lexical_env()
+root = u.root
+other = ctx.get_from_buffer('other.txt', '(other 4)').root
+
+
+def item_img(n):
+    try:
+        return root.p_item(n).f_tok.text
+    except libfoolang.PropertyError:
+        return '<PropertyError>'
+
+
+# Query each index twice: the second query is served from the memoization
+# table, including for errors.
+for n in (0, 1, 2, 3, 0, 1, 2, 3):
+    print 'item({}) = {}'.format(n, item_img(n))
+
+# has_item's memoization table can hold only two results, so this goes through
+# several table flushes.
+lits = list(root.f_items) + list(other.f_items)
+for lit in lits + list(reversed(lits)):
+    print 'has_item({}) = {}'.format(lit.f_tok.text, root.p_has_item(lit))
+
+# Null nodes are valid arguments too
+for _ in range(2):
+    print 'has_item(None) = {}'.format(root.p_has_item(None))
+
+# Results must be recomputed after a reparse
+u.reparse(buffer='(main 5, 6)')
+root = u.root
+for n in (0, 1, 2):
+    print 'item({}) = {}'.format(n, item_img(n))
+
+print 'main.py: Done.'
@@ -0,0 +1,53 @@
+"""
+Test memoized properties that take explicit arguments.
+"""
+
+import os.path
+
+from langkit.compiled_types import (
+    ASTNode, Field, LongType, Token, root_grammar_class
+)
+from langkit.diagnostics import Diagnostics
+from langkit.expressions import Property, Self
+from langkit.parsers import Grammar, List, Row, Tok
+
+from lexer_example import Token as LexToken
+from utils import build_and_run
+
+
+Diagnostics.set_lang_source_dir(os.path.abspath(__file__))
+
+
+@root_grammar_class()
+class FooNode(ASTNode):
+    pass
+
+
+class Literal(FooNode):
+    tok = Field(type=Token)
+
+
+class LiteralSequence(FooNode):
+    name = Field(type=Token)
+    items = Field(type=Literal.list_type())
+
+    item = Property(lambda n=LongType: Self.items.at_or_raise(n),
+                    memoized=True)
+
+    has_item = Property(
+        lambda lit=Literal: Self.items.any(lambda i: i.equals(lit)),
+        memoized=True, memo_table_size=2
+    )
+
+
+foo_grammar = Grammar('main_rule')
+foo_grammar.add_rules(
+    main_rule=foo_grammar.list_rule,
+    list_rule=Row('(',
+                  Tok(LexToken.Identifier, keep=True),
+                  List(foo_grammar.list_item, sep=','),
+                  ')') ^ LiteralSequence,
+    list_item=Row(Tok(LexToken.Number, keep=True)) ^ Literal,
+)
+build_and_run(foo_grammar, 'main.py')
+print 'Done'
@@ -0,0 +1,36 @@
+print 'main.py: Running...'
+
+
+import sys
+
+import libfoolang
+
+
+ctx = libfoolang.AnalysisContext()
+u = ctx.get_from_file('main.txt')
+if u.diagnostics:
+    for d in u.diagnostics:
+        print(d)
+    sys.exit(1)
+
+
+def check(label):
+    print '{}: result = {}'.format(label, u.root.p_result)
+    print '  Literal evaluations: {}'.format(u.root.p_result_evaluations)
+
+
+check('Initial')
+check('Cached')
+
+# Reparsing units that main.txt reads must invalidate its cached results
+ctx.get_from_buffer('b.txt', '10')
+check('After reparsing b.txt')
+
+ctx.get_from_buffer('a.txt', '4 + 5')
+check('After reparsing a.txt')
+
+# Loading an unrelated unit must not change anything
+ctx.get_from_buffer('c.txt', '100')
+check('After loading c.txt')
+
+print 'main.py: Done.'
@@ -0,0 +1,71 @@
+"""
+Test that the results of memoized properties are invalidated when the analysis
+units they depend on are reparsed.
+"""
+
+import os.path
+
+from langkit.compiled_types import (
+    AnalysisUnitType, ASTNode, Field, LongType, abstract, root_grammar_class
+)
+from langkit.diagnostics import Diagnostics
+from langkit.expressions import (
+    AbstractProperty, ExternalProperty, Property, Self
+)
+from langkit.parsers import Grammar, Or, Row, Tok
+
+from lexer_example import Token
+from utils import build_and_run
+
+
+Diagnostics.set_lang_source_dir(os.path.abspath(__file__))
+
+
+@root_grammar_class()
+class FooNode(ASTNode):
+    pass
+
+
+@abstract
+class Expression(FooNode):
+    result = AbstractProperty(type=LongType)
+
+    # Number of evaluations of Literal.result so far, to check which results
+    # are recomputed.
+    result_evaluations = ExternalProperty(type=LongType)
+
+
+class Literal(Expression):
+    tok = Field()
+
+    result = ExternalProperty()
+
+
+class Name(Expression):
+    tok = Field()
+
+    designated_unit = ExternalProperty(type=AnalysisUnitType)
+    result = Property(Self.designated_unit.root.cast(Expression).result,
+                      memoized=True)
+
+
+class Plus(Expression):
+    left = Field()
+    right = Field()
+
+    result = Property(Self.left.result + Self.right.result, memoized=True)
+
+
+foo_grammar = Grammar('main_rule')
+foo_grammar.add_rules(
+    main_rule=Or(
+        Row(foo_grammar.atom, '+', foo_grammar.main_rule) ^ Plus,
+        foo_grammar.atom
+    ),
+    atom=Or(
+        Row(Tok(Token.Number, keep=True)) ^ Literal,
+        Row(Tok(Token.Identifier, keep=True)) ^ Name,
+    ),
+)
+build_and_run(foo_grammar, 'main.py')
+print 'Done'
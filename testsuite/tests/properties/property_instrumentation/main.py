@@ -0,0 +1,46 @@
+import sys
+
+import libfoolang
+
+
+def dump_stats(ctx):
+    stats = ctx.property_stats
+    for prop_name in sorted(stats):
+        if not prop_name.startswith('LiteralSequence.'):
+            continue
+        s = stats[prop_name]
+        print('{}: calls={} memo_hits={} property_errors={}'
+              ' time_ok={}'.format(prop_name, s.calls, s.memo_hits,
+                                   s.property_errors,
+                                   0 <= s.self_time <= s.total_time))
+
+
+ctx = libfoolang.AnalysisContext()
+u = ctx.get_from_buffer('main.txt', '(main 1, 2, 3)')
+if u.diagnostics:
+    for d in u.diagnostics:
+        print(d)
+    sys.exit(1)
+
+root = u.root
+
+print('== Before evaluation ==')
+dump_stats(ctx)
+
+# The second call to first_item gets item(0) from the memoization table, and
+# so does the second call to item(5), which raises a property error both
+# times.
+for _ in range(2):
+    print('first_item = {}'.format(root.p_first_item.f_tok.text))
+for _ in range(2):
+    try:
+        root.p_item(5)
+    except libfoolang.PropertyError:
+        print('item(5) = <PropertyError>')
+
+print('== After evaluation ==')
+dump_stats(ctx)
+
+print('== After reset ==')
+ctx.reset_property_stats()
+dump_stats(ctx)